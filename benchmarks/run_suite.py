@@ -0,0 +1,57 @@
+"""
+Run the synthetic benchmark presets and store one JSON result per preset.
+
+    python benchmarks/run_suite.py --out benchmarks/results/new
+    python benchmarks/run_suite.py --out benchmarks/results/new --baseline benchmarks/results/old
+
+Exits 1 if any stage regressed against the baseline (see `digdaggraph bench --help`).
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from digdaggraph.bench import (
+    PRESETS,
+    compare_results,
+    format_comparison,
+    format_layout_curve,
+    format_timings,
+    result_envelope,
+    run_synthetic,
+)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", required=True, help="directory for <preset>.json results")
+    parser.add_argument("--baseline", help="directory with results of an earlier run")
+    parser.add_argument("--preset", action="append", choices=sorted(PRESETS), help="run only these presets")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--layout", default="auto", help="build layout engine; graphviz records layout curves for all")
+    args = parser.parse_args()
+
+    out = Path(args.out)
+    out.mkdir(parents=True, exist_ok=True)
+    regressed = False
+    for name in args.preset or sorted(PRESETS):
+        print(f"== {name}")
+        result = result_envelope(
+            run_synthetic(PRESETS[name], repeat=args.repeat, build_args=["--layout", args.layout]), args.repeat
+        )
+        result["preset"] = name
+        (out / f"{name}.json").write_text(json.dumps(result, indent=1, sort_keys=True), encoding="utf-8")
+        print(format_timings(result["timings"]))
+        if result["layout_curve"]:
+            print(format_layout_curve(result["layout_curve"]))
+        base = Path(args.baseline) / f"{name}.json" if args.baseline else None
+        if base and base.exists():
+            rows = compare_results(json.loads(base.read_text(encoding="utf-8")), result, args.threshold)
+            print(format_comparison(rows))
+            regressed |= any(r[-1] for r in rows)
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
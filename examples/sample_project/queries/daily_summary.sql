@@ -0,0 +1,10 @@
+-- Example SQL with table lineage: reads events/users, writes daily_summary
+WITH recent AS (
+  SELECT user_id, event_type FROM analytics_src.events
+  WHERE time > td_time_add(now(), '-1d')
+)
+INSERT INTO daily_summary
+SELECT u.country, r.event_type, count(*) AS n
+FROM recent r
+JOIN analytics_src.users u ON u.user_id = r.user_id
+GROUP BY 1, 2;
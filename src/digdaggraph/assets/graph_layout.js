@@ -0,0 +1,163 @@
+/*
+ * digdaggraph client-side layout.
+ *
+ * Lays out the compact Block-tree model written by digdaggraph.graph_model
+ * (see block_to_model) top-to-bottom and renders it as SVG. Digdag task trees
+ * are series-parallel, so a recursive box layout is enough: a node sits above
+ * the cluster of its children, which are stacked (sequential) or placed side
+ * by side (_parallel). No external dependencies; served from graphs/assets/.
+ */
+(function (global) {
+  'use strict';
+
+  var FONT = 12, LINE = 16, CHAR_W = 7, PAD_X = 10, PAD_Y = 8;
+  var MIN_W = 54, MIN_H = 36, RANK_SEP = 30, NODE_SEP = 20, CLUSTER_PAD = 10, MARGIN = 8;
+  var EDGE = '#ff0000';
+
+  function esc(s) {
+    return String(s).replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;').replace(/"/g, '&quot;');
+  }
+
+  function nodeSize(n) {
+    var lines = String(n.l).split('\n');
+    var longest = 0;
+    for (var i = 0; i < lines.length; i++) longest = Math.max(longest, lines[i].length);
+    var w = Math.max(MIN_W, longest * CHAR_W + 2 * PAD_X);
+    var h = Math.max(MIN_H, lines.length * LINE + 2 * PAD_Y);
+    var s = n.s || 'box';
+    if (s === 'diamond') { w *= 1.6; h *= 1.6; }
+    else if (s === 'hexagon' || s === 'cds') { w += 20; }
+    else if (s === 'Mcircle' || s === 'circle' || s === 'ellipse') { w *= 1.25; h *= 1.25; }
+    n._lines = lines; n.nw = w; n.nh = h;
+  }
+
+  function measure(n) {
+    nodeSize(n);
+    var kids = n.k || [];
+    if (!kids.length) { n.w = n.nw; n.h = n.nh; return; }
+    var kw = 0, kh = 0;
+    for (var i = 0; i < kids.length; i++) {
+      measure(kids[i]);
+      if (n.p) { kw += kids[i].w; kh = Math.max(kh, kids[i].h); }
+      else { kw = Math.max(kw, kids[i].w); kh += kids[i].h; }
+    }
+    if (n.p) kw += NODE_SEP * (kids.length - 1); else kh += RANK_SEP * (kids.length - 1);
+    n.kw = kw; n.kh = kh;
+    n.cw = kw + 2 * CLUSTER_PAD; n.ch = kh + 2 * CLUSTER_PAD;
+    n.w = Math.max(n.nw, n.cw);
+    n.h = n.nh + RANK_SEP + n.ch;
+  }
+
+  function place(n, x, y) {
+    n.cx = x + n.w / 2; n.top = y; n.bottom = y + n.nh;
+    var kids = n.k || [];
+    if (!kids.length) return;
+    n.clx = x + (n.w - n.cw) / 2; n.cly = y + n.nh + RANK_SEP;
+    var kx = n.clx + CLUSTER_PAD, ky = n.cly + CLUSTER_PAD;
+    for (var i = 0; i < kids.length; i++) {
+      var k = kids[i];
+      if (n.p) { place(k, kx, ky); kx += k.w + NODE_SEP; }
+      else { place(k, kx + (n.kw - k.w) / 2, ky); ky += k.h + RANK_SEP; }
+    }
+  }
+
+  function last(n) {
+    var kids = n.k || [];
+    if (!kids.length) return [n];
+    if (!n.p) return last(kids[kids.length - 1]);
+    var out = [];
+    for (var i = 0; i < kids.length; i++) out = out.concat(last(kids[i]));
+    return out;
+  }
+
+  function shapeSvg(n, stroke, sw) {
+    var x = n.cx - n.nw / 2, y = n.top, w = n.nw, h = n.nh, r = x + w, b = y + h, my = y + h / 2;
+    var a = ' fill="' + (n.f || 'none') + '" stroke="' + stroke + '" stroke-width="' + sw + '"';
+    function poly(pts) { return '<polygon points="' + pts.join(' ') + '"' + a + '/>'; }
+    switch (n.s || 'box') {
+      case 'diamond': return poly([n.cx + ',' + y, r + ',' + my, n.cx + ',' + b, x + ',' + my]);
+      case 'hexagon': return poly([(x + 10) + ',' + y, (r - 10) + ',' + y, r + ',' + my, (r - 10) + ',' + b, (x + 10) + ',' + b, x + ',' + my]);
+      case 'cds': return poly([x + ',' + y, (r - 12) + ',' + y, r + ',' + my, (r - 12) + ',' + b, x + ',' + b]);
+      case 'Mcircle': case 'circle': case 'ellipse':
+        var e = '<ellipse cx="' + n.cx + '" cy="' + my + '" rx="' + w / 2 + '" ry="' + h / 2 + '"' + a + '/>';
+        if ((n.s || '') === 'Mcircle') {
+          e += '<line x1="' + (n.cx - w * 0.3) + '" y1="' + (y + h * 0.12) + '" x2="' + (n.cx + w * 0.3) + '" y2="' + (y + h * 0.12) + '"' + a + '/>';
+          e += '<line x1="' + (n.cx - w * 0.3) + '" y1="' + (b - h * 0.12) + '" x2="' + (n.cx + w * 0.3) + '" y2="' + (b - h * 0.12) + '"' + a + '/>';
+        }
+        return e;
+      case 'note': return poly([x + ',' + y, (r - 8) + ',' + y, r + ',' + (y + 8), r + ',' + b, x + ',' + b]);
+      case 'folder': return poly([x + ',' + y, (x + w * 0.35) + ',' + y, (x + w * 0.4) + ',' + (y + 5), r + ',' + (y + 5), r + ',' + b, x + ',' + b]);
+      case 'box3d': return '<rect x="' + (x + 4) + '" y="' + y + '" width="' + (w - 4) + '" height="' + (h - 4) + '"' + a + '/>' +
+        '<rect x="' + x + '" y="' + (y + 4) + '" width="' + (w - 4) + '" height="' + (h - 4) + '"' + a + '/>';
+      case 'component': return '<rect x="' + x + '" y="' + y + '" width="' + w + '" height="' + h + '"' + a + '/>' +
+        '<rect x="' + (x - 4) + '" y="' + (y + 6) + '" width="8" height="6"' + a + '/>' +
+        '<rect x="' + (x - 4) + '" y="' + (b - 12) + '" width="8" height="6"' + a + '/>';
+      default: return '<rect x="' + x + '" y="' + y + '" width="' + w + '" height="' + h + '"' + a + '/>';
+    }
+  }
+
+  function nodeSvg(n, out) {
+    var body = shapeSvg(n, n.c || '#000000', n.pw || 1);
+    var y0 = n.top + n.nh / 2 - (n._lines.length - 1) * LINE / 2 + FONT / 3;
+    var text = '<text text-anchor="middle" font-family="Helvetica,Arial,sans-serif" font-size="' + FONT + '">';
+    for (var i = 0; i < n._lines.length; i++) {
+      text += '<tspan x="' + n.cx + '" y="' + (y0 + i * LINE) + '">' + esc(n._lines[i]) + '</tspan>';
+    }
+    text += '</text>';
+    var g = '<g' + (n.i ? ' id="' + esc(n.i) + '"' : '') + ' class="node"><title>' + esc(n.t || n._lines[0]) + '</title>' + body + text + '</g>';
+    if (n.u) g = '<a href="' + esc(n.u) + '" target="_top">' + g + '</a>';
+    out.push(g);
+  }
+
+  function edgeSvg(a, b, out) {
+    var sx = a.cx, sy = a.bottom, tx = b.cx, ty = b.top - 6, my = (sy + ty) / 2;
+    out.push('<path d="M' + sx + ',' + sy + ' C' + sx + ',' + my + ' ' + tx + ',' + my + ' ' + tx + ',' + ty +
+      '" fill="none" stroke="' + EDGE + '" marker-end="url(#dg-arrow)"/>');
+  }
+
+  function draw(n, nodes, edges, clusters) {
+    nodeSvg(n, nodes);
+    var kids = n.k || [];
+    if (!kids.length) return;
+    clusters.push('<rect class="cluster" x="' + n.clx + '" y="' + n.cly + '" width="' + n.cw + '" height="' + n.ch +
+      '" fill="none" stroke="#000000"/>');
+    var prev = [n];
+    for (var i = 0; i < kids.length; i++) {
+      draw(kids[i], nodes, edges, clusters);
+      for (var j = 0; j < prev.length; j++) edgeSvg(prev[j], kids[i], edges);
+      if (!n.p) prev = last(kids[i]);
+    }
+  }
+
+  function prepare(n) {
+    // penwidth is stored as "w"; move it aside so "w" can hold the layout width
+    n.pw = n.w || 1;
+    delete n.w;
+    var kids = n.k || [];
+    for (var i = 0; i < kids.length; i++) prepare(kids[i]);
+  }
+
+  function render(model) {
+    var root = model.root;
+    prepare(root);
+    measure(root);
+    place(root, MARGIN, MARGIN);
+    var nodes = [], edges = [], clusters = [];
+    draw(root, nodes, edges, clusters);
+    var W = Math.ceil(root.w + 2 * MARGIN), H = Math.ceil(root.h + 2 * MARGIN);
+    return '<svg xmlns="http://www.w3.org/2000/svg" width="' + W + 'pt" height="' + H + 'pt" viewBox="0 0 ' + W + ' ' + H + '">' +
+      '<defs><marker id="dg-arrow" viewBox="0 0 10 10" refX="1" refY="5" markerWidth="7" markerHeight="7" orient="auto">' +
+      '<path d="M0,0 L10,5 L0,10 z" fill="' + EDGE + '"/></marker></defs>' +
+      '<rect width="100%" height="100%" fill="#ffffff"/>' +
+      clusters.join('') + edges.join('') + nodes.join('') + '</svg>';
+  }
+
+  function mount(stageId, modelId) {
+    var stage = document.getElementById(stageId || 'svg-stage');
+    var el = document.getElementById(modelId || 'graph-model');
+    if (!stage || !el) return;
+    stage.innerHTML = render(JSON.parse(el.textContent));
+  }
+
+  global.DigdagGraphLayout = { render: render, mount: mount };
+})(this);
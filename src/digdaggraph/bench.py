@@ -0,0 +1,308 @@
+from __future__ import annotations
+
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from . import __version__
+from .constants import BUILD_REPORT_FILE, GRAPHS_DIR
+from .logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Stages in pipeline order; anything else the report contains is printed after.
+STAGES = (
+    "discover",
+    "fingerprint",
+    "history",
+    "sql_index",
+    "parse",
+    "includes",
+    "tree",
+    "sql_pages",
+    "dependencies",
+    "dot",
+    "layout",
+    "pages",
+    "indexes",
+    "search",
+)
+
+
+@dataclass
+class SyntheticSpec:
+    """Shape of a generated Digdag repository."""
+
+    projects: int = 5
+    workflows: int = 10           # per project
+    depth: int = 3                # nesting levels below the top-level tasks
+    fanout: int = 3               # children per group
+    parallel: float = 0.5         # share of groups marked `_parallel: true`
+    include_share: float = 0.5    # share of workflows using the shared !include files
+    sql_lines: int = 40           # lines per generated SQL file
+    call_density: float = 0.2     # call>/require> tasks per workflow (Poisson-ish)
+    seed: int = 0
+
+
+# Named shapes used by benchmarks/run_suite.py; each stresses a different stage.
+PRESETS: Dict[str, SyntheticSpec] = {
+    "small": SyntheticSpec(projects=2, workflows=5, depth=2),
+    "wide": SyntheticSpec(projects=20, workflows=25, depth=2, fanout=3),
+    "deep": SyntheticSpec(projects=3, workflows=5, depth=5, fanout=3, parallel=0.8),
+    "sql_heavy": SyntheticSpec(projects=5, workflows=10, sql_lines=2000),
+    "connected": SyntheticSpec(projects=10, workflows=20, call_density=0.8, include_share=0.9),
+    # a few thousand tasks per workflow: exercises the large Graphviz layout profiles
+    "large_graphs": SyntheticSpec(projects=1, workflows=3, depth=6, fanout=4, parallel=0.3),
+}
+
+
+def _sql_text(rng: random.Random, project: int, n: int, lines: int) -> str:
+    src = [f"p{project:03d}_db.src_{rng.randrange(50)}" for _ in range(2)]
+    out = [
+        f"-- generated query {n}",
+        f"INSERT INTO p{project:03d}_db.t_{n}",
+        "SELECT",
+    ]
+    for i in range(max(1, lines - 6)):
+        out.append(f"  a.col_{i} AS c{i},  -- padding column {i}")
+    out.append("  COUNT(*) AS cnt")
+    out.append(f"FROM {src[0]} a JOIN {src[1]} b ON a.id = b.id")
+    out.append("WHERE a.dt = '${session_date}' GROUP BY 1")
+    return "\n".join(out) + "\n"
+
+
+def _task_lines(
+    rng: random.Random, spec: SyntheticSpec, level: int, indent: str, sql_files: int, counter: List[int]
+) -> List[str]:
+    lines: List[str] = []
+    if level >= spec.depth:
+        counter[0] += 1
+        kind = rng.random()
+        if kind < 0.7:
+            lines.append(f"{indent}td>: queries/q{rng.randrange(sql_files)}.sql")
+            if rng.random() < 0.2:
+                lines.append(f"{indent}_retry: {rng.randint(1, 5)}")
+        elif kind < 0.85:
+            lines.append(f"{indent}echo>: step {counter[0]}")
+        else:
+            lines.append(f"{indent}http>: https://example.com/hook/{counter[0]}")
+        return lines
+    if rng.random() < spec.parallel:
+        lines.append(f"{indent}_parallel: true")
+    for i in range(spec.fanout):
+        lines.append(f"{indent}+l{level}_{i}:")
+        lines.extend(_task_lines(rng, spec, level + 1, indent + "  ", sql_files, counter))
+    return lines
+
+
+def generate_repo(root: Path, spec: SyntheticSpec) -> Dict[str, int]:
+    """
+    Write a synthetic Digdag repository under `root` (one directory per project)
+    and return counts of what was generated. Output is deterministic per `spec.seed`.
+    """
+    rng = random.Random(spec.seed)
+    root = Path(root)
+    counts = {"projects": 0, "workflows": 0, "tasks": 0, "sql_files": 0, "includes": 0, "calls": 0}
+    sql_files = max(1, spec.workflows)
+    for p in range(spec.projects):
+        proj = root / f"p{p:03d}"
+        (proj / "queries").mkdir(parents=True, exist_ok=True)
+        (proj / "common").mkdir(exist_ok=True)
+        (proj / "common" / "export.yml").write_text(
+            f"td:\n  database: p{p:03d}_db\n  engine: presto\nowner: team{p % 7}\n", encoding="utf-8"
+        )
+        (proj / "common" / "notify.yml").write_text(
+            "+notify:\n  mail>: ops@example.com\n", encoding="utf-8"
+        )
+        for n in range(sql_files):
+            (proj / "queries" / f"q{n}.sql").write_text(
+                _sql_text(rng, p, n, spec.sql_lines), encoding="utf-8"
+            )
+        counts["sql_files"] += sql_files
+        counts["projects"] += 1
+
+        for w in range(spec.workflows):
+            lines = ["timezone: UTC", ""]
+            if rng.random() < 0.7:
+                lines += ["schedule:", f"  cron>: \"{rng.randrange(60)} {rng.randrange(24)} * * *\"", ""]
+            uses_include = rng.random() < spec.include_share
+            lines += ["_export:"]
+            if uses_include:
+                lines += ["  !include: common/export.yml"]
+                counts["includes"] += 1
+            else:
+                lines += ["  td:", f"    database: p{p:03d}_db"]
+            lines.append("")
+            counter = [0]
+            for t in range(spec.fanout):
+                lines.append(f"+stage{t}:")
+                lines.extend(_task_lines(rng, spec, 1, "  ", sql_files, counter))
+            calls = 0
+            while rng.random() < spec.call_density and calls < 5:
+                op = "call>" if rng.random() < 0.5 else "require>"
+                if rng.random() < 0.5 or spec.projects == 1:
+                    target = f"wf{rng.randrange(spec.workflows):03d}"
+                else:
+                    target = f"../p{rng.randrange(spec.projects):03d}/wf{rng.randrange(spec.workflows):03d}"
+                lines += [f"+dep{calls}:", f"  {op}: {target}"]
+                calls += 1
+            counts["calls"] += calls
+            if uses_include:
+                lines += ["+shared:", "  !include: common/notify.yml"]
+            (proj / f"wf{w:03d}.dig").write_text("\n".join(lines) + "\n", encoding="utf-8")
+            counts["workflows"] += 1
+            counts["tasks"] += counter[0]
+    return counts
+
+
+def _graphviz_version() -> Optional[str]:
+    try:
+        out = subprocess.run(["dot", "-V"], capture_output=True, text=True, timeout=10)
+        return (out.stderr or out.stdout).strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_build_bench(workdir: Path, repeat: int = 1, build_args: Sequence[str] = ()) -> Dict[str, Any]:
+    """
+    Run `repeat` forced builds inside `workdir` and return the per-stage minimum
+    (the least noisy estimate) plus the last run's report sections.
+    """
+    from .cli import main
+
+    best: Dict[str, float] = {}
+    total = float("inf")
+    sections: Dict[str, Any] = {}
+    cwd = os.getcwd()
+    try:
+        os.chdir(workdir)
+        for _ in range(max(1, repeat)):
+            t0 = time.perf_counter()
+            main(["build", "--force", *build_args])
+            total = min(total, time.perf_counter() - t0)
+            report = json.loads((Path(GRAPHS_DIR) / BUILD_REPORT_FILE).read_text(encoding="utf-8"))
+            for stage, secs in report["timings"].items():
+                best[stage] = min(best.get(stage, secs), secs)
+            sections = report["sections"]
+    finally:
+        os.chdir(cwd)
+    best["total"] = total
+    return {
+        "timings": {k: round(v, 4) for k, v in best.items()},
+        "sections": sections,
+        "layout_curve": layout_curve(sections),
+    }
+
+
+def layout_curve(sections: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Graphviz layout time vs. graph size per layout profile, from a report's
+    "layout_profiles" section: one row per (profile, node-count bucket).
+    """
+    rows = []
+    for profile, buckets in sorted(sections.get("layout_profiles", {}).items()):
+        for bucket, (count, total, worst) in sorted(buckets.items(), key=lambda kv: int(kv[0])):
+            rows.append(
+                {
+                    "profile": profile,
+                    "max_nodes": int(bucket),
+                    "workflows": count,
+                    "mean_s": round(total / count, 4) if count else 0.0,
+                    "max_s": worst,
+                }
+            )
+    return rows
+
+
+def format_layout_curve(rows: List[Dict[str, Any]]) -> str:
+    lines = [f"{'profile':>10}  {'nodes<=':>8}  {'graphs':>6}  {'mean':>8}  {'max':>8}"]
+    for r in rows:
+        lines.append(
+            f"{r['profile']:>10}  {r['max_nodes']:>8}  {r['workflows']:>6}  {r['mean_s']:>7.3f}s  {r['max_s']:>7.3f}s"
+        )
+    return "\n".join(lines)
+
+
+def run_synthetic(
+    spec: SyntheticSpec, workdir: Optional[Path] = None, repeat: int = 1, build_args: Sequence[str] = ()
+) -> Dict[str, Any]:
+    """
+    Generate a repo for `spec` and benchmark it. Without `workdir` a temporary
+    directory is used and removed afterwards; an explicit `workdir` must be
+    empty (or not exist yet) and is kept for inspection.
+    """
+    if workdir is None:
+        with tempfile.TemporaryDirectory(prefix="digdaggraph-bench-") as tmp:
+            return run_synthetic(spec, Path(tmp), repeat, build_args)
+    workdir = Path(workdir)
+    if workdir.exists() and any(workdir.iterdir()):
+        raise ValueError(f"Benchmark workdir is not empty: {workdir}")
+    workdir.mkdir(parents=True, exist_ok=True)
+    t0 = time.perf_counter()
+    counts = generate_repo(workdir, spec)
+    logger.info(f"Generated synthetic repo in {time.perf_counter() - t0:.2f}s: {counts}")
+    result = run_build_bench(workdir, repeat=repeat, build_args=build_args)
+    result.update(spec=asdict(spec), generated=counts)
+    return result
+
+
+def result_envelope(result: Dict[str, Any], repeat: int) -> Dict[str, Any]:
+    """Add tool/platform metadata so result files stay comparable over time."""
+    return {
+        "tool": __version__,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "graphviz": _graphviz_version(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "repeat": repeat,
+        **result,
+    }
+
+
+def _ordered(stages) -> List[str]:
+    known = [s for s in STAGES if s in stages]
+    return known + sorted(s for s in stages if s not in STAGES and s != "total") + (
+        ["total"] if "total" in stages else []
+    )
+
+
+def compare_results(
+    old: Dict[str, Any], new: Dict[str, Any], threshold: float = 0.2, floor: float = 0.01
+) -> List[Tuple[str, Optional[float], Optional[float], bool]]:
+    """
+    Compare stage timings of two result records.
+
+    Returns (stage, old_s, new_s, regressed) rows; a stage regressed when it got
+    slower by more than `threshold` (relative) and `floor` seconds (absolute).
+    """
+    a, b = old.get("timings", {}), new.get("timings", {})
+    rows = []
+    for stage in _ordered(set(a) | set(b)):
+        x, y = a.get(stage), b.get(stage)
+        regressed = x is not None and y is not None and y > x * (1 + threshold) and y - x > floor
+        rows.append((stage, x, y, regressed))
+    return rows
+
+
+def format_timings(timings: Dict[str, float]) -> str:
+    return "\n".join(f"{stage:>14}: {timings[stage]:.3f}s" for stage in _ordered(timings))
+
+
+def format_comparison(rows: List[Tuple[str, Optional[float], Optional[float], bool]]) -> str:
+    def fmt(v: Optional[float]) -> str:
+        return f"{v:.3f}s" if v is not None else "-"
+
+    lines = [f"{'stage':>14}  {'before':>9}  {'after':>9}  change"]
+    for stage, x, y, regressed in rows:
+        change = f"{(y - x) / x * 100:+.0f}%" if x and y is not None else ""
+        flag = "  REGRESSION" if regressed else ""
+        lines.append(f"{stage:>14}  {fmt(x):>9}  {fmt(y):>9}  {change}{flag}")
+    return "\n".join(lines)
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import astuple, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from . import vfs
+from .logging_config import get_logger
+
+logger = get_logger(__name__)
+
+FEATURES = ("base", "tasks", "depth", "parallel", "sql_kb")
+# Seconds per unit before any calibration: roughly a Graphviz build on a laptop
+DEFAULT_WEIGHTS: Dict[str, float] = {"base": 0.02, "tasks": 0.004, "depth": 0.01, "parallel": 0.002, "sql_kb": 0.001}
+# Fewer samples than this keep the default weights
+MIN_SAMPLES = 8
+
+_TASK = re.compile(r"^(\s*)\+[^:]*:")
+_PARALLEL = re.compile(r"^(\s*)_parallel:\s*(true|True|yes|\d+|\{)")
+_TD = re.compile(r"^\s*td>:\s*([^\s#]+\.sql)\s*$")
+
+
+@dataclass
+class CostFeatures:
+    """What a workflow's build time grows with, read from the .dig text without parsing it."""
+
+    tasks: int = 0
+    depth: int = 0
+    parallel: int = 0  # tasks whose group runs its children in parallel
+    sql_kb: float = 0.0
+
+    def vector(self) -> List[float]:
+        return [1.0, *map(float, astuple(self))]
+
+
+def features_for(dig_path: Path) -> CostFeatures:
+    """
+    Task count, nesting depth, tasks in `_parallel` groups and the size of
+    literal td> SQL files, from indentation alone (includes aren't followed).
+    """
+    f = CostFeatures()
+    try:
+        lines = vfs.read_text(dig_path).splitlines()
+    except OSError:
+        return f
+    # (indent, parallel) of the open task groups; the workflow itself is indent -1
+    stack: List[Tuple[int, bool]] = [(-1, False)]
+    base_dir = Path(dig_path).parent
+    for line in lines:
+        m = _TASK.match(line)
+        if m:
+            indent = len(m.group(1))
+            while stack[-1][0] >= indent:
+                stack.pop()
+            f.tasks += 1
+            f.parallel += stack[-1][1]
+            stack.append((indent, False))
+            f.depth = max(f.depth, len(stack) - 1)
+            continue
+        m = _PARALLEL.match(line)
+        if m:
+            indent = len(m.group(1))
+            while stack[-1][0] >= indent:
+                stack.pop()
+            stack[-1] = (stack[-1][0], True)
+            continue
+        m = _TD.match(line)
+        if m and "${" not in m.group(1):
+            try:
+                f.sql_kb += vfs.getsize(base_dir / m.group(1)) / 1024
+            except OSError:
+                pass
+    return f
+
+
+class CostModel:
+    """Linear estimate of a workflow's parse + render seconds from its CostFeatures."""
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None, samples: int = 0) -> None:
+        self.weights = dict(weights or DEFAULT_WEIGHTS)
+        self.samples = samples
+
+    def estimate(self, features: CostFeatures) -> float:
+        return sum(self.weights[name] * x for name, x in zip(FEATURES, features.vector()))
+
+    def key(self) -> str:
+        return json.dumps({k: round(v, 9) for k, v in sorted(self.weights.items())})
+
+    @classmethod
+    def calibrated(cls, samples: Sequence[Tuple[CostFeatures, float]]) -> "CostModel":
+        """
+        Least-squares weights from (features, actual seconds) of earlier
+        builds; negative weights are dropped and the rest refitted.
+        Too few samples keep the defaults.
+        """
+        if len(samples) < MIN_SAMPLES:
+            return cls()
+        active = list(range(len(FEATURES)))
+        while active:
+            w = _least_squares([[s[0].vector()[i] for i in active] for s in samples], [s[1] for s in samples])
+            if w is None:
+                return cls()
+            negative = [i for i, x in zip(active, w) if x < 0]
+            if not negative:
+                weights = {name: 0.0 for name in FEATURES}
+                weights.update({FEATURES[i]: x for i, x in zip(active, w)})
+                return cls(weights, len(samples))
+            active = [i for i in active if i not in negative]
+        return cls()
+
+    @classmethod
+    def from_samples(cls, samples: Dict[str, Sequence[float]]) -> "CostModel":
+        """Calibrate from [seconds, tasks, depth, parallel, sql_kb] rows (Catalog.cost_samples)."""
+        return cls.calibrated([(CostFeatures(*row[1:5]), row[0]) for row in samples.values()])
+
+    @classmethod
+    def from_report(cls, path: Path) -> "CostModel":
+        """
+        Calibrate from the "costs" section of a previous build report, if there
+        is one: the samples of every workflow measured so far, or (reports
+        without them) the workflows built in that run.
+        """
+        try:
+            costs = json.loads(Path(path).read_text(encoding="utf-8"))["sections"].get("costs") or {}
+        except (OSError, ValueError, KeyError):
+            return cls()
+        if costs.get("samples"):
+            return cls.from_samples(costs["samples"])
+        samples = [(CostFeatures(*row[2:6]), row[1]) for row in costs.get("workflows", {}).values()]
+        return cls.calibrated(samples)
+
+
+def _least_squares(rows: List[List[float]], y: List[float]) -> Optional[List[float]]:
+    """Solve the normal equations (with a tiny ridge) by Gaussian elimination."""
+    n = len(rows[0])
+    a = [[sum(r[i] * r[j] for r in rows) + (1e-9 if i == j else 0.0) for j in range(n)] for i in range(n)]
+    b = [sum(r[i] * t for r, t in zip(rows, y)) for i in range(n)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(a[r][col]))
+        if abs(a[pivot][col]) < 1e-12:
+            return None
+        a[col], a[pivot], b[col], b[pivot] = a[pivot], a[col], b[pivot], b[col]
+        for r in range(n):
+            if r != col:
+                factor = a[r][col] / a[col][col]
+                a[r] = [x - factor * p for x, p in zip(a[r], a[col])]
+                b[r] -= factor * b[col]
+    return [b[i] / a[i][i] for i in range(n)]
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import json
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+
+class BuildReport:
+    """
+    Counters and stage timings for one run, written to graphs/build_report.json
+    so runs can be compared.
+
+    Stage timings are exclusive: time spent in a stage opened inside another
+    one is only counted for the inner stage, so the stages add up to the run.
+    """
+
+    def __init__(self) -> None:
+        self.sections: Dict[str, Dict[str, Any]] = {}
+        self.timings: Dict[str, float] = {}
+        self._nested: List[float] = []
+
+    def set(self, section: str, **values: Any) -> None:
+        self.sections.setdefault(section, {}).update(values)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        self._nested.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - t0
+            inner = self._nested.pop()
+            self.timings[name] = self.timings.get(name, 0.0) + elapsed - inner
+            if self._nested:
+                self._nested[-1] += elapsed
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "sections": self.sections,
+            "timings": {k: round(v, 4) for k, v in self.timings.items()},
+        }
+
+    def write(self, path: Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_json(), indent=1, sort_keys=True), encoding="utf-8")
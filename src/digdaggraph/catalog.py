@@ -0,0 +1,386 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from . import __version__, vfs
+from .logging_config import get_logger
+from .workflow_info import WorkflowInfo
+
+logger = get_logger(__name__)
+
+# Bump when the schema or the rendered output changes incompatibly; the
+# catalog is then rebuilt from scratch on the next run.
+CATALOG_VERSION = 1
+# Builds kept in `runs`/`timings`; older ones are dropped as new ones are recorded
+RUNS_KEPT = 100
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS workflows (
+    path TEXT PRIMARY KEY,
+    project TEXT NOT NULL,
+    workflow TEXT NOT NULL,
+    href TEXT,
+    schedule TEXT,
+    timezone TEXT,
+    fingerprint TEXT,
+    related_hash TEXT,
+    info TEXT NOT NULL,
+    updated REAL
+);
+CREATE INDEX IF NOT EXISTS workflows_project ON workflows(project);
+CREATE TABLE IF NOT EXISTS tasks (
+    workflow_path TEXT NOT NULL,
+    task TEXT,
+    operator TEXT,
+    database TEXT,
+    engine TEXT,
+    priority INTEGER,
+    retry INTEGER
+);
+CREATE INDEX IF NOT EXISTS tasks_workflow ON tasks(workflow_path);
+CREATE INDEX IF NOT EXISTS tasks_engine ON tasks(engine);
+CREATE INDEX IF NOT EXISTS tasks_operator ON tasks(operator);
+CREATE TABLE IF NOT EXISTS sql_tables (
+    workflow_path TEXT NOT NULL,
+    task TEXT,
+    sql TEXT,
+    tbl TEXT NOT NULL,
+    mode TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sql_tables_workflow ON sql_tables(workflow_path);
+CREATE INDEX IF NOT EXISTS sql_tables_tbl ON sql_tables(tbl);
+CREATE TABLE IF NOT EXISTS inputs (
+    workflow_path TEXT NOT NULL,
+    input TEXT NOT NULL,
+    kind TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS inputs_workflow ON inputs(workflow_path);
+CREATE INDEX IF NOT EXISTS inputs_input ON inputs(input);
+CREATE TABLE IF NOT EXISTS edges (
+    workflow_path TEXT NOT NULL,
+    src TEXT NOT NULL,
+    dst TEXT NOT NULL,
+    kind TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS edges_workflow ON edges(workflow_path);
+CREATE INDEX IF NOT EXISTS edges_src ON edges(src);
+CREATE INDEX IF NOT EXISTS edges_dst ON edges(dst);
+CREATE TABLE IF NOT EXISTS outputs (
+    path TEXT PRIMARY KEY,
+    workflow_path TEXT,
+    sha1 TEXT NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outputs_workflow ON outputs(workflow_path);
+CREATE TABLE IF NOT EXISTS search_docs (
+    id INTEGER PRIMARY KEY,
+    href TEXT UNIQUE NOT NULL,
+    source TEXT,
+    signature TEXT,
+    tokens TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cost_samples (
+    workflow_path TEXT PRIMARY KEY,
+    seconds REAL NOT NULL,
+    tasks INTEGER,
+    depth INTEGER,
+    parallel INTEGER,
+    sql_kb REAL,
+    updated REAL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started REAL,
+    finished REAL,
+    tool TEXT,
+    sections TEXT
+);
+CREATE TABLE IF NOT EXISTS timings (
+    run_id INTEGER NOT NULL,
+    stage TEXT NOT NULL,
+    seconds REAL NOT NULL
+);
+"""
+
+# Child tables replaced wholesale whenever a workflow is re-recorded
+_PER_WORKFLOW = ("tasks", "sql_tables", "inputs", "edges")
+
+
+def file_signature(path: str) -> str:
+    """Cheap change detector: mtime + size (archive members: their stamp), or "missing"."""
+    stamp = vfs.signature(path)
+    if stamp is not None:
+        return stamp
+    try:
+        st = os.stat(path)
+    except OSError:
+        return "missing"
+    return f"{st.st_mtime_ns}:{st.st_size}"
+
+
+def inputs_fingerprint(paths: Iterable[str]) -> str:
+    h = hashlib.sha1()
+    for p in sorted(set(paths)):
+        h.update(f"{p}\0{file_signature(p)}\n".encode("utf-8", "surrogatepass"))
+    return h.hexdigest()
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def file_hash(path: str) -> Optional[Tuple[str, int]]:
+    try:
+        data = Path(path).read_bytes()
+    except OSError:
+        return None
+    return hashlib.sha1(data).hexdigest(), len(data)
+
+
+def _input_kind(path: str) -> str:
+    suffix = Path(path).suffix.lower()
+    if suffix == ".sql":
+        return "sql"
+    if suffix == ".dig":
+        return "dig"
+    return "include"
+
+
+class Catalog:
+    """
+    SQLite store of everything a build learns about the repo (graphs/catalog.sqlite).
+
+    Per workflow: its WorkflowInfo, the fingerprint of every input it read, a
+    hash of its cross-workflow section, plus normalized rows (tasks with td
+    meta and retry, SQL table usage, inputs, call/require/wait edges) for
+    ad-hoc queries, and the measured build seconds of its last rebuild with the
+    cost features they were measured at (kept across full rebuilds, to
+    calibrate build_cost). Per run (the last RUNS_KEPT): stage timings and report
+    sections. Writes are batched into a single transaction committed by `save()`.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else None
+        if self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path) if self.path else ":memory:")
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        if self._meta("version") != str(CATALOG_VERSION) or self._meta("tool") != __version__:
+            self._reset()
+
+    # ---- helpers ----
+    def _meta(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _reset(self) -> None:
+        if self._meta("version") is not None:
+            logger.info(f"Catalog {self.path} is from another version; rebuilding it")
+        with self.conn:
+            for table in ("workflows", "outputs", "search_docs") + _PER_WORKFLOW:
+                self.conn.execute(f"DELETE FROM {table}")
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [("version", str(CATALOG_VERSION)), ("tool", __version__)],
+            )
+
+    def option_changed(self, name: str, value: str, default: str) -> bool:
+        """
+        Store a build option; True if it differs from the previous run's value
+        (`default` stands in for catalogs written before the option existed).
+        """
+        key = f"option:{name}"
+        old = self._meta(key) or default
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+        return old != value
+
+    def clear(self) -> None:
+        """Forget every workflow (forces a full rebuild)."""
+        for table in ("workflows",) + _PER_WORKFLOW:
+            self.conn.execute(f"DELETE FROM {table}")
+
+    # ---- incremental decisions ----
+    def paths(self) -> List[str]:
+        return [r[0] for r in self.conn.execute("SELECT path FROM workflows")]
+
+    def fresh_info(self, dig_path: str, html_path: str) -> Optional[WorkflowInfo]:
+        """Stored info for `dig_path` if none of its inputs changed, else None."""
+        row = self.conn.execute(
+            "SELECT fingerprint, info FROM workflows WHERE path = ?", (dig_path,)
+        ).fetchone()
+        if not row or not os.path.exists(html_path):
+            return None
+        inputs = [r[0] for r in self.conn.execute("SELECT input FROM inputs WHERE workflow_path = ?", (dig_path,))]
+        if inputs_fingerprint(inputs) != row[0]:
+            return None
+        return WorkflowInfo.from_dict(json.loads(row[1]))
+
+    def related_hash(self, dig_path: str) -> Optional[str]:
+        row = self.conn.execute("SELECT related_hash FROM workflows WHERE path = ?", (dig_path,)).fetchone()
+        return row[0] if row else None
+
+    # ---- writes (committed by save) ----
+    def record(self, info: WorkflowInfo, related_hash: str) -> None:
+        p = info.path
+        for table in _PER_WORKFLOW:
+            self.conn.execute(f"DELETE FROM {table} WHERE workflow_path = ?", (p,))
+        self.conn.execute(
+            "INSERT OR REPLACE INTO workflows "
+            "(path, project, workflow, href, schedule, timezone, fingerprint, related_hash, info, updated) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                p,
+                info.project,
+                info.workflow,
+                info.href,
+                json.dumps(info.schedule, default=str) if info.schedule is not None else None,
+                info.timezone,
+                inputs_fingerprint(info.inputs),
+                related_hash,
+                json.dumps(info.to_dict(), separators=(",", ":"), default=str),
+                time.time(),
+            ),
+        )
+        self.conn.executemany(
+            "INSERT INTO tasks (workflow_path, task, operator, database, engine, priority, retry) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(p, t.task, t.operator, t.database, t.engine, t.priority, t.retry) for t in info.tasks],
+        )
+        self.conn.executemany(
+            "INSERT INTO sql_tables (workflow_path, task, sql, tbl, mode) VALUES (?, ?, ?, ?, ?)",
+            [
+                (p, ref.task, ref.path, name, mode)
+                for ref in info.sql_refs
+                for mode, names in (("read", ref.reads), ("write", ref.writes))
+                for name in names
+            ],
+        )
+        self.conn.executemany(
+            "INSERT INTO inputs (workflow_path, input, kind) VALUES (?, ?, ?)",
+            [(p, i, _input_kind(i)) for i in sorted(set(info.inputs))],
+        )
+        edges = [(p, target, info.key, op) for op, target in info.calls]
+        edges += [(p, f"table:{t}", info.key, "wait") for t in info.waits]
+        self.conn.executemany("INSERT INTO edges (workflow_path, src, dst, kind) VALUES (?, ?, ?, ?)", edges)
+
+    def record_output(self, out_path: str, workflow_path: Optional[str] = None) -> None:
+        digest = file_hash(out_path)
+        if digest is None:
+            return
+        self.conn.execute(
+            "INSERT OR REPLACE INTO outputs (path, workflow_path, sha1, size) VALUES (?, ?, ?, ?)",
+            (out_path, workflow_path, digest[0], digest[1]),
+        )
+
+    def retain(self, dig_paths: Iterable[str]) -> List[str]:
+        """Drop workflows (and their rows) that no longer exist; returns their paths."""
+        keep = set(dig_paths)
+        gone = [(p,) for p in self.paths() if p not in keep]
+        if not gone:
+            return []
+        for table in _PER_WORKFLOW + ("outputs", "cost_samples"):
+            self.conn.executemany(f"DELETE FROM {table} WHERE workflow_path = ?", gone)
+        self.conn.executemany("DELETE FROM workflows WHERE path = ?", gone)
+        return [p for (p,) in gone]
+
+    def search_docs(self) -> Dict[str, Tuple[int, str, str, str]]:
+        """SQL search documents: href -> (id, source, signature, space-separated tokens)."""
+        return {
+            r[0]: (r[1], r[2], r[3], r[4])
+            for r in self.conn.execute("SELECT href, id, source, signature, tokens FROM search_docs")
+        }
+
+    def record_search_doc(self, href: str, source: str, signature: str, tokens: str) -> int:
+        """Insert or update a search document; its id is kept for as long as the page exists."""
+        self.conn.execute(
+            "INSERT INTO search_docs (href, source, signature, tokens) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(href) DO UPDATE SET source = excluded.source, "
+            "signature = excluded.signature, tokens = excluded.tokens",
+            (href, source, signature, tokens),
+        )
+        return self.conn.execute("SELECT id FROM search_docs WHERE href = ?", (href,)).fetchone()[0]
+
+    def drop_search_docs(self, hrefs: Iterable[str]) -> None:
+        self.conn.executemany("DELETE FROM search_docs WHERE href = ?", [(h,) for h in hrefs])
+
+    def record_cost(self, dig_path: str, seconds: float, features: Sequence[float]) -> None:
+        """Store a workflow's latest parse + render seconds and its (tasks, depth, parallel, sql_kb)."""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO cost_samples "
+            "(workflow_path, seconds, tasks, depth, parallel, sql_kb, updated) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (dig_path, seconds, *features, time.time()),
+        )
+
+    def cost_samples(self) -> Dict[str, List[float]]:
+        """workflow path -> [seconds, tasks, depth, parallel, sql_kb] of every workflow measured so far."""
+        return {
+            r[0]: list(r[1:])
+            for r in self.conn.execute(
+                "SELECT workflow_path, seconds, tasks, depth, parallel, sql_kb "
+                "FROM cost_samples ORDER BY workflow_path"
+            )
+        }
+
+    def record_run(
+        self,
+        started: float,
+        timings: Dict[str, float],
+        sections: Dict[str, Any],
+        keep: int = RUNS_KEPT,
+    ) -> None:
+        """Record a build and drop all but the last `keep` (same transaction)."""
+        cur = self.conn.execute(
+            "INSERT INTO runs (started, finished, tool, sections) VALUES (?, ?, ?, ?)",
+            (started, time.time(), __version__, json.dumps(sections, default=str)),
+        )
+        self.conn.executemany(
+            "INSERT INTO timings (run_id, stage, seconds) VALUES (?, ?, ?)",
+            [(cur.lastrowid, stage, secs) for stage, secs in timings.items()],
+        )
+        # Run ids only grow (AUTOINCREMENT), so the oldest runs are the lowest ids
+        cutoff = cur.lastrowid - keep
+        self.conn.execute("DELETE FROM timings WHERE run_id <= ?", (cutoff,))
+        self.conn.execute("DELETE FROM runs WHERE id <= ?", (cutoff,))
+
+    def save(self) -> None:
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.commit()
+        self.conn.close()
+
+    # ---- reads ----
+    def all_infos(self) -> List[WorkflowInfo]:
+        return [
+            WorkflowInfo.from_dict(json.loads(r[0]))
+            for r in self.conn.execute("SELECT info FROM workflows ORDER BY path")
+        ]
+
+    def query(self, sql: str, params: Sequence[Any] = ()) -> Tuple[List[str], List[Tuple[Any, ...]]]:
+        """
+        Run `sql` on the catalog's own (writable) connection; returns (column
+        names, rows). Ad-hoc SQL goes through query_catalog instead.
+        """
+        cur = self.conn.execute(sql, params)
+        cols = [d[0] for d in cur.description or ()]
+        return cols, cur.fetchall()
+
+
+def query_catalog(path: Path, sql: str, params: Sequence[Any] = ()) -> Tuple[List[str], List[Tuple[Any, ...]]]:
+    """Run `sql` against a catalog opened read-only (ad-hoc queries can't modify it)."""
+    # as_uri() percent-encodes the path, so "#" or "?" in a directory name survive
+    conn = sqlite3.connect(Path(path).resolve().as_uri() + "?mode=ro", uri=True)
+    try:
+        cur = conn.execute(sql, params)
+        return [d[0] for d in cur.description or ()], cur.fetchall()
+    finally:
+        conn.close()
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from . import vfs
+from .logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class Problem:
+    path: str
+    task: str
+    kind: str  # include | call | sql | cron | retry | load
+    message: str
+
+    def __str__(self) -> str:
+        where = f"{self.path}: {self.task}" if self.task else self.path
+        return f"{where}: {self.kind}: {self.message}"
+
+
+def workflows_for(paths: Sequence[str], catalog_path: Optional[Path] = None) -> Tuple[List[Path], List[str]]:
+    """
+    The .dig files to check for `paths`: .dig files as given, directories
+    searched recursively, and for any other file (an include or SQL file) the
+    workflows that read it according to the catalog. Returns (workflows, skipped).
+    """
+    digs: dict = {}
+    others: List[str] = []
+    for p in paths:
+        path = Path(p)
+        if path.is_dir() or (vfs.exists(path) and not vfs.is_file(path)):
+            for d in sorted(vfs.rglob(path, "*.dig")):
+                digs[d.resolve()] = None
+        elif path.suffix == ".dig":
+            digs[path.resolve()] = None
+        else:
+            others.append(p)
+
+    skipped: List[str] = []
+    if others:
+        from .catalog import query_catalog
+
+        if catalog_path is None or not Path(catalog_path).exists():
+            return list(digs), others
+        for p in others:
+            _cols, rows = query_catalog(
+                catalog_path, "SELECT DISTINCT workflow_path FROM inputs WHERE input = ?", (str(Path(p).resolve()),)
+            )
+            if not rows:
+                skipped.append(p)
+            for (wf,) in rows:
+                if vfs.exists(wf):
+                    digs[Path(wf)] = None
+    return list(digs), skipped
+
+
+def check_workflows(dig_files: Iterable[Path]) -> List[Problem]:
+    """
+    Parse each workflow exactly as a build would (includes, _export chain,
+    operator handling, SQL reference resolution) but without reading SQL,
+    rendering or writing anything, and collect its problems.
+    """
+    from .graph_generate import build_workflow
+    from .schedule_expand import spec_for_schedule
+    from .sql_resolver import SqlResolver
+
+    sql = SqlResolver()
+    problems: List[Problem] = []
+    for dig in dig_files:
+        path = str(dig)
+        built = build_workflow(path, sql=sql, pages=False)
+        if built is None:
+            problems.append(Problem(path, "", "load", "could not be parsed (see log)"))
+            continue
+        _root, info = built
+        problems += [Problem(path, task, kind, msg) for task, kind, msg in info.issues]
+        problems += [
+            Problem(path, task, "sql", f"SQL file not found: {ref} ({reason})")
+            for task, ref, reason in info.unresolved_sql
+        ]
+        if info.schedule is not None:
+            try:
+                spec_for_schedule(info.schedule)
+            except (ValueError, TypeError) as e:
+                problems.append(Problem(path, "schedule", "cron", str(e)))
+    return problems
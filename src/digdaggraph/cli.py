@@ -1,107 +1,1107 @@
+import argparse
+import os
+import sys
 import time
 from pathlib import Path
-import os
-from .constants import GRAPHS_DIR, SCHEDULE_INDEX_FILE, UNSCHEDULED_INDEX_FILE
-from .graph_generate import generate_graph
-from .index_page import write_scheduled_workflows, ScheduleEntry, write_unscheduled_workflows
+from typing import List, Optional
+
+from .constants import (
+    ASSETS_DIR,
+    BUILD_REPORT_FILE,
+    CACHE_DIR,
+    CATALOG_FILE,
+    DEFAULT_HEATMAP_DAYS,
+    DEFAULT_HISTORY_ATTEMPTS,
+    DEFAULT_LABEL_BUDGET,
+    DEFAULT_LAYOUT_TIMEOUT,
+    DEPENDENCY_INDEX_FILE,
+    DEPENDENCY_INDEX_JSON,
+    GRAPHS_DIR,
+    HISTORY_CACHE_FILE,
+    LAYOUT_CACHE_DAYS,
+    LAYOUT_CACHE_DIR,
+    LAYOUT_ENGINES,
+    SCHEDULE_HEATMAP_FILE,
+    SCHEDULE_HEATMAP_JSON,
+    RENDER_MODES,
+    SCHEDULE_INDEX_FILE,
+    SEARCH_DIR,
+    SHARDS_DIR,
+    SLOWEST_WORKFLOWS_FILE,
+    SQL_SEARCH_FILE,
+    TABLE_INDEX_FILE,
+    TABLE_INDEX_JSON,
+    UNSCHEDULED_INDEX_FILE,
+)
 from .logging_config import get_logger
 
+# Keep this module's imports to the stdlib and constants: graphviz, yaml and
+# cron_descriptor are only pulled in by the subsystems that need them, so
+# `--help`, `index` and no-op incremental builds start fast.
+
 logger = get_logger(__name__)
 
 
+def _cache_dir() -> Path:
+    return Path(GRAPHS_DIR) / CACHE_DIR
+
+
+def _catalog_path() -> Path:
+    return Path(GRAPHS_DIR) / CATALOG_FILE
+
+
 def _label_for_schedule(schedule_obj) -> str:
     """
-    Build a robust label for the schedule table row.
-    Prefer cron humanization when possible, but never fail the row.
+    Build a robust label for the schedule table row (memoized, never fails).
     """
-    try:
-        import yaml
-        label_core = yaml.safe_dump(schedule_obj).strip()
-    except Exception:
-        import json
+    from .schedule_labels import LABELS
+
+    return LABELS.row_label(schedule_obj)
 
-        label_core = f"{schedule_obj!r}" if isinstance(schedule_obj, str) else json.dumps(schedule_obj)
 
-    # Try to humanize cron, but never make this fatal
+def _mount_inputs(args, extra=()) -> bool:
+    """
+    Mount the --git-ref revision and the --archive inputs (and `extra` archive
+    paths) over the working tree; False on a bad ref or archive.
+    """
+    from . import vfs
+
+    vfs.unmount_all()
     try:
-        if isinstance(schedule_obj, dict) and "cron>" in schedule_obj:
-            from cron_descriptor import get_description
+        if getattr(args, "git_ref", None):
+            vfs.mount_git(args.git_ref, Path(os.getcwd()))
+        vfs.mount_archives(list(getattr(args, "archive", None) or []) + list(extra), Path(os.getcwd()))
+    except ValueError as e:
+        print(f"Error: {e}")
+        return False
+    return True
 
-            return f"{label_core}\n{get_description(schedule_obj['cron>'])}"
-    except Exception as e:
-        logger.warning(f"cron description failed: {e}")
 
-    return f"schedule\n{label_core}"
+def _report_inputs(report) -> None:
+    from . import vfs
 
+    if vfs.mounts():
+        report.set("inputs", mounted=[f"{m.source} at {m.root}" for m in vfs.mounts()])
 
-def main() -> None:
-    start_time = time.time()
-    count = 0
-    Path(GRAPHS_DIR).mkdir(exist_ok=True)
-    schedule_entries: list[ScheduleEntry] = []
-    unscheduled_entries: list[ScheduleEntry] = []  
 
-    # Discover .dig files
-    dig_files = [p for p in Path(os.getcwd()).rglob("*.dig") if GRAPHS_DIR not in str(p)]
-    logger.info(f"Found {len(dig_files)} .dig files")
+def _layout_cache(args):
+    """Stored Graphviz layouts by graph content; `--force` lays every graph out again."""
+    from .dot_layout import LayoutCache
+
+    return LayoutCache(_cache_dir() / LAYOUT_CACHE_DIR, read=not getattr(args, "force", False))
+
+
+def _report_layout_cache(report, cache) -> None:
+    removed = cache.prune(LAYOUT_CACHE_DAYS)
+    if cache.hits or cache.misses or removed:
+        report.set("layout_cache", hits=cache.hits, misses=cache.misses, pruned=removed)
 
+
+def _discover() -> List[Path]:
+    from . import vfs
+
+    return vfs.rglob(Path(os.getcwd()), "*.dig")
+
+
+def _output_stem(path: Path) -> str:
+    out_dir = Path(os.getcwd()) / GRAPHS_DIR / path.parent.name
+    return str(out_dir / path.name.replace(".dig", ""))
+
+
+def _parse_all(dig_files, lineage, report=None, sql=None, seconds=None, label_budget=DEFAULT_LABEL_BUDGET):
+    """Pass 1: parse every workflow once (tree + metadata). `seconds` collects time per workflow path."""
+    from .graph_generate import build_workflow
+    from .sql_resolver import SqlResolver
+
+    if sql is None:
+        sql = SqlResolver()
+    built = []
     for path in dig_files:
-        input_file_path = path
-        out_dir = Path(os.getcwd()) / GRAPHS_DIR / path.parent.name
-        out_dir.mkdir(parents=True, exist_ok=True)
-        output_dot_file = str(out_dir / path.name.replace(".dig", ""))
-        logger.info(f"BEGIN generating graph for {input_file_path}")
-        print(f"Generating graph for {input_file_path} → {output_dot_file}")
+        output_dot_file = _output_stem(path)
+        Path(output_dot_file).parent.mkdir(parents=True, exist_ok=True)
+        logger.info(f"BEGIN parsing {path}")
+        t0 = time.perf_counter()
+        result = build_workflow(str(path), lineage=lineage, report=report, sql=sql, label_budget=label_budget)
+        if seconds is not None:
+            seconds[str(path)] = seconds.get(str(path), 0.0) + time.perf_counter() - t0
+        if result is None:
+            logger.error(f"FAILED parsing {path}")
+            continue
+        root, info = result
+        built.append((root, info, output_dot_file))
+    return built
+
+
+def _remove_outputs(dig_path: Path) -> None:
+    """Delete the page, SVG, DOT source and node details of a workflow that no longer exists."""
+    from .node_details import DETAILS_SUFFIX
+
+    stem = _output_stem(dig_path)
+    for suffix in ("", ".svg", ".html", DETAILS_SUFFIX):
         try:
-            generate_graph(input_filepath=str(input_file_path), output_dot_file=output_dot_file)
-            count += 1
-            logger.info(f"COMPLETE generating graph for {input_file_path}")
+            os.remove(stem + suffix)
+            logger.info(f"Removed stale output {stem + suffix}")
+        except OSError:
+            pass
+
+
+def _render_all(
+    built,
+    related,
+    report=None,
+    mode: str = "svg",
+    layout: str = "auto",
+    layout_timeout=None,
+    profiles=None,
+    seconds=None,
+    layout_cache=None,
+) -> int:
+    """Pass 2: render pages; returns how many succeeded. `seconds` collects time per workflow path."""
+    if not built:
+        return 0
+    from .graph_generate import render_workflow
+
+    if mode == "client":
+        from .graph_model import install_layout_asset
+
+        install_layout_asset(Path(GRAPHS_DIR) / ASSETS_DIR)
+
+    count = 0
+    for root, info, output_dot_file in built:
+        logger.info(f"BEGIN generating graph for {info.path}")
+        print(f"Generating graph for {info.path} → {output_dot_file}")
+        t0 = time.perf_counter()
+        try:
+            if render_workflow(root, info, output_dot_file, related[info.path], report=report, mode=mode, layout=layout, layout_timeout=layout_timeout, profiles=profiles, layout_cache=layout_cache):
+                count += 1
+                logger.info(f"COMPLETE generating graph for {info.path}")
         except Exception as e:
-            logger.error(f"FAILED generating graph for {input_file_path}: {e}", exc_info=True)
+            logger.error(f"FAILED generating graph for {info.path}: {e}", exc_info=True)
             # continue on other files
             continue
+        finally:
+            if seconds is not None:
+                seconds[info.path] = seconds.get(info.path, 0.0) + time.perf_counter() - t0
+    return count
+
 
-        # Collect schedule entry (robust, never fatal)
+def _cost_model(path: Optional[str], catalog=None):
+    """
+    Cost estimates calibrated from the given build report, else from every
+    workflow measured so far (the catalog), else from the previous report here.
+    """
+    from .build_cost import CostModel
+
+    if path:
+        return CostModel.from_report(Path(path))
+    samples = catalog.cost_samples() if catalog is not None else {}
+    if samples:
+        return CostModel.from_samples(samples)
+    return CostModel.from_report(Path(GRAPHS_DIR) / BUILD_REPORT_FILE)
+
+
+def _rel_key(path: str) -> str:
+    return Path(os.path.relpath(path)).as_posix()
+
+
+def _report_costs(report, seconds, model, catalog=None) -> None:
+    """
+    Estimated vs. actual parse + render seconds of every workflow built in this
+    run. With `catalog` these become the workflows' cost samples, and the
+    section also lists every sample so far (what --cost-calibration reads).
+    """
+    from .build_cost import features_for
+
+    rows = {}
+    for path, actual in seconds.items():
+        f = features_for(Path(path))
+        if catalog is not None:
+            catalog.record_cost(path, actual, f.vector()[1:])
+        rows[_rel_key(path)] = [
+            round(model.estimate(f), 4),
+            round(actual, 4),
+            f.tasks,
+            f.depth,
+            f.parallel,
+            round(f.sql_kb, 1),
+        ]
+    samples = {_rel_key(p): row for p, row in catalog.cost_samples().items()} if catalog is not None else {}
+    if rows or samples:
+        label = f"calibrated on {model.samples} workflows" if model.samples else "default weights"
+        _set_costs(report, label, rows, samples)
+
+
+def _set_costs(report, model: str, rows, samples=None) -> None:
+    errors = sorted(abs(est - actual) / actual for est, actual, *_f in rows.values() if actual > 0)
+    report.set(
+        "costs",
+        model=model,
+        median_error=round(errors[len(errors) // 2], 3) if errors else None,
+        workflows=rows,
+        **({"samples": samples} if samples else {}),
+    )
+
+
+def _schedule_entries(workflows):
+    """Split workflows into scheduled / unscheduled index rows (robust, never fatal)."""
+    from .index_page import ScheduleEntry
+
+    schedule_entries = []
+    unscheduled_entries = []
+    for info in workflows:
         try:
-            import yaml
-            from .yaml_includes import DigLoader, resolve_includes
-
-            with open(input_file_path, encoding="utf-8") as f:
-                data_raw = yaml.load(f, Loader=DigLoader)
-                data = resolve_includes(data_raw) or {}
-            href = f"./{GRAPHS_DIR}/{path.parent.name}/{path.name.replace('.dig','.html')}"
-            if "schedule" in data:
-                label = _label_for_schedule(data["schedule"])
+            if info.schedule is not None:
                 schedule_entries.append(
                     ScheduleEntry(
-                        project=path.parent.name,
-                        workflow=path.name,
-                        schedule_text=label,
-                        href=href,
+                        project=info.project,
+                        workflow=info.workflow,
+                        schedule_text=_label_for_schedule(info.schedule),
+                        href=info.href,
                     )
                 )
             else:
-                # NEW: track unscheduled
                 unscheduled_entries.append(
                     ScheduleEntry(
-                        project=path.parent.name,
-                        workflow=path.name,
+                        project=info.project,
+                        workflow=info.workflow,
                         schedule_text="",   # ignored by the unscheduled page
-                        href=href,
+                        href=info.href,
                     )
                 )
         except Exception as e:
-            logger.warning(f"Schedule collection failed for {input_file_path}: {e}")
+            logger.warning(f"Schedule collection failed for {info.path}: {e}")
+    return schedule_entries, unscheduled_entries
+
 
-    # Always write the index
+def _write_indexes(workflows, deps, report, heat_days: int) -> None:
+    """Write every cross-workflow page from collected WorkflowInfo (no parsing)."""
+    from .dep_graph import render_overview_svg
+    from .index_page import (
+        write_dependency_index,
+        write_schedule_heatmap,
+        write_scheduled_workflows,
+        write_table_index,
+        write_slowest_workflows,
+        write_unscheduled_workflows,
+    )
+    from .schedule_expand import expand_schedules
+    from .sql_lineage import build_table_usage
+
+    schedule_entries, unscheduled_entries = _schedule_entries(workflows)
     write_scheduled_workflows(schedule_entries, out_path=SCHEDULE_INDEX_FILE)
     write_unscheduled_workflows(unscheduled_entries, out_path=UNSCHEDULED_INDEX_FILE)
+    usage = build_table_usage(workflows)
+    write_table_index(usage, out_path=TABLE_INDEX_FILE, json_path=TABLE_INDEX_JSON)
+    write_dependency_index(
+        deps,
+        render_overview_svg(deps, _cache_dir()) if deps.edges else None,
+        out_path=DEPENDENCY_INDEX_FILE,
+        json_path=DEPENDENCY_INDEX_JSON,
+    )
+    heat = expand_schedules(workflows, days=heat_days)
+    write_schedule_heatmap(heat, out_path=SCHEDULE_HEATMAP_FILE, json_path=SCHEDULE_HEATMAP_JSON)
+    write_slowest_workflows(workflows, out_path=SLOWEST_WORKFLOWS_FILE)
+
+    report.set(
+        "workflows",
+        total=len(workflows),
+        scheduled=len(schedule_entries),
+        unscheduled=len(unscheduled_entries),
+    )
+    report.set("tables", count=len(usage))
+    report.set(
+        "dependencies",
+        edges=sum(len(vs) for vs in deps.edges.values()),
+        cycles=deps.cycles,
+    )
+    report.set(
+        "schedule_heatmap",
+        days=heat_days,
+        fires=sum(heat.counts),
+        peak_per_hour=max(heat.counts, default=0),
+        errors=heat.errors,
+    )
+
+
+def _write_search(workflows, catalog, report) -> None:
+    """Update the sharded SQL search index (only changed SQL files are re-tokenized) and its page."""
+    from .index_page import write_sql_search_page
+    from .sql_search import SEARCH_VERSION, STOP_WORDS, update_search_index
+
+    stats = update_search_index(workflows, catalog, Path(GRAPHS_DIR) / SEARCH_DIR)
+    write_sql_search_page(sorted(STOP_WORDS), SEARCH_VERSION, out_path=SQL_SEARCH_FILE)
+    report.set(
+        "sql_search",
+        docs=stats.docs,
+        tokenized=stats.tokenized,
+        removed=stats.removed,
+        files_written=stats.files_written,
+        files_removed=stats.files_removed,
+    )
+
+
+_INDEX_PAGES = (
+    SCHEDULE_INDEX_FILE,
+    UNSCHEDULED_INDEX_FILE,
+    TABLE_INDEX_FILE,
+    TABLE_INDEX_JSON,
+    DEPENDENCY_INDEX_FILE,
+    DEPENDENCY_INDEX_JSON,
+    SCHEDULE_HEATMAP_FILE,
+    SCHEDULE_HEATMAP_JSON,
+    SQL_SEARCH_FILE,
+    SLOWEST_WORKFLOWS_FILE,
+)
+
+
+def _print_summary(report, elapsed: float) -> None:
+    s = report.sections
+    wf = s.get("workflows", {})
+    lin = s.get("sql_lineage", {})
+    deps = s.get("dependencies", {})
+    heat = s.get("schedule_heatmap", {})
+    labels = s.get("schedule_labels", {})
+    print(f"Graphs generated: {wf.get('rendered', 0)} | reused: {wf.get('reused', 0)} | TIME: {elapsed:.2f}s")
+    print(f"Workflows: {wf.get('total', 0)} | scheduled: {wf.get('scheduled', 0)} | unscheduled: {wf.get('unscheduled', 0)}")
+    print(f"Tables: {s.get('tables', {}).get('count', 0)} | SQL lineage cache: {lin.get('hits', 0)} hits, {lin.get('misses', 0)} misses")
+    print(f"Dependencies: {deps.get('edges', 0)} edges | cycles: {len(deps.get('cycles', []))}")
+    print(f"Schedule fires in next {heat.get('days', 0)} days: {heat.get('fires', 0)} | peak/hour: {heat.get('peak_per_hour', 0)}")
+    print(
+        f"Schedule labels: {labels.get('hits', 0)} hits, {labels.get('misses', 0)} misses "
+        f"| cron_descriptor calls: {labels.get('cron_descriptor_calls', 0)}"
+    )
+    costs = s.get("costs")
+    if costs:
+        top = sorted(costs["workflows"].items(), key=lambda kv: -kv[1][1])[:5]
+        err = costs.get("median_error")
+        print(
+            f"Cost estimates ({costs['model']}): median error {err * 100:.0f}%" if err is not None
+            else f"Cost estimates ({costs['model']})"
+        )
+        for path, (estimate, actual, *_features) in top:
+            print(f"  {path}: estimated {estimate:.2f}s, actual {actual:.2f}s")
+    cache = s.get("layout_cache")
+    if cache:
+        print(f"Layout cache: {cache['hits']} hits, {cache['misses']} misses | pruned: {cache['pruned']}")
+    hist = s.get("history")
+    if hist:
+        print(f"Attempt history: {hist['attempts']} attempts | workflows with durations: {hist['workflows']}")
+    search = s.get("sql_search")
+    if search:
+        print(f"SQL search: {search['docs']} files | re-tokenized: {search['tokenized']} | index files written: {search['files_written']}")
+    degraded = s.get("degraded", {})
+    if degraded:
+        modes: dict = {}
+        for d in degraded.values():
+            modes[d["mode"]] = modes.get(d["mode"], 0) + 1
+        print(f"Degraded layouts: {len(degraded)} ({', '.join(f'{m}: {n}' for m, n in sorted(modes.items()))})")
+    print(
+        f"Wrote {SCHEDULE_INDEX_FILE}, {UNSCHEDULED_INDEX_FILE}, {TABLE_INDEX_FILE}, "
+        f"{DEPENDENCY_INDEX_FILE}, {SCHEDULE_HEATMAP_FILE}, {SQL_SEARCH_FILE} and {SLOWEST_WORKFLOWS_FILE}"
+    )
+
+
+def _report_sql_refs(report, workflows) -> None:
+    """SQL references that resolved to no file, per workflow (reused ones included)."""
+    unresolved = [
+        f"{info.key} {task}: {ref} ({reason})" for info in workflows for task, ref, reason in info.unresolved_sql
+    ]
+    report.set(
+        "sql_refs",
+        resolved=sum(len(info.sql_refs) for info in workflows),
+        unresolved=len(unresolved),
+        paths=unresolved[:200],
+    )
+    if unresolved:
+        print(f"Unresolved SQL references: {len(unresolved)} (see {GRAPHS_DIR}/{BUILD_REPORT_FILE})")
+
+
+def _stage_site(args, workflows, report) -> None:
+    from .site import deployable_files, site_delta_report, stage_site
+
+    with report.stage("site"):
+        delta = stage_site(Path(os.getcwd()), Path(args.site_dir), deployable_files(workflows, _INDEX_PAGES))
+    report.set("site", dir=args.site_dir, **site_delta_report(delta, limit=200))
+    print(delta.summary())
+    if args.site_delta:
+        print("\n".join(delta.lines()))
+
+
+def _shard_dir() -> Path:
+    return Path(GRAPHS_DIR) / SHARDS_DIR
+
+
+def _load_history(args, report):
+    """The --history overlay source, loaded once per run; None without one (or if it can't be read)."""
+    if not args.history:
+        return None
+    from .history import load_history
+
+    with report.stage("history"):
+        try:
+            history = load_history(args.history, _cache_dir() / HISTORY_CACHE_FILE, args.history_attempts)
+        except Exception as e:
+            logger.error(f"Ignoring attempt history {args.history}: {e}")
+            return None
+    report.set("history", attempts=history.attempts, workflows=len(history.tasks))
+    return history
+
+
+def _apply_history(built, history, report) -> None:
+    if history is None:
+        return
+    from .history import apply_history
+
+    with report.stage("history"):
+        for root, info, _out in built:
+            apply_history(root, info, history)
+
+
+def _profiles_key(profiles) -> str:
+    from .layout_profiles import DEFAULT_PROFILES, profiles_key
+
+    return profiles_key(profiles or DEFAULT_PROFILES)
+
+
+def cmd_build_shard(args) -> int:
+    """
+    Parse and render one shard's workflows (no incremental reuse, no indexes)
+    and write its partial metadata for `digdaggraph merge`.
+    """
+    from .build_cost import CostModel
+    from .build_report import BuildReport
+    from .shards import select_shard, shard_file, write_shard
+    from .sql_lineage import LineageCache
+    from .sql_resolver import SqlResolver
+
+    start_time = time.time()
+    index, count = args.shard
+    root = Path(os.getcwd())
+    Path(GRAPHS_DIR).mkdir(exist_ok=True)
+    report = BuildReport()
+    _report_inputs(report)
+    lineage = LineageCache(_cache_dir() / "sql_lineage.json")
+
+    # Every runner must compute the same plan, so only an explicitly shared report calibrates it
+    model = CostModel.from_report(Path(args.cost_calibration)) if args.cost_calibration else CostModel()
+    with report.stage("discover"):
+        dig_files = _discover()
+        mine = select_shard(dig_files, root, index, count, balance=args.shard_balance, model=model)
+    logger.info(f"Shard {index}/{count}: {len(mine)} of {len(dig_files)} .dig files")
+
+    sql = SqlResolver()
+    with report.stage("sql_index"):
+        sql.index_dirs(p.parent for p in mine)
+    seconds: dict = {}
+    layout_cache = _layout_cache(args)
+    built = _parse_all(mine, lineage, report, sql, seconds, args.label_budget)
+    _apply_history(built, _load_history(args, report), report)
+    # Upstream/downstream sections need every shard's edges; `merge` fills them in
+    rendered = _render_all(
+        built,
+        {info.path: "" for _root, info, _out in built},
+        report,
+        args.render,
+        args.layout,
+        args.layout_timeout,
+        args.layout_profiles,
+        seconds,
+        layout_cache,
+    )
+    lineage.save(prune=False)
+    _report_layout_cache(report, layout_cache)
+    _report_costs(report, seconds, model)
+
+    report.set("workflows", found=len(dig_files), parsed=len(built), rendered=rendered, reused=0)
+    _report_sql_refs(report, [info for _root, info, _out in built])
+    report.set("sql_lineage", hits=lineage.hits, misses=lineage.misses)
+    out = shard_file(_shard_dir(), index, count)
+    write_shard(
+        out,
+        index,
+        count,
+        [info for _root, info, _out in built],
+        root,
+        options={
+            "render": args.render,
+            "layout": args.layout,
+            "layout_profiles": _profiles_key(args.layout_profiles),
+            "label_budget": str(args.label_budget),
+            "shard_plan": model.key() if args.shard_balance else "hash",
+        },
+        report=report.to_json(),
+    )
+    print(f"Shard {index}/{count}: {rendered} of {len(mine)} graphs generated ({len(dig_files)} workflows in repo)")
+    print(f"Wrote {out} | TIME: {time.time() - start_time:.2f}s")
+    return 0
+
+
+def cmd_build(args) -> int:
+    """Parse and render changed workflows, then rewrite every index page."""
+    if not _mount_inputs(args):
+        return 2
+    if args.shard:
+        return cmd_build_shard(args)
+
+    from .build_report import BuildReport
+    from .catalog import Catalog, text_hash
+    from .dep_graph import build_dependency_graph
+    from .html_pages import related_workflows_html
+    from .schedule_labels import LABELS
+    from .sql_lineage import LineageCache
+    from .sql_resolver import SqlResolver
+
+    start_time = time.time()
+    Path(GRAPHS_DIR).mkdir(exist_ok=True)
+    report = BuildReport()
+    _report_inputs(report)
+    catalog = Catalog(_catalog_path())
+    render_changed = catalog.option_changed("render", args.render, RENDER_MODES[0])
+    layout_changed = catalog.option_changed("layout", args.layout, "graphviz")
+    profiles_changed = catalog.option_changed(
+        "layout_profiles", _profiles_key(args.layout_profiles), _profiles_key(None)
+    )
+    budget_changed = catalog.option_changed("label_budget", str(args.label_budget), str(DEFAULT_LABEL_BUDGET))
+    if render_changed or layout_changed or profiles_changed or budget_changed or args.force:
+        catalog.clear()
+    lineage = LineageCache(_cache_dir() / "sql_lineage.json")
+    LABELS.load(_cache_dir() / "schedule_labels.json")
+    cost_model = _cost_model(args.cost_calibration, catalog)
+    seconds: dict = {}
+
+    # Discover .dig files
+    with report.stage("discover"):
+        dig_files = _discover()
+    logger.info(f"Found {len(dig_files)} .dig files")
+    history = _load_history(args, report)
+
+    # Reuse workflows whose inputs are unchanged since the last run
+    with report.stage("fingerprint"):
+        reused = {}
+        stale = []
+        for path in dig_files:
+            info = catalog.fresh_info(str(path), _output_stem(path) + ".html")
+            if info is not None:
+                reused[str(path)] = info
+            else:
+                stale.append(path)
+
+    # parse / includes / tree stages are timed per workflow inside build_workflow
+    # Index each stale project's .sql files once; td> references are then resolved in memory
+    sql = SqlResolver()
+    with report.stage("sql_index"):
+        sql.index_dirs(p.parent for p in stale)
+    built = _parse_all(stale, lineage, report, sql, seconds, args.label_budget) if stale else []
+    workflows = list(reused.values()) + [info for _root, info, _out in built]
+
+    # Cross-workflow dependencies from the collected call>/require>/td_wait> edges
+    with report.stage("dependencies"):
+        deps = build_dependency_graph(workflows)
+        related = {info.path: related_workflows_html(deps, info.key) for info in workflows}
+    for cycle in deps.cycles:
+        logger.warning(f"Dependency cycle: {' → '.join(cycle + [cycle[0]])}")
+
+    # A reused page must still be re-rendered if its upstream/downstream section
+    # or its attempt history changed
+    page_hash = {
+        info.path: text_hash(related[info.path] + (history.digest(info.key) if history else ""))
+        for info in workflows
+    }
+    changed = [p for p, info in reused.items() if catalog.related_hash(p) != page_hash[p]]
+    if changed:
+        with report.stage("sql_index"):
+            sql.index_dirs(Path(p).parent for p in changed)
+        built += _parse_all([Path(p) for p in changed], lineage, report, sql, seconds, args.label_budget)
+        for p in changed:
+            reused.pop(p, None)
+    _apply_history(built, history, report)
+
+    # dot / layout / pages stages are timed per workflow inside render_workflow
+    layout_cache = _layout_cache(args)
+    count = _render_all(
+        built,
+        related,
+        report,
+        args.render,
+        args.layout,
+        args.layout_timeout,
+        args.layout_profiles,
+        seconds,
+        layout_cache,
+    )
+    _report_layout_cache(report, layout_cache)
+
+    with report.stage("catalog"):
+        for _root, info, out in built:
+            catalog.record(info, page_hash[info.path])
+            catalog.record_output(out + ".html", info.path)
+        for gone in catalog.retain(str(p) for p in dig_files):
+            _remove_outputs(Path(gone))
+        workflows = catalog.all_infos()
+
+    # Always write the index (from the catalog, so reused and rebuilt workflows look the same)
+    with report.stage("indexes"):
+        heat_days = args.heatmap_days
+        _write_indexes(workflows, deps, report, heat_days)
+    with report.stage("search"):
+        _write_search(workflows, catalog, report)
+    for page in _INDEX_PAGES:
+        catalog.record_output(page)
+
+    if args.site_dir:
+        _stage_site(args, workflows, report)
+
+    lineage.save(prune=not reused)
+    _report_costs(report, seconds, cost_model, catalog)
+    LABELS.save()
+
+    report.set("workflows", found=len(dig_files), parsed=len(built), rendered=count, reused=len(reused))
+    _report_sql_refs(report, workflows)
+    report.set("sql_lineage", hits=lineage.hits, misses=lineage.misses)
+    report.set("schedule_labels", **LABELS.stats())
+    report.write(Path(GRAPHS_DIR) / BUILD_REPORT_FILE)
+    catalog.record_run(start_time, report.timings, report.sections)
+    catalog.close()
+    _print_summary(report, time.time() - start_time)
+    return 0
+
+
+def cmd_merge(args) -> int:
+    """
+    Combine the metadata of a sharded build: fill in every page's
+    upstream/downstream section and write the indexes, without parsing.
+    """
+    from .build_report import BuildReport
+    from .catalog import Catalog, text_hash
+    from .dep_graph import build_dependency_graph
+    from .html_pages import related_workflows_html
+    from .layout_profiles import merge_layout_stats
+    from .schedule_labels import LABELS
+    from .shards import load_shards, patch_related
+
+    if not _mount_inputs(args):
+        return 2
+    start_time = time.time()
+    report = BuildReport()
+    shard_dir = Path(args.shard_dir) if args.shard_dir else _shard_dir()
+    with report.stage("merge"):
+        workflows, headers, problems = load_shards(shard_dir, Path(os.getcwd()))
+    if problems:
+        for problem in problems:
+            print(f"Cannot merge: {problem}")
+        return 1
+    LABELS.load(_cache_dir() / "schedule_labels.json")
+
+    with report.stage("dependencies"):
+        deps = build_dependency_graph(workflows)
+        related = {info.path: related_workflows_html(deps, info.key) for info in workflows}
+    for cycle in deps.cycles:
+        logger.warning(f"Dependency cycle: {' → '.join(cycle + [cycle[0]])}")
+
+    with report.stage("pages"):
+        unpatched = [
+            info.path for info in workflows
+            if not patch_related(_output_stem(Path(info.path)) + ".html", related[info.path])
+        ]
+    for path in unpatched:
+        logger.warning(f"No page with a related section for {path}; was its shard's output collected?")
+
+    # The merged catalog makes `index`, `query` and later incremental builds work as after a full build
+    with report.stage("catalog"):
+        catalog = Catalog(_catalog_path())
+        for name, value in headers[0]["options"].items():
+            catalog.option_changed(name, value, value)
+        catalog.clear()
+        for info in workflows:
+            catalog.record(info, text_hash(related[info.path]))
+            catalog.record_output(_output_stem(Path(info.path)) + ".html", info.path)
+
+    with report.stage("indexes"):
+        _write_indexes(workflows, deps, report, args.heatmap_days)
+    with report.stage("search"):
+        _write_search(workflows, catalog, report)
+    for page in _INDEX_PAGES:
+        catalog.record_output(page)
+
+    if args.site_dir:
+        _stage_site(args, workflows, report)
+
+    LABELS.save()
+    shard_reports = [h["report"] for h in headers]
+    layout_stats: dict = {}
+    for r in shard_reports:
+        if r["sections"].get("degraded"):
+            report.set("degraded", **r["sections"]["degraded"])
+        merge_layout_stats(layout_stats, r["sections"].get("layout_profiles", {}))
+        if r["sections"].get("costs"):
+            costs = r["sections"]["costs"]
+            merged = report.sections.get("costs", {}).get("workflows", {})
+            _set_costs(report, costs["model"], {**merged, **costs["workflows"]})
+        for stage, secs in r.get("timings", {}).items():
+            report.timings[f"shards.{stage}"] = report.timings.get(f"shards.{stage}", 0.0) + secs
+    costs = report.sections.get("costs")
+    if costs:
+        # The shards' measurements become cost samples, as in a plain build
+        by_key = {_rel_key(info.path): info.path for info in workflows}
+        for key, (_estimate, actual, *features) in costs["workflows"].items():
+            if key in by_key:
+                catalog.record_cost(by_key[key], actual, features)
+        samples = {_rel_key(p): row for p, row in catalog.cost_samples().items()}
+        _set_costs(report, costs["model"], costs["workflows"], samples)
+    if layout_stats:
+        report.set("layout_profiles", **layout_stats)
+    report.set(
+        "workflows",
+        shards=len(headers),
+        rendered=sum(r["sections"].get("workflows", {}).get("rendered", 0) for r in shard_reports),
+        reused=0,
+        unpatched=len(unpatched),
+    )
+    _report_sql_refs(report, workflows)
+    report.set("schedule_labels", **LABELS.stats())
+    report.write(Path(GRAPHS_DIR) / BUILD_REPORT_FILE)
+    catalog.record_run(start_time, report.timings, report.sections)
+    catalog.close()
+    print(f"Merged {len(headers)} shards")
+    _print_summary(report, time.time() - start_time)
+    return 0 if not unpatched else 1
+
+
+def cmd_check(args) -> int:
+    """Parse workflows and report problems without rendering or writing anything."""
+    from . import vfs
+    from .check import check_workflows, workflows_for
+
+    start_time = time.perf_counter()
+    # Archives given as paths are checked like --archive inputs, as their mounted project
+    archives = [p for p in args.paths if vfs.is_archive(Path(p))]
+    if not _mount_inputs(args, archives):
+        return 2
+    paths = [p for p in args.paths if p not in archives] + [str(m.root) for m in vfs.mounts()]
+    if args.paths:
+        dig_files, skipped = workflows_for(paths, _catalog_path())
+        for p in skipped:
+            print(f"{p}: not read by any known workflow (run `digdaggraph build` to index inputs), skipped")
+    else:
+        dig_files = _discover()
+    problems = check_workflows(dig_files)
+    for problem in problems:
+        print(problem)
+    elapsed_ms = (time.perf_counter() - start_time) * 1000
+    print(f"Checked {len(dig_files)} workflows in {elapsed_ms:.0f} ms: {len(problems)} problem(s)")
+    return 1 if problems else 0
+
+
+def cmd_index(args) -> int:
+    """Regenerate the index pages from the last build's stored metadata."""
+    from .build_report import BuildReport
+    from .catalog import Catalog
+    from .dep_graph import build_dependency_graph
+
+    if not _mount_inputs(args):
+        return 2
+    catalog = Catalog(_catalog_path())
+    workflows = catalog.all_infos()
+    if not workflows:
+        catalog.close()
+        print(f"No workflows in {_catalog_path()}; run `digdaggraph build` first.")
+        return 1
+    report = BuildReport()
+    deps = build_dependency_graph(workflows)
+    _write_indexes(workflows, deps, report, args.heatmap_days)
+    _write_search(workflows, catalog, report)
+    catalog.close()
+    print(f"Rewrote indexes for {len(workflows)} workflows")
+    return 0
+
+
+def cmd_query(args) -> int:
+    """Run an ad-hoc SQL query against the catalog and print the rows."""
+    import sqlite3
+
+    from .catalog import query_catalog
+
+    if not _catalog_path().exists():
+        print(f"No catalog at {_catalog_path()}; run `digdaggraph build` first.")
+        return 1
+    try:
+        cols, rows = query_catalog(_catalog_path(), args.sql)
+    except sqlite3.Error as e:
+        print(f"Query failed: {e}")
+        return 1
+    if args.json:
+        import json
+
+        print(json.dumps([dict(zip(cols, r)) for r in rows], indent=1, default=str))
+        return 0
+    print("\t".join(cols))
+    for r in rows:
+        print("\t".join("" if v is None else str(v) for v in r))
+    return 0
+
+
+def cmd_serve(args) -> int:
+    """Serve the generated site over HTTP (pages that fetch JSON need this)."""
+    from functools import partial
+    from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+    handler = partial(SimpleHTTPRequestHandler, directory=args.directory)
+    with ThreadingHTTPServer((args.bind, args.port), handler) as httpd:
+        print(f"Serving {args.directory} at http://{args.bind}:{args.port}/{SCHEDULE_INDEX_FILE}")
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+def cmd_bench(args) -> int:
+    """
+    Time a forced rebuild per stage, of the current tree or of a generated
+    synthetic repo; optionally save the result and compare against a previous one.
+    """
+    import json
+
+    from .bench import (
+        SyntheticSpec,
+        compare_results,
+        format_comparison,
+        format_layout_curve,
+        format_timings,
+        result_envelope,
+        run_build_bench,
+        run_synthetic,
+    )
+
+    build_args = ["--layout", args.layout]
+    if args.synthetic:
+        spec = SyntheticSpec(
+            projects=args.projects,
+            workflows=args.workflows,
+            depth=args.depth,
+            fanout=args.fanout,
+            parallel=args.parallel,
+            include_share=args.include_share,
+            sql_lines=args.sql_lines,
+            call_density=args.call_density,
+            seed=args.seed,
+        )
+        result = run_synthetic(
+            spec, Path(args.workdir) if args.workdir else None, repeat=args.repeat, build_args=build_args
+        )
+    else:
+        result = run_build_bench(Path(os.getcwd()), repeat=args.repeat, build_args=build_args)
+    result = result_envelope(result, args.repeat)
+
+    wf = result["sections"].get("workflows", {})
+    if wf.get("rendered", 0) < wf.get("parsed", 0):
+        print(f"Warning: only {wf.get('rendered', 0)} of {wf.get('parsed', 0)} workflows rendered (is Graphviz installed?)")
+    print(format_timings(result["timings"]))
+    if result["layout_curve"]:
+        print(format_layout_curve(result["layout_curve"]))
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(json.dumps(result, indent=1, sort_keys=True), encoding="utf-8")
+        print(f"Wrote {args.output}")
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        rows = compare_results(baseline, result, threshold=args.threshold)
+        print(format_comparison(rows))
+        if any(regressed for *_rest, regressed in rows):
+            return 1
+    return 0
+
+
+def _shard_arg(value: str):
+    from .shards import parse_shard
+
+    try:
+        return parse_shard(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def _profiles_arg(value: str):
+    from .layout_profiles import load_profiles
+
+    try:
+        return load_profiles(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="digdaggraph",
+        description="Generate workflow graph pages and indexes from Digdag .dig files.",
+    )
+    sub = parser.add_subparsers(dest="command")
+
+    def _input_args(p):
+        p.add_argument(
+            "--git-ref",
+            default=os.environ.get("DIGDAGGRAPH_GIT_REF"),
+            metavar="REF",
+            help="read inputs from this revision of the local git repository instead of the working tree",
+        )
+        p.add_argument(
+            "--archive",
+            action="append",
+            default=[a for a in os.environ.get("DIGDAGGRAPH_ARCHIVES", "").split(os.pathsep) if a] or None,
+            metavar="PATH",
+            help="read a .tar/.tar.gz/.tgz/.zip project archive (or every archive in a directory) "
+            "without extracting it; repeatable",
+        )
+
+    def _heatmap_arg(p):
+        p.add_argument(
+            "--heatmap-days",
+            type=int,
+            default=int(os.environ.get("DIGDAGGRAPH_HEATMAP_DAYS", DEFAULT_HEATMAP_DAYS)),
+            help="schedule heatmap horizon in days (default: %(default)s)",
+        )
+
+    p = sub.add_parser("build", help="build pages for changed workflows and all indexes (default)")
+    p.add_argument("--force", action="store_true", help="ignore the incremental state and rebuild everything")
+    p.add_argument(
+        "--site-dir",
+        default=os.environ.get("DIGDAGGRAPH_SITE_DIR"),
+        help="also mirror only the deployable pages into this directory, with a manifest",
+    )
+    p.add_argument("--site-delta", action="store_true", help="list added/changed/removed site files")
+    p.add_argument(
+        "--render",
+        choices=RENDER_MODES,
+        default=os.environ.get("DIGDAGGRAPH_RENDER", "svg"),
+        help="svg: layout at build time; client: JSON model laid out in the browser (default: %(default)s)",
+    )
+    p.add_argument(
+        "--layout",
+        choices=LAYOUT_ENGINES,
+        default=os.environ.get("DIGDAGGRAPH_LAYOUT", LAYOUT_ENGINES[0]),
+        help="svg-mode layout engine; auto uses the built-in one unless a graph needs Graphviz (default: %(default)s)",
+    )
+    p.add_argument(
+        "--layout-timeout",
+        type=float,
+        default=float(os.environ.get("DIGDAGGRAPH_LAYOUT_TIMEOUT", DEFAULT_LAYOUT_TIMEOUT)),
+        help="seconds per Graphviz attempt before retrying a cheaper layout; 0 = no limit (default: %(default)s)",
+    )
+    p.add_argument(
+        "--layout-profiles",
+        type=_profiles_arg,
+        default=os.environ.get("DIGDAGGRAPH_LAYOUT_PROFILES"),
+        metavar="JSON",
+        help="file of size-based Graphviz layout profiles replacing the built-in ones (see README)",
+    )
+    p.add_argument(
+        "--label-budget",
+        type=int,
+        default=int(os.environ.get("DIGDAGGRAPH_LABEL_BUDGET", DEFAULT_LABEL_BUDGET)),
+        metavar="CHARS",
+        help="longest node label; the full values open in a side panel on click, 0 = no limit (default: %(default)s)",
+    )
+    p.add_argument(
+        "--cost-calibration",
+        default=os.environ.get("DIGDAGGRAPH_COST_CALIBRATION"),
+        metavar="REPORT",
+        help="build report whose measured per-workflow times calibrate cost estimates "
+        "(default: the previous graphs/build_report.json; with --shard-balance only this, "
+        "and it must be the same file on every runner)",
+    )
+    p.add_argument(
+        "--history",
+        default=os.environ.get("DIGDAGGRAPH_HISTORY"),
+        metavar="SOURCE",
+        help="overlay task durations from Digdag attempt history: an export file/directory or a server URL",
+    )
+    p.add_argument(
+        "--history-attempts",
+        type=int,
+        default=DEFAULT_HISTORY_ATTEMPTS,
+        help="newest attempts to fetch from a server URL (default: %(default)s)",
+    )
+    p.add_argument(
+        "--shard",
+        type=_shard_arg,
+        default=os.environ.get("DIGDAGGRAPH_SHARD"),
+        help="build only shard i of N (e.g. 2/4) and write its metadata for `merge`",
+    )
+    p.add_argument(
+        "--shard-balance",
+        action="store_true",
+        help="partition by predicted cost instead of path hash (all shards must agree)",
+    )
+    _input_args(p)
+    _heatmap_arg(p)
+    p.set_defaults(func=cmd_build)
+
+    p = sub.add_parser("merge", help="combine a sharded build: related sections and indexes, no parsing")
+    p.add_argument("--shard-dir", help=f"directory of shard-*-of-*.json (default: {GRAPHS_DIR}/{SHARDS_DIR})")
+    p.add_argument("--site-dir", default=os.environ.get("DIGDAGGRAPH_SITE_DIR"), help="also stage the site here")
+    p.add_argument("--site-delta", action="store_true", help="list added/changed/removed site files")
+    _input_args(p)
+    _heatmap_arg(p)
+    p.set_defaults(func=cmd_merge)
+
+    p = sub.add_parser("check", help="validate workflows (includes, call>/require>, SQL, cron, _retry); writes nothing")
+    p.add_argument(
+        "paths", nargs="*", help=".dig files, directories, archives, or include/SQL files (default: whole tree)"
+    )
+    _input_args(p)
+    p.set_defaults(func=cmd_check)
+
+    p = sub.add_parser("index", help="regenerate index pages from the last build without parsing")
+    _input_args(p)
+    _heatmap_arg(p)
+    p.set_defaults(func=cmd_index)
+
+    p = sub.add_parser("query", help=f"run SQL against {GRAPHS_DIR}/{CATALOG_FILE}")
+    p.add_argument("sql", help="e.g. \"SELECT * FROM tasks WHERE engine = 'hive' AND retry > 3\"")
+    p.add_argument("--json", action="store_true", help="print rows as JSON objects")
+    p.set_defaults(func=cmd_query)
+
+    p = sub.add_parser("serve", help="serve the generated site locally")
+    p.add_argument("--port", type=int, default=8000)
+    p.add_argument("--bind", default="127.0.0.1")
+    p.add_argument("--directory", default=os.getcwd())
+    p.set_defaults(func=cmd_serve)
+
+    p = sub.add_parser("bench", help="time a full rebuild per stage (current tree or synthetic repo)")
+    p.add_argument("--repeat", type=int, default=1, help="runs per benchmark; the fastest is kept")
+    p.add_argument("--output", help="write the result JSON here")
+    p.add_argument("--compare", help="previous result JSON to compare against (exit 1 on regression)")
+    p.add_argument("--threshold", type=float, default=0.2, help="relative slowdown counted as regression")
+    p.add_argument(
+        "--layout",
+        choices=LAYOUT_ENGINES,
+        default=LAYOUT_ENGINES[0],
+        help="layout engine of the benchmarked builds; graphviz records every workflow's layout curve",
+    )
+    g = p.add_argument_group("synthetic repository")
+    g.add_argument("--synthetic", action="store_true", help="benchmark a generated repo instead of the cwd")
+    g.add_argument("--workdir", help="empty directory to generate it in (default: a temp dir)")
+    g.add_argument("--projects", type=int, default=5)
+    g.add_argument("--workflows", type=int, default=10, help="workflows per project")
+    g.add_argument("--depth", type=int, default=3, help="task nesting depth")
+    g.add_argument("--fanout", type=int, default=3, help="children per task group")
+    g.add_argument("--parallel", type=float, default=0.5, help="share of groups with _parallel: true")
+    g.add_argument("--include-share", type=float, default=0.5, help="share of workflows using !include")
+    g.add_argument("--sql-lines", type=int, default=40, help="lines per SQL file")
+    g.add_argument("--call-density", type=float, default=0.2, help="call>/require> density per workflow")
+    g.add_argument("--seed", type=int, default=0)
+    p.set_defaults(func=cmd_bench)
+    return parser
+
 
-    elapsed = time.time() - start_time
-    print(f"Graphs generated: {count} | TIME: {elapsed:.2f}s")
-    print(f"Workflows: {len(dig_files)} | scheduled: {len(schedule_entries)} | unscheduled: {len(unscheduled_entries)}")
-    print(f"Wrote {SCHEDULE_INDEX_FILE} and {UNSCHEDULED_INDEX_FILE}")
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    # `digdaggraph` alone (or with build flags only) keeps meaning "build"
+    if not argv or (argv[0].startswith("-") and argv[0] not in ("-h", "--help")):
+        argv.insert(0, "build")
+    args = _parser().parse_args(argv)
+    return args.func(args)
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -6,3 +6,42 @@ QUERIES_DIR = "queries"
 SCHEDULE_INDEX_FILE = "scheduled_workflows.html"
 # add this next to SCHEDULE_INDEX_FILE
 UNSCHEDULED_INDEX_FILE = "unscheduled_workflows.html"
+TABLE_INDEX_FILE = "table_usage.html"
+TABLE_INDEX_JSON = "table_usage.json"
+# build caches (not deployed) live under GRAPHS_DIR
+CACHE_DIR = ".cache"
+DEPENDENCY_INDEX_FILE = "dependencies.html"
+DEPENDENCY_INDEX_JSON = "dependencies.json"
+SCHEDULE_HEATMAP_FILE = "schedule_heatmap.html"
+SCHEDULE_HEATMAP_JSON = "schedule_heatmap.json"
+DEFAULT_HEATMAP_DAYS = 30
+BUILD_REPORT_FILE = "build_report.json"
+CATALOG_FILE = "catalog.sqlite"
+ASSETS_DIR = "assets"
+# "svg": Graphviz layout at build time; "client": JSON model laid out in the browser
+RENDER_MODES = ("svg", "client")
+# "auto": built-in series-parallel layout when the tree qualifies, else Graphviz
+LAYOUT_ENGINES = ("auto", "builtin", "graphviz")
+# seconds one `dot` run may take before a cheaper layout is tried
+DEFAULT_LAYOUT_TIMEOUT = 60
+# partial metadata of sharded builds (`build --shard i/N`), read by `merge`
+SHARDS_DIR = "shards"
+# SQL full-text search: page at the root, sharded index under GRAPHS_DIR/SEARCH_DIR
+SQL_SEARCH_FILE = "sql_search.html"
+SEARCH_DIR = "search"
+# Digdag attempt history (`--history`): repo-wide page, REST fetch cache, attempts fetched
+SLOWEST_WORKFLOWS_FILE = "slowest_workflows.html"
+HISTORY_CACHE_FILE = "attempt_history.json"
+DEFAULT_HISTORY_ATTEMPTS = 500
+# characters of a graph node label; longer values are cut and shown in full in the side panel
+DEFAULT_LABEL_BUDGET = 160
+# Graphviz layouts by graph content under CACHE_DIR, dropped after this many days unused
+LAYOUT_CACHE_DIR = "layouts"
+LAYOUT_CACHE_DAYS = 30
+# SQL files larger than this are memory-mapped and written to their page in chunks;
+# above SQL_PAGED_BYTES the page shows the first chunk and fetches the rest on scroll
+SQL_STREAM_BYTES = 1 << 20
+SQL_PAGED_BYTES = 4 << 20
+SQL_CHUNK_BYTES = 256 << 10
+# next to queries/q.html: q.part1.txt, q.part2.txt, ... (raw SQL, one chunk each)
+SQL_PART_SUFFIX = ".part{}.txt"
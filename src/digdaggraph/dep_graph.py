@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class DependencyGraph:
+    """
+    Workflow-level dependency graph keyed by "project/workflow.dig".
+
+    `edges[u][v] = kinds` means u is upstream of v (v calls/requires u, or
+    waits on a table u writes). `upstream` / `downstream` hold the transitive
+    closure, and `cycles` lists every strongly connected component that loops.
+    """
+
+    nodes: List[str] = field(default_factory=list)
+    edges: Dict[str, Dict[str, List[str]]] = field(default_factory=dict)
+    upstream: Dict[str, List[str]] = field(default_factory=dict)
+    downstream: Dict[str, List[str]] = field(default_factory=dict)
+    cycles: List[List[str]] = field(default_factory=list)
+
+    def direct_upstream(self, key: str) -> Dict[str, List[str]]:
+        return {u: kinds for u, vs in self.edges.items() for v, kinds in vs.items() if v == key}
+
+    def direct_downstream(self, key: str) -> Dict[str, List[str]]:
+        return dict(self.edges.get(key, {}))
+
+    def to_json(self) -> Dict[str, object]:
+        return {
+            "nodes": self.nodes,
+            "edges": [[u, v, kinds] for u, vs in self.edges.items() for v, kinds in vs.items()],
+            "upstream": self.upstream,
+            "downstream": self.downstream,
+            "cycles": self.cycles,
+        }
+
+
+def _strongly_connected(nodes: List[str], succ: Dict[str, Set[str]]) -> List[List[str]]:
+    """Iterative Tarjan; components come out in reverse topological order."""
+    index: Dict[str, int] = {}
+    low: Dict[str, int] = {}
+    on_stack: Set[str] = set()
+    stack: List[str] = []
+    comps: List[List[str]] = []
+    counter = 0
+    for start in nodes:
+        if start in index:
+            continue
+        work: List[Tuple[str, Iterable[str]]] = [(start, iter(sorted(succ.get(start, ()))))]
+        index[start] = low[start] = counter
+        counter += 1
+        stack.append(start)
+        on_stack.add(start)
+        while work:
+            v, it = work[-1]
+            advanced = False
+            for w in it:
+                if w not in index:
+                    index[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    on_stack.add(w)
+                    work.append((w, iter(sorted(succ.get(w, ())))))
+                    advanced = True
+                    break
+                if w in on_stack:
+                    low[v] = min(low[v], index[w])
+            if advanced:
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[v])
+            if low[v] == index[v]:
+                comp = []
+                while True:
+                    w = stack.pop()
+                    on_stack.discard(w)
+                    comp.append(w)
+                    if w == v:
+                        break
+                comps.append(sorted(comp))
+    return comps
+
+
+def build_dependency_graph(workflows: Iterable[object]) -> DependencyGraph:
+    """
+    Build the repo-wide graph from WorkflowInfo call/require targets and table waits.
+
+    Table waits become edges from every workflow whose SQL writes the table.
+    Transitive up/downstream sets are computed in one pass over the SCC
+    condensation (bitsets over component indices), not per workflow.
+    """
+    wfs = list(workflows)
+    nodes = sorted({wf.key for wf in wfs})
+    node_set = set(nodes)
+    writers: Dict[str, Set[str]] = {}
+    for wf in wfs:
+        for ref in wf.sql_refs:
+            for table in ref.writes:
+                writers.setdefault(table, set()).add(wf.key)
+
+    edges: Dict[str, Dict[str, List[str]]] = {}
+
+    def add(u: str, v: str, kind: str) -> None:
+        if u == v and not kind.startswith(("call>", "require>")):
+            return
+        kinds = edges.setdefault(u, {}).setdefault(v, [])
+        if kind not in kinds:
+            kinds.append(kind)
+
+    for wf in wfs:
+        for op, target in wf.calls:
+            if target in node_set:
+                add(target, wf.key, op)
+            else:
+                logger.warning(f"{wf.key}: {op} target not found: {target}")
+        for table in wf.waits:
+            for writer in sorted(writers.get(table, ())):
+                add(writer, wf.key, f"td_wait> {table}")
+
+    succ = {u: set(vs) for u, vs in edges.items()}
+    comps = _strongly_connected(nodes, succ)
+    comp_of = {n: ci for ci, comp in enumerate(comps) for n in comp}
+    cycles = [c for c in comps if len(c) > 1 or c[0] in succ.get(c[0], ())]
+    cyclic = {comp_of[c[0]] for c in cycles}
+
+    # Tarjan emits sinks first, so walking comps backwards visits sources first.
+    preds: Dict[int, Set[int]] = {}
+    for u, vs in succ.items():
+        for v in vs:
+            cu, cv = comp_of[u], comp_of[v]
+            if cu != cv:
+                preds.setdefault(cv, set()).add(cu)
+    succs: Dict[int, Set[int]] = {}
+    for cv, cus in preds.items():
+        for cu in cus:
+            succs.setdefault(cu, set()).add(cv)
+
+    anc = [0] * len(comps)
+    for ci in range(len(comps) - 1, -1, -1):
+        bits = 0
+        for p in preds.get(ci, ()):
+            bits |= anc[p] | (1 << p)
+        anc[ci] = bits
+    desc = [0] * len(comps)
+    for ci in range(len(comps)):
+        bits = 0
+        for s in succs.get(ci, ()):
+            bits |= desc[s] | (1 << s)
+        desc[ci] = bits
+
+    def members(bits: int, own: int) -> List[str]:
+        out: List[str] = []
+        if own in cyclic:
+            out.extend(comps[own])
+        ci = 0
+        while bits:
+            if bits & 1:
+                out.extend(comps[ci])
+            bits >>= 1
+            ci += 1
+        return sorted(out)
+
+    upstream = {n: [m for m in members(anc[comp_of[n]], comp_of[n]) if m != n] for n in nodes}
+    downstream = {n: [m for m in members(desc[comp_of[n]], comp_of[n]) if m != n] for n in nodes}
+    return DependencyGraph(
+        nodes=nodes,
+        edges=edges,
+        upstream=upstream,
+        downstream=downstream,
+        cycles=cycles,
+    )
+
+
+def render_overview_svg(graph: DependencyGraph, cache_dir: Optional[Path] = None) -> Optional[str]:
+    """
+    Project-level overview: one node per project, edges aggregated across
+    workflows and labeled with their count. Returns None if Graphviz fails.
+    With `cache_dir`, the SVG is reused while the project-level edges are unchanged.
+    """
+    projects = sorted({n.split("/", 1)[0] for n in graph.nodes})
+    counts: Dict[Tuple[str, str], int] = {}
+    for u, vs in graph.edges.items():
+        for v in vs:
+            pu, pv = u.split("/", 1)[0], v.split("/", 1)[0]
+            counts[(pu, pv)] = counts.get((pu, pv), 0) + 1
+
+    cache_file = Path(cache_dir) / "dependency_overview.json" if cache_dir else None
+    key = json.dumps([projects, sorted(counts.items())])
+    if cache_file and cache_file.exists():
+        try:
+            cached = json.loads(cache_file.read_text(encoding="utf-8"))
+            if cached.get("key") == key:
+                return cached["svg"]
+        except Exception:
+            pass
+
+    from graphviz import Digraph
+
+    dot = Digraph(format="svg", edge_attr={"color": "red"})
+    dot.attr(target="_top", rankdir="LR")
+    for p in projects:
+        dot.node(p, p, color="cornflowerblue", shape="box", URL=f"#project-{p}")
+    for (pu, pv), n in sorted(counts.items()):
+        dot.edge(pu, pv, label=str(n) if n > 1 else "")
+    try:
+        svg = dot.pipe(encoding="utf-8")
+    except Exception as e:
+        logger.error(f"Error rendering dependency overview: {e}")
+        return None
+    if cache_file:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        cache_file.write_text(json.dumps({"key": key, "svg": svg}), encoding="utf-8")
+    return svg
@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import subprocess
+import time
+from dataclasses import dataclass, field
+from html import escape
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .graph_blocks import Block
+from .graph_model import css_color
+from .layout_profiles import LayoutProfile
+from .logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Tasks deeper than this are folded into their ancestor in the collapsed view
+COLLAPSE_DEPTH = 2
+
+# (mode, extra dot arguments, drop clusters, collapse) from most to least faithful.
+# "full" is the workflow's layout profile as configured (see layout_profiles);
+# "straight" skips spline routing and caps the network-simplex/mincross passes,
+# "flat" also drops the cluster boxes, "collapsed" additionally folds deep tasks.
+ATTEMPTS: Tuple[Tuple[str, Tuple[str, ...], bool, bool], ...] = (
+    ("full", (), False, False),
+    ("straight", ("-Gsplines=line", "-Gnslimit=2", "-Gmclimit=0.5"), False, False),
+    ("flat", ("-Gsplines=line", "-Gnslimit=2", "-Gmclimit=0.5"), True, False),
+    ("collapsed", ("-Gsplines=line", "-Gnslimit=1", "-Gmclimit=0.2"), True, True),
+)
+
+
+@dataclass
+class LayoutOutcome:
+    """SVG (or, in mode "list", nested-list HTML) plus why earlier attempts were skipped."""
+
+    mode: str
+    markup: str
+    reasons: List[str] = field(default_factory=list)
+
+    @property
+    def degraded(self) -> bool:
+        return self.mode != "full"
+
+
+def run_dot(source: str, timeout: Optional[float], args: Tuple[str, ...] = ()) -> str:
+    """`dot -Tsvg` on `source`; the process is killed after `timeout` seconds."""
+    proc = subprocess.run(
+        ["dot", "-Tsvg", *args],
+        input=source.encode("utf-8"),
+        capture_output=True,
+        timeout=timeout or None,
+    )
+    if proc.returncode != 0:
+        err = proc.stderr.decode("utf-8", "replace").strip().splitlines()
+        raise RuntimeError(f"dot exited with {proc.returncode}: {err[-1] if err else ''}")
+    return proc.stdout.decode("utf-8")
+
+
+def collapse(root: Block, depth: int = COLLAPSE_DEPTH) -> Block:
+    """Copy of the tree cut at `depth`; a cut task's label says how many tasks it hides."""
+    copy = Block(
+        root.graph_name, root.label, root.color, root.penwidth, root.URL, root.shape, root.tooltip,
+        name=root.name,
+    )
+    copy.parallel = root.parallel
+    copy.task_path, copy.fillcolor, copy.operator = root.task_path, root.fillcolor, root.operator
+    copy.details, copy.detail_id = root.details, root.detail_id
+    if depth <= 0:
+        hidden = _count(root) - 1
+        if hidden:
+            copy.label = f"{root.label}\n(+{hidden} tasks)"
+        return copy
+    for b in root.subblocks:
+        child = collapse(b, depth - 1)
+        child.graph_name = copy.subgraph_name
+        copy.subblocks.append(child)
+    return copy
+
+
+def _count(block: Block) -> int:
+    n, stack = 0, [block]
+    while stack:
+        b = stack.pop()
+        n += 1
+        stack.extend(b.subblocks)
+    return n
+
+
+def flatten_clusters(source: str) -> str:
+    # Subgraphs only become boxes when named cluster*; renamed, they are plain groups
+    return source.replace('subgraph "cluster-', 'subgraph "flat-')
+
+
+def _source(root: Block, flat: bool, graph_attr: Optional[Dict[str, str]] = None) -> str:
+    import graphviz
+
+    dot = graphviz.Digraph(format="svg", edge_attr={"color": "red"}, graph_attr=graph_attr)
+    dot.attr(target="_top")
+    root.draw(dot)
+    return flatten_clusters(dot.source) if flat else dot.source
+
+
+def task_list_html(root: Block) -> str:
+    """The task tree as nested lists: the last resort when no layout finishes."""
+
+    def _item(b: Block) -> str:
+        lines = escape(str(b.label)).replace("\n", "<br>")
+        body = f"<a href='{escape(b.URL)}' target='_top'>{lines}</a>" if b.URL else lines
+        kids = "".join(_item(k) for k in b.subblocks)
+        mark = " <span class='muted'>(parallel)</span>" if b.parallel else ""
+        style = f"border-left:3px solid {css_color(b.color, '#9ca3af')};padding-left:6px;margin:2px 0"
+        return f"<li><div style='{style}'>{body}{mark}</div>{f'<ul>{kids}</ul>' if kids else ''}</li>"
+
+    return f"<div class='task-list' style='padding:12px'><ul>{_item(root)}</ul></div>"
+
+
+def layout_with_fallbacks(
+    root: Block,
+    timeout: Optional[float],
+    source: Optional[str] = None,
+    profile: Optional[LayoutProfile] = None,
+) -> LayoutOutcome:
+    """
+    Lay the tree out with `dot`, each attempt bounded by `timeout` seconds; on
+    a timeout or error retry with the next cheaper ATTEMPTS entry, and end
+    with task_list_html. The first attempt uses `profile`'s settings (and
+    `source`, the already generated DOT for it); the retries use their own,
+    keeping clusters dropped when the profile already flattened them.
+    """
+    reasons: List[str] = []
+    flattened = profile is not None and profile.flatten
+    for mode, args, flat, folded in ATTEMPTS:
+        if mode == "full":
+            flat, attrs = flattened, (profile.graph_attr if profile else None)
+        else:
+            if flattened and not flat:
+                continue  # keeps the clusters the profile already had to drop
+            attrs = None
+        tree = collapse(root) if folded else root
+        if folded and _count(tree) == _count(root):
+            continue  # nothing to fold; same graph as "flat"
+        try:
+            src = source if (source is not None and mode == "full") else _source(tree, flat, attrs)
+            return LayoutOutcome(mode, run_dot(src, timeout, args), reasons)
+        except subprocess.TimeoutExpired:
+            reasons.append(f"{mode}: dot exceeded {timeout:g}s")
+        except FileNotFoundError:
+            reasons.append(f"{mode}: dot not installed")
+            break
+        except Exception as e:
+            reasons.append(f"{mode}: {e}")
+        logger.warning(f"Layout attempt failed ({reasons[-1]})")
+    return LayoutOutcome("list", task_list_html(root), reasons)
+
+
+class LayoutCache:
+    """
+    Full Graphviz layouts by the content of the graph: the tree's model (labels,
+    shapes, colors, links, structure) plus the layout profile. Anything that
+    renders the same graph again (another git ref, a moved checkout, a page
+    re-rendered for its related section) reuses the SVG instead of running
+    `dot`. Degraded layouts are not kept, so they are retried. With
+    read=False (`build --force`) every graph is laid out anew and stored.
+    """
+
+    def __init__(self, directory: Path, read: bool = True) -> None:
+        self.directory = Path(directory)
+        self.read = read
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, root: Block, profile: LayoutProfile) -> str:
+        from .graph_model import model_json
+        from .layout_profiles import profiles_key
+
+        return hashlib.sha1(f"{profiles_key([profile])}\n{model_json(root)}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.svg"
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        if self.read:
+            try:
+                markup = path.read_text(encoding="utf-8")
+                os.utime(path)  # last use, for prune
+                self.hits += 1
+                return markup
+            except OSError:
+                pass
+        self.misses += 1
+        return None
+
+    def put(self, key: str, markup: str) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(markup, encoding="utf-8")
+
+    def prune(self, max_age_days: float) -> int:
+        """Delete layouts unused for `max_age_days`; returns how many."""
+        cutoff = time.time() - max_age_days * 86400
+        removed = 0
+        for path in self.directory.glob("*/*.svg"):
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed += 1
+        return removed
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import subprocess
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from .logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+def _git(repo: Path, *args: str) -> bytes:
+    try:
+        return subprocess.run(["git", "-C", str(repo), *args], check=True, capture_output=True).stdout
+    except FileNotFoundError:
+        raise ValueError("git is not installed") from None
+    except subprocess.CalledProcessError as e:
+        raise ValueError(f"git {' '.join(args)}: {e.stderr.decode('utf-8', 'replace').strip()}") from None
+
+
+def resolve_ref(repo: Path, ref: str) -> str:
+    """Commit id of `ref` (branch, tag, sha, HEAD~2, ...) in the local repository; ValueError if unknown."""
+    return _git(repo, "rev-parse", "--verify", f"{ref}^{{commit}}").decode().strip()
+
+
+def list_tree(repo: Path, commit: str) -> Dict[str, Tuple[str, int]]:
+    """
+    Regular files of `commit` below `repo` (the directory git runs in), as
+    path relative to it -> (blob id, size). Symlinks and submodules are skipped.
+    """
+    files: Dict[str, Tuple[str, int]] = {}
+    for entry in _git(repo, "ls-tree", "-r", "-l", "-z", commit).split(b"\0"):
+        if not entry:
+            continue
+        meta, path = entry.split(b"\t", 1)
+        mode, kind, blob, size = meta.split()
+        if kind == b"blob" and mode in (b"100644", b"100755"):
+            files[path.decode("utf-8", "surrogateescape")] = (blob.decode(), int(size))
+    return files
+
+
+class CatFile:
+    """
+    One long-lived `git cat-file --batch` process for a repository. Blobs are
+    addressed by id, so a file shared by several refs (or paths) is read once.
+    """
+
+    def __init__(self, repo: Path) -> None:
+        self.repo = repo
+        self._proc: Optional[subprocess.Popen] = None
+        self._blobs: Dict[str, bytes] = {}
+        self.reads = 0
+
+    def read(self, blob: str) -> bytes:
+        data = self._blobs.get(blob)
+        if data is not None:
+            return data
+        if self._proc is None:
+            self._proc = subprocess.Popen(
+                ["git", "-C", str(self.repo), "cat-file", "--batch"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+            )
+        assert self._proc.stdin is not None and self._proc.stdout is not None
+        self._proc.stdin.write(f"{blob}\n".encode())
+        self._proc.stdin.flush()
+        header = self._proc.stdout.readline().split()
+        if len(header) != 3:
+            raise FileNotFoundError(f"git object {blob} is missing from {self.repo}")
+        data = self._proc.stdout.read(int(header[2]))
+        self._proc.stdout.read(1)  # the newline after every object
+        self._blobs[blob] = data
+        self.reads += 1
+        return data
+
+    def close(self) -> None:
+        if self._proc is not None:
+            self._proc.stdin.close()  # type: ignore[union-attr]
+            self._proc.wait()
+            self._proc = None
@@ -1,16 +1,18 @@
 
-from typing import List
-from uuid import uuid4
-from graphviz import Digraph
+from typing import TYPE_CHECKING, Any, Dict, List
+
+if TYPE_CHECKING:
+    from graphviz import Digraph
 
 def no_escape(text: str) -> str:
     return text
 
 class Block:
     def __init__(self, graph_name: str, label: str, color: str, penwidth: float = 1.0, 
-                 URL: str = "", shape: str = "box", tooltip: str = ""):
+                 URL: str = "", shape: str = "box", tooltip: str = "", name: str = "n"):
         self.graph_name = graph_name
-        self.name = str(uuid4())
+        # Position in the tree ("n", "n.0", "n.0.3", ...): the same workflow always gets the same names
+        self.name = name
         self.label = label
         self.color = color
         self.penwidth = penwidth
@@ -18,13 +20,21 @@ class Block:
         self.shape = shape
         self.tooltip = tooltip
         self.subblocks: List['Block'] = []
-        self.subgraph_name = f"cluster-{uuid4()}"
+        self.subgraph_name = f"cluster-{name}"
         self.parallel = False
+        # Digdag task full name (e.g. "+wf+step+sub"); empty for non-task nodes
+        self.task_path = ""
+        self.fillcolor = ""
+        # Operator key of a task ("td>", "sh>", ...)
+        self.operator = ""
+        # Full params/meta shown in the page's side panel (node_details); detail_id is its SVG id
+        self.details: Dict[str, Any] = {}
+        self.detail_id = ""
 
     def append(self, label: str, color: str = "", penwidth: float = 1.0, 
                shape: str = "box", URL: str = "", tooltip: str = "") -> 'Block':
         block = Block(self.subgraph_name, label, color=color, penwidth=penwidth,
-                      URL=URL, shape=shape, tooltip=tooltip)
+                      URL=URL, shape=shape, tooltip=tooltip, name=f"{self.name}.{len(self.subblocks)}")
         self.subblocks.append(block)
         return block
 
@@ -39,7 +49,7 @@ class Block:
                 return self.subblocks[-1].last()
         return [self]
 
-    def draw(self, dot: Digraph) -> None:
+    def draw(self, dot: "Digraph") -> None:
         dot.node(
             self.name,
             no_escape(self.label),
@@ -47,7 +57,9 @@ class Block:
             penwidth=str(self.penwidth),
             shape=self.shape,
             URL=self.URL,
-            tooltip=no_escape(self.tooltip)
+            tooltip=no_escape(self.tooltip),
+            **({"style": "filled", "fillcolor": self.fillcolor} if self.fillcolor else {}),
+            **({"id": self.detail_id} if self.detail_id else {})
         )
         prev = [self]
         with dot.subgraph(name=self.subgraph_name) as c:
@@ -2,21 +2,32 @@ from __future__ import annotations
 
 import json
 import os
+import time
+from contextlib import nullcontext
 from pathlib import Path
-from typing import Any, Dict, List, Optional
-
-from graphviz import Digraph
-from cron_descriptor import get_description
+from typing import TYPE_CHECKING, Any, ContextManager, Dict, List, Optional, Sequence, Tuple
 
+from . import vfs
 from .graph_blocks import Block
-from .yaml_includes import DigLoader, resolve_includes
+from .yaml_includes import DigLoader, IncludeCycleError, resolve_includes
 from .sql_extract import maybe_sql_path
-from .html_pages import write_workflow_html_inline, write_sql_page
+from .sql_resolver import SqlResolution, SqlResolver
+from .html_pages import history_summary_html, sql_chunks, write_workflow_html_inline, write_sql_page
 from .index_page import ScheduleEntry
-from .constants import GRAPHS_DIR
+from .constants import DEFAULT_LABEL_BUDGET, GRAPHS_DIR, SQL_CHUNK_BYTES, SQL_STREAM_BYTES
 from .logging_config import get_logger
-from .td_meta import td_task_meta, td_console_links, td_tooltip  # NEW
+from .node_details import DETAILS_SUFFIX, apply_label_budget, collect_details, write_details
+from .task_index import task_index_json
+from .td_meta import ExportScope, td_task_meta, td_console_links, td_tooltip
 from .digdag_meta import normalize_retry, retry_tooltip
+from .schedule_labels import LABELS
+from .sql_lineage import LineageCache, extract_tables, extract_tables_chunked, normalize_table_name
+from .workflow_info import SqlRef, TaskMeta, WorkflowInfo
+
+if TYPE_CHECKING:
+    from .build_report import BuildReport
+    from .dot_layout import LayoutCache
+    from .layout_profiles import LayoutProfile
 
 
 logger = get_logger(__name__)
@@ -28,6 +39,7 @@ PALETTE = {
     "td>": dict(color="webgreen", shape="box"),
     "td_load>": dict(color="darkseagreen4", shape="cds"),
     "td_wait>": dict(color="darkgoldenrod3", shape="hexagon"),
+    "td_wait_table>": dict(color="darkgoldenrod3", shape="hexagon"),
     "td_for_each>": dict(color="lightskyblue4", shape="folder"),
     "http>": dict(color="darkgreen", shape="box"),
     "mail>": dict(color="crimson", shape="box"),
@@ -64,6 +76,40 @@ def _workflow_html_href(filepath: str) -> str:
     return f"./{GRAPHS_DIR}/{project}/{wf_html}"
 
 
+def _stage(report: Optional["BuildReport"], name: str) -> ContextManager[None]:
+    return report.stage(name) if report is not None else nullcontext()
+
+
+def _retry_limit(val: Any) -> Optional[int]:
+    rt = normalize_retry(val)
+    try:
+        return int(rt["limit"]) if rt and "limit" in rt else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _graphviz_available() -> bool:
+    global _HAS_DOT
+    if _HAS_DOT is None:
+        import shutil
+
+        _HAS_DOT = shutil.which("dot") is not None
+    return _HAS_DOT
+
+
+_HAS_DOT: Optional[bool] = None
+
+
+def _use_builtin_layout(root: Block, layout: str) -> bool:
+    if layout == "builtin":
+        return True
+    if layout == "graphviz":
+        return False
+    from .sp_layout import qualifies
+
+    return qualifies(root) or not _graphviz_available()
+
+
 def _kv_lines(d: Dict[str, Any], prefix: str = "") -> List[str]:
     lines: List[str] = []
     for k, v in d.items():
@@ -75,21 +121,99 @@ def _kv_lines(d: Dict[str, Any], prefix: str = "") -> List[str]:
     return lines
 
 
+def _write_sql_ref(
+    block: Block,
+    res: SqlResolution,
+    meta: Dict[str, Any],
+    filepath: str,
+    project: str,
+    info: Optional[WorkflowInfo],
+    lineage: Optional[LineageCache],
+    report: Optional["BuildReport"],
+) -> None:
+    """Read a td> task's SQL file, record its tables, write its page and link the node to it."""
+    workflow_html_abs = _workflow_html_abs(filepath)
+    sql_path, src_sql_abs = res.path, Path(res.abs_path)
+    logger.info(f"Reading SQL from {src_sql_abs}")
+
+    # Output under graphs/<project>/queries/... .html
+    out_html_abs = Path(os.getcwd()) / GRAPHS_DIR / project / Path(sql_path).with_suffix(".html")
+    out_html_abs.parent.mkdir(parents=True, exist_ok=True)
+
+    tables = None
+    # Large files are mapped, not read: hashed as bytes, their tables extracted
+    # and their page written a chunk at a time, so the whole text is never decoded
+    large = res.found and vfs.getsize(src_sql_abs) > SQL_STREAM_BYTES
+    if large:
+        sql_text = ""
+        with vfs.mapped(src_sql_abs) as data:
+            chunks = sql_chunks(data, SQL_CHUNK_BYTES)
+            tables = lineage.tables_for_bytes(data, chunks) if lineage else extract_tables_chunked(chunks)
+    elif res.found:
+        sql_text = vfs.read_text(src_sql_abs)
+        tables = lineage.tables_for(sql_text) if lineage else extract_tables(sql_text)
+    else:
+        sql_text = f"-- FileNotFoundError: {src_sql_abs} ({res.reason})"
+        logger.warning(f"SQL file not found: {src_sql_abs} ({res.reason})")
+
+    if info is not None and tables is not None:
+        info.sql_refs.append(
+            SqlRef(
+                task=block.label.split("\n", 1)[0],
+                path=sql_path,
+                href=f"./{GRAPHS_DIR}/{project}/{Path(sql_path).with_suffix('.html').as_posix()}",
+                reads=tables.reads,
+                writes=tables.writes,
+            )
+        )
+
+    # TD Console links
+    links = td_console_links(meta, sql_text, tables)
+
+    # Back link + write SQL page (now with meta & links)
+    back_href = os.path.relpath(workflow_html_abs, out_html_abs.parent).replace("\\", "/")
+    with _stage(report, "sql_pages"), (vfs.mapped(src_sql_abs) if large else nullcontext()) as sql_bytes:
+        write_sql_page(
+            project=project,
+            querypath=sql_path,
+            sql_text=sql_text,
+            back_href=back_href,
+            out_html_abs=out_html_abs,
+            td_meta=meta,
+            td_links=links,
+            sql_bytes=sql_bytes,
+        )
+
+    # Link the graph node to the generated SQL page
+    block.URL = os.path.relpath(out_html_abs, workflow_html_abs.parent).replace("\\", "/")
+
+
 def _load_block_tree(
     root: Block,
     data: Optional[Dict[str, Any]],
     filepath: str,
     schedule_entries: List[ScheduleEntry],
+    info: Optional[WorkflowInfo] = None,
+    lineage: Optional[LineageCache] = None,
+    report: Optional["BuildReport"] = None,
+    exports: Optional[ExportScope] = None,
+    sql: Optional[SqlResolver] = None,
+    pages: bool = True,
 ) -> None:
     root.penwidth = 1.0
     root.URL = ""
     dirpath = str(Path(filepath).parent) + "/"
+    declared = data is not None
 
     if data is None:
         data = {"Empty Task": "This is empty dummy task"}
 
-    # Prefer reading global exports once for td meta
-    global_exports = data.get("_export", {}) if isinstance(data, dict) else {}
+    # _export chain (root → group → task) resolved once per level; children share it
+    scope = (exports or ExportScope()).child(data.get("_export") if isinstance(data, dict) else None)
+    sql = sql if sql is not None else SqlResolver()
+
+    # Operator / td meta / _retry of this task, for the catalog
+    task_meta = TaskMeta(task=root.label.split("\n", 1)[0] if root.graph_name != "root" else _wf_from_path(filepath))
 
     for key in list(data.keys()):
         val = data.get(key)
@@ -98,17 +222,25 @@ def _load_block_tree(
         project = _proj_from_path(filepath)
         workflow_name = _wf_from_path(filepath)
 
+        top_level = root.graph_name == "root"
+
+        if key.endswith(">") and not key.startswith("+"):
+            task_meta.operator = key
+            root.operator = key
+
         if key == "timezone":
             st = _style_for("timezone")
             root.append(val, color="mediumspringgreen", shape="cds")
+            if info is not None and top_level:
+                info.timezone = val
 
         if key == "schedule":
-            if isinstance(val, dict) and "cron>" in val:
-                label = f"{json.dumps(val)}\n{get_description(val['cron>'])}"
-            else:
-                label = f"{key}\n{json.dumps(val)}"
+            label = LABELS.node_label(val)
             st = _style_for("schedule")
-            root.append(label=label, color="magenta1", URL="", shape="component")
+            node = root.append(label=label, color="magenta1", URL="", shape="component")
+            node.details["schedule"] = val
+            if info is not None and top_level:
+                info.schedule = val
             schedule_entries.append(
                 ScheduleEntry(
                     project=project,
@@ -121,14 +253,15 @@ def _load_block_tree(
         if key == "_export":
             label = f"_export\n{chr(10).join(_kv_lines(val))}"
             st = _style_for("_export")
-            root.append(label=label, color="goldenrod4", URL="", shape="box3d", penwidth=2.0)
+            node = root.append(label=label, color="goldenrod4", URL="", shape="box3d", penwidth=2.0)
+            node.details["_export"] = val
 
         if key == "_parallel":
             root.color = "purple2"
             root.parallel = val
 
         # ---- TD operator awareness ----
-        if key in ("td>", "td_load>", "td_wait>", "td_for_each>"):
+        if key in ("td>", "td_load>", "td_wait>", "td_wait_table>", "td_for_each>"):
             st = _style_for(key)
             root.color = st["color"]
             root.shape = st["shape"]
@@ -136,51 +269,43 @@ def _load_block_tree(
             root.label = f"{root.label}\n{val}"
 
             # TD meta + tooltip
-            meta = td_task_meta(val, global_exports)
+            meta = td_task_meta(val, scope, task=data)
             root.tooltip = td_tooltip(meta)
+            if meta:
+                root.details["td"] = meta
+            task_meta.database = meta.get("database")
+            task_meta.engine = meta.get("engine")
+            task_meta.priority = meta.get("priority")
+            if task_meta.retry is None:
+                task_meta.retry = _retry_limit(meta.get("retry"))
+
+            # Table waits feed the cross-workflow dependency graph
+            if info is not None and key == "td_wait_table>" and isinstance(val, str):
+                info.waits.append(normalize_table_name(val.strip()))
+            if info is not None and key == "td_wait>":
+                wait_sql = maybe_sql_path(val)
+                if wait_sql:
+                    res = sql.resolve(dirpath, wait_sql, scope.vars)
+                    info.inputs.append(res.abs_path)
+                    if res.found:
+                        wait_text = vfs.read_text(res.abs_path)
+                        tables = lineage.tables_for(wait_text) if lineage else extract_tables(wait_text)
+                        info.waits.extend(tables.reads)
+                    else:
+                        info.unresolved_sql.append((task_meta.task, res.ref, res.reason))
+                        logger.warning(f"td_wait> SQL file not found: {wait_sql} ({res.reason})")
 
             # If it's a td> query (not load/wait/for_each) and references SQL, generate a page + link
             if key == "td>":
-                sql_path = maybe_sql_path(val)
-                if sql_path:
-                    workflow_html_abs = _workflow_html_abs(filepath)
-                    src_sql_abs = Path(filepath).parent / sql_path  # read relative to .dig
-                    logger.info(f"Reading SQL from {src_sql_abs}")
-
-                    # Output under graphs/<project>/queries/... .html
-                    out_html_abs = (
-                        Path(os.getcwd()) / GRAPHS_DIR / project / Path(sql_path).with_suffix(".html")
-                    )
-                    out_html_abs.parent.mkdir(parents=True, exist_ok=True)
-
-                    try:
-                        sql_text = src_sql_abs.read_text(encoding="utf-8")
-                    except FileNotFoundError:
-                        sql_text = f"-- FileNotFoundError: {src_sql_abs}"
-                        logger.warning(f"SQL file not found: {src_sql_abs}")
-
-                    # TD Console links
-                    links = td_console_links(meta, sql_text)
-
-                    # Back link + write SQL page (now with meta & links)
-                    back_href = os.path.relpath(workflow_html_abs, out_html_abs.parent).replace(
-                        "\\", "/"
-                    )
-                    write_sql_page(
-                        project=project,
-                        querypath=sql_path,
-                        sql_text=sql_text,
-                        back_href=back_href,
-                        out_html_abs=out_html_abs,
-                        td_meta=meta,
-                        td_links=links,
-                    )
-
-                    # Link the graph node to the generated SQL page
-                    href_from_workflow = os.path.relpath(
-                        out_html_abs, workflow_html_abs.parent
-                    ).replace("\\", "/")
-                    root.URL = href_from_workflow
+                ref = maybe_sql_path(val)
+                res = sql.resolve(dirpath, ref, scope.vars) if ref else None
+                if res is not None and info is not None:
+                    # relative to the .dig; ${...} expanded from _export or matched against the index
+                    info.inputs.append(res.abs_path)
+                    if not res.found:
+                        info.unresolved_sql.append((task_meta.task, res.ref, res.reason))
+                if res is not None and pages:
+                    _write_sql_ref(root, res, meta, filepath, project, info, lineage, report)
 
         # Other ops (http/mail/if/call/require)
         if key == "http>":
@@ -211,24 +336,40 @@ def _load_block_tree(
                 fpath += ".dig"
                 root.label = f"{root.label}\n{val}.dig"
                 root.URL = f"./{val}.html"
-            if not os.path.exists(fpath):
-                for p in Path(fpath).parent.parent.rglob(f"{val}.dig"):
+            target_project = project
+            found = vfs.exists(fpath)
+            if found:
+                target_project = Path(fpath).resolve().parent.name
+            else:
+                for p in vfs.rglob(Path(fpath).parent.parent, f"{val}.dig"):
                     root.URL = f"../{p.parent.name}/{val}.html"
+                    target_project = p.parent.name
+                    found = True
+            if info is not None:
+                info.calls.append((key, f"{target_project}/{Path(fpath).name}"))
+                if not found:
+                    info.issues.append((task_meta.task, "call", f"{key} target not found: {val}"))
 
         if key in ["_do"]:
             st = _style_for("_do")
             block = root.append(key, penwidth=1.0, color=st["color"], shape=st["shape"])
-            _load_block_tree(block, val, filepath, schedule_entries)
+            block.task_path = root.task_path + "^sub"
+            _load_block_tree(block, val, filepath, schedule_entries, info, lineage, report, scope, sql, pages)
 
         if key in ["_error"]:
             st = _style_for("_error")
             block = root.append(key, penwidth=1.0, color=st["color"], shape=st["shape"])
-            _load_block_tree(block, val, filepath, schedule_entries)
+            block.task_path = root.task_path + "^error"
+            _load_block_tree(block, val, filepath, schedule_entries, info, lineage, report, scope, sql, pages)
         
                 # --- Digdag retry annotation ---
         if key == "_retry":
             rt = normalize_retry(val)
+            task_meta.retry = _retry_limit(val)
+            if info is not None and task_meta.retry is None and not (isinstance(val, str) and "${" in val):
+                info.issues.append((task_meta.task, "retry", f"malformed _retry: {val!r}"))
             if rt:
+                root.details["retry"] = rt
                 # Append a line to the node label for quick visibility
                 root.label = f"{root.label}\n_retry: {rt.get('limit', val)}"
                 # Enrich tooltip (append; keep existing content)
@@ -247,50 +388,215 @@ def _load_block_tree(
             root.URL = f"../../{SCHEDULE_INDEX_FILE}"
 
         child = root.append(key)
-        _load_block_tree(child, val, filepath, schedule_entries)
-
-
-def generate_graph(input_filepath: str, output_dot_file: str) -> None:
+        child.task_path = root.task_path + key
+        _load_block_tree(child, val, filepath, schedule_entries, info, lineage, report, scope, sql, pages)
+
+    # Everything but the subtasks (operator, its params, _export, _retry, ...) goes to the side panel
+    if declared and root.graph_name != "root" and isinstance(data, dict):
+        params = {k: v for k, v in data.items() if not k.startswith("+") and k not in ("_do", "_error")}
+        if params:
+            root.details["params"] = params
+
+    if info is not None and (task_meta.operator or task_meta.retry is not None):
+        info.tasks.append(task_meta)
+
+
+def build_workflow(
+    input_filepath: str,
+    lineage: Optional[LineageCache] = None,
+    report: Optional["BuildReport"] = None,
+    sql: Optional[SqlResolver] = None,
+    pages: bool = True,
+    label_budget: int = DEFAULT_LABEL_BUDGET,
+) -> Optional[Tuple[Block, WorkflowInfo]]:
     """
-    Build the graph for a single .dig file, render SVG + inline-HTML page,
-    and generate SQL pages for any td> file references.
+    Parse a single .dig file into its Block tree and collect its WorkflowInfo
+    (schedule, SQL references, call/require targets, table waits).
+    SQL pages for td> file references are written along the way; references
+    are looked up in `sql` (a SqlResolver shared across workflows, so each
+    project's .sql files are indexed once). With pages=False nothing is
+    written and SQL files aren't read: only the tree and the problems found
+    (WorkflowInfo.unresolved_sql / issues) are collected.
+
+    Node labels are cut to `label_budget` characters (0: no limit); the full
+    values stay in each Block's details for the page's side panel.
+
+    With `report`, time is accumulated into its "parse", "includes", "tree"
+    and "sql_pages" stages.
+    Returns None if the workflow could not be loaded; with pages=False an
+    include cycle is returned as an "include" issue instead.
     """
-    dot = Digraph(format="svg", edge_attr={"color": "red"})
-    dot.attr(target="_top")
+    info = WorkflowInfo(
+        project=_proj_from_path(input_filepath),
+        workflow=_wf_from_path(input_filepath),
+        path=str(input_filepath),
+        href=_workflow_html_href(input_filepath),
+        inputs=[str(input_filepath)],
+    )
     root = Block("root", "Click to HomePage", "brown")
+    root.task_path = "+" + Path(input_filepath).stem
 
     try:
-        with open(input_filepath, encoding="utf-8") as f:
+        with vfs.open_text(input_filepath) as f:
             import yaml
 
-            data_raw = yaml.load(f, Loader=DigLoader)
-            data = resolve_includes(data_raw)
-            _load_block_tree(root, data, input_filepath, [])
+            with _stage(report, "parse"):
+                data_raw = yaml.load(f, Loader=DigLoader)
+            with _stage(report, "includes"):
+                missing: List[str] = []
+                data = resolve_includes(data_raw, info.inputs, missing, (Path(input_filepath).resolve(),))
+                info.issues.extend(("", "include", f"include file not found: {m}") for m in missing)
+            with _stage(report, "tree"):
+                _load_block_tree(root, data, input_filepath, [], info, lineage, report, None, sql, pages)
+                apply_label_budget(root, label_budget)
     except FileNotFoundError:
         logger.error(f"Input file not found: {input_filepath}")
-        return
+        return None
+    except IncludeCycleError as e:
+        logger.error(f"Error loading workflow {input_filepath}: {e}")
+        if pages:
+            return None
+        # Parse-only: report the cycle as the workflow's include problem
+        info.issues.append(("", "include", str(e)))
+        return root, info
     except Exception as e:
         logger.error(f"Error loading workflow {input_filepath}: {e}", exc_info=True)
-        return
+        return None
+    return root, info
 
-    root.draw(dot)
 
-    try:
-        dot.render(output_dot_file)
-    except Exception as e:
-        logger.error(f"Error rendering graph for {input_filepath}: {e}", exc_info=True)
-        return
+def render_workflow(
+    root: Block,
+    info: WorkflowInfo,
+    output_dot_file: str,
+    related_html: str = "",
+    report: Optional["BuildReport"] = None,
+    mode: str = "svg",
+    layout: str = "auto",
+    layout_timeout: Optional[float] = None,
+    profiles: Optional[Sequence["LayoutProfile"]] = None,
+    layout_cache: Optional["LayoutCache"] = None,
+) -> bool:
+    """
+    Lay out a Block tree and write the inline-SVG workflow page.
+    `related_html` is an extra section (e.g. upstream/downstream) placed below the graph.
+    With `report`, time is accumulated into its "dot", "layout" and "pages" stages.
+
+    `layout` picks the engine: "builtin" (in-process series-parallel layout,
+    no .gv/.svg files), "graphviz", or "auto" (builtin when the tree
+    qualifies or Graphviz isn't installed). A Graphviz layout gets
+    `layout_timeout` seconds per attempt before it is retried in a cheaper
+    mode, down to a nested-list page (see dot_layout); degradations are
+    recorded in the report's "degraded" section. Graphviz settings come from
+    the first of `profiles` (default DEFAULT_PROFILES) the graph's size fits;
+    layout time per profile and size goes to the "layout_profiles" section.
+    A `layout_cache` hit reuses a stored SVG of the identical graph instead.
+
+    Node details (operator params, td meta, _retry, _export, cut labels) are
+    written to `<output_dot_file>.details.json`, which the page's side panel
+    fetches on the first node click. The page's task finder searches an
+    embedded index of task paths, operators and node boxes (task_index).
+
+    mode="client" skips layout entirely: the page embeds the tree's JSON model
+    and lays it out in the browser (graphs/assets/graph_layout.js must be installed).
+    """
+    html_path = output_dot_file + ".html"
+    history_html = history_summary_html(info.history)
+    details_path = Path(output_dot_file + DETAILS_SUFFIX)
+    with _stage(report, "pages"):
+        details_href = details_path.name if write_details(details_path, collect_details(root)) else ""
+    if mode == "client":
+        from .graph_model import model_json
+
+        with _stage(report, "model"):
+            model = model_json(root)
+        with _stage(report, "pages"):
+            write_workflow_html_inline(
+                "", html_path, info.project, info.workflow, related_html,
+                graph_model=model, history_html=history_html, details_href=details_href,
+                task_index=task_index_json(root),
+            )
+        return True
+
+    if _use_builtin_layout(root, layout):
+        from .sp_layout import render_svg
+
+        with _stage(report, "layout"):
+            svg_text = render_svg(root)
+        with _stage(report, "pages"):
+            write_workflow_html_inline(
+                svg_text, html_path, info.project, info.workflow, related_html,
+                history_html=history_html, details_href=details_href,
+                task_index=task_index_json(root, svg_text),
+            )
+        return True
+
+    import graphviz
+
+    from .dot_layout import LayoutOutcome, flatten_clusters, layout_with_fallbacks
+    from .layout_profiles import DEFAULT_PROFILES, measure, pick_profile, record_layout
 
-    svg_path = output_dot_file + ".svg"
     try:
-        svg_text = Path(svg_path).read_text(encoding="utf-8")
+        with _stage(report, "dot"):
+            size = measure(root)
+            profile = pick_profile(size, profiles or DEFAULT_PROFILES)
+            dot = graphviz.Digraph(format="svg", edge_attr={"color": "red"}, graph_attr=profile.graph_attr)
+            dot.attr(target="_top")
+            root.draw(dot)
+            source = flatten_clusters(dot.source) if profile.flatten else dot.source
+            Path(output_dot_file).write_text(source, encoding="utf-8")
     except Exception as e:
-        logger.error(f"Failed reading SVG {svg_path}: {e}")
-        svg_text = (
-            "<svg xmlns='http://www.w3.org/2000/svg'><text x='10' y='20'>SVG read error</text></svg>"
+        logger.error(f"Error rendering graph for {info.path}: {e}", exc_info=True)
+        return False
+
+    key = layout_cache.key(root, profile) if layout_cache is not None else ""
+    cached = layout_cache.get(key) if layout_cache is not None else None
+    t0 = time.perf_counter()
+    with _stage(report, "layout"):
+        if cached is not None:
+            outcome = LayoutOutcome("full", cached)
+        else:
+            outcome = layout_with_fallbacks(root, layout_timeout, source=source, profile=profile)
+    if layout_cache is not None and cached is None and not outcome.degraded:
+        layout_cache.put(key, outcome.markup)
+    if report is not None and cached is None:
+        stats = report.sections.get("layout_profiles", {})
+        record_layout(stats, profile.name, size, time.perf_counter() - t0)
+        report.set("layout_profiles", **stats)
+    if outcome.degraded:
+        logger.warning(f"Degraded layout for {info.path}: {outcome.mode} ({'; '.join(outcome.reasons)})")
+        if report is not None:
+            report.set("degraded", **{info.path: {"mode": outcome.mode, "reasons": outcome.reasons}})
+    if outcome.mode != "list":
+        Path(output_dot_file + ".svg").write_text(outcome.markup, encoding="utf-8")
+    else:
+        # No graph this time: an earlier build's SVG would be stale (and still deployed)
+        Path(output_dot_file + ".svg").unlink(missing_ok=True)
+
+    with _stage(report, "pages"):
+        write_workflow_html_inline(
+            outcome.markup, html_path, info.project, info.workflow, related_html,
+            history_html=history_html, details_href=details_href,
+            task_index=task_index_json(root, outcome.markup) if outcome.mode != "list" else None,
         )
+    return True
 
-    html_path = output_dot_file + ".html"
-    project = _proj_from_path(input_filepath)
-    workflow = _wf_from_path(input_filepath)
-    write_workflow_html_inline(svg_text, html_path, project, workflow)
+
+def generate_graph(
+    input_filepath: str,
+    output_dot_file: str,
+    lineage: Optional[LineageCache] = None,
+) -> Optional[WorkflowInfo]:
+    """
+    Build the graph for a single .dig file, render SVG + inline-HTML page,
+    and generate SQL pages for any td> file references.
+
+    Returns the collected WorkflowInfo, or None if the workflow failed to build.
+    """
+    built = build_workflow(input_filepath, lineage=lineage)
+    if built is None:
+        return None
+    root, info = built
+    if not render_workflow(root, info, output_dot_file):
+        return None
+    return info
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import json
+from importlib import resources
+from pathlib import Path
+from typing import Any, Dict
+
+from .graph_blocks import Block
+
+LAYOUT_ASSET = "graph_layout.js"
+
+# Graphviz resolves colors in the X11 scheme; browsers only know the CSS subset
+# (and disagree on a few, e.g. "green"). Every color the generator uses is here.
+X11_COLORS = {
+    "black": "#000000",
+    "white": "#ffffff",
+    "red": "#ff0000",
+    "green": "#00ff00",
+    "webgreen": "#008000",
+    "darkgreen": "#006400",
+    "brown": "#a52a2a",
+    "crimson": "#dc143c",
+    "cornflowerblue": "#6495ed",
+    "darkseagreen4": "#698b69",
+    "darkgoldenrod3": "#cd950c",
+    "lightskyblue4": "#607b8b",
+    "darkorchid2": "#b23aee",
+    "lightslategrey": "#778899",
+    "lightslategray": "#778899",
+    "mediumspringgreen": "#00fa9a",
+    "magenta1": "#ff00ff",
+    "goldenrod4": "#8b6914",
+    "purple2": "#912cee",
+    "grey": "#bebebe",
+    "gray": "#bebebe",
+}
+
+
+def css_color(name: str, default: str = "#000000") -> str:
+    """X11 color name (or #hex) -> CSS hex; unknown or empty names fall back to `default`."""
+    if not name:
+        return default
+    if name.startswith("#"):
+        return name
+    return X11_COLORS.get(name.lower(), default)
+
+
+def block_to_model(block: Block) -> Dict[str, Any]:
+    """
+    Compact JSON-able model of a Block tree. Keys are one letter and default
+    values are omitted: l=label, c=color, f=fill color, s=shape, w=penwidth,
+    u=URL, t=tooltip, i=SVG id (node_details), p=parallel, k=children. Edges
+    and clusters are implied by the tree exactly as Block.draw emits them:
+    children form a cluster, and each child is entered from the parent
+    (parallel) or the previous child's last nodes (sequential).
+    """
+    node: Dict[str, Any] = {"l": block.label}
+    color = css_color(block.color)
+    if color != "#000000":
+        node["c"] = color
+    if block.fillcolor:
+        node["f"] = css_color(block.fillcolor, "#ffffff")
+    if block.shape != "box":
+        node["s"] = block.shape
+    if float(block.penwidth) != 1.0:
+        node["w"] = float(block.penwidth)
+    if block.URL:
+        node["u"] = block.URL
+    if block.tooltip:
+        node["t"] = block.tooltip
+    if block.detail_id:
+        node["i"] = block.detail_id
+    if block.parallel:
+        node["p"] = 1
+    if block.subblocks:
+        node["k"] = [block_to_model(b) for b in block.subblocks]
+    return node
+
+
+def model_json(root: Block) -> str:
+    """The model as compact JSON, safe to embed in a <script> element."""
+    text = json.dumps({"v": 1, "root": block_to_model(root)}, separators=(",", ":"), ensure_ascii=False)
+    return text.replace("</", "<\\/")
+
+
+def install_layout_asset(assets_dir: Path) -> Path:
+    """Copy the browser layout script into `assets_dir` (only when it differs)."""
+    data = resources.files("digdaggraph").joinpath("assets").joinpath(LAYOUT_ASSET).read_bytes()
+    dest = Path(assets_dir) / LAYOUT_ASSET
+    if not dest.exists() or dest.read_bytes() != data:
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        dest.write_bytes(data)
+    return dest
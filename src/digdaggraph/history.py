@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import urllib.request
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .graph_blocks import Block
+from .logging_config import get_logger
+from .workflow_info import WorkflowInfo
+
+logger = get_logger(__name__)
+
+# Node fill from the fastest to the slowest fifth of a workflow's tasks
+HEAT_COLORS = ("#fff8e1", "#ffe0b2", "#ffcc80", "#ffab91", "#ff8a80")
+CRITICAL_COLOR = "crimson"
+CRITICAL_PENWIDTH = 4.0
+PAGE_SIZE = 100
+
+
+@dataclass
+class TaskStats:
+    runs: int
+    p50: float
+    p95: float
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of `values` (q in 0..100)."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+def format_duration(seconds: float) -> str:
+    s = int(round(seconds))
+    if s < 60:
+        return f"{s}s"
+    if s < 3600:
+        return f"{s // 60}m{s % 60:02d}s"
+    return f"{s // 3600}h{s % 3600 // 60:02d}m"
+
+
+def _timestamp(value: Any) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def _name(value: Any) -> str:
+    return str(value.get("name", "")) if isinstance(value, dict) else str(value or "")
+
+
+class AttemptHistory:
+    """
+    Durations of finished Digdag attempts and their tasks, keyed like
+    WorkflowInfo.key ("project/workflow.dig") and the task full name
+    ("+workflow+group+task"), as the attempts/tasks REST endpoints report them.
+    """
+
+    def __init__(self) -> None:
+        self.tasks: Dict[str, Dict[str, List[float]]] = {}
+        self.runs: Dict[str, List[float]] = {}
+        self.attempts = 0
+
+    def add_attempt(self, attempt: Dict[str, Any], tasks: Iterable[Dict[str, Any]]) -> None:
+        if not attempt.get("done", True):
+            return
+        key = f"{_name(attempt.get('project'))}/{_name(attempt.get('workflow'))}.dig"
+        self.attempts += 1
+        start, end = _timestamp(attempt.get("createdAt")), _timestamp(attempt.get("finishedAt"))
+        if attempt.get("success", True) and start is not None and end is not None:
+            self.runs.setdefault(key, []).append(end - start)
+        per_task = self.tasks.setdefault(key, {})
+        for t in tasks:
+            if t.get("state") != "success":
+                continue
+            start, end = _timestamp(t.get("startedAt")), _timestamp(t.get("updatedAt"))
+            if start is not None and end is not None and t.get("fullName"):
+                per_task.setdefault(t["fullName"], []).append(max(0.0, end - start))
+
+    def stats(self, key: str) -> Dict[str, TaskStats]:
+        return {
+            name: TaskStats(len(d), percentile(d, 50), percentile(d, 95))
+            for name, d in self.tasks.get(key, {}).items()
+        }
+
+    def digest(self, key: str) -> str:
+        """Changes whenever the overlay of workflow `key` would; "" without history."""
+        if key not in self.tasks and key not in self.runs:
+            return ""
+        data = [sorted((n, sorted(d)) for n, d in self.tasks.get(key, {}).items()), sorted(self.runs.get(key, []))]
+        return hashlib.sha1(json.dumps(data).encode("utf-8")).hexdigest()
+
+    @classmethod
+    def from_export(cls, path: Path) -> "AttemptHistory":
+        """
+        Read an export: a JSON file (or a directory of them), each the attempts
+        endpoint's `{"attempts": [...]}` (or a bare list) with every attempt's
+        task list embedded under "tasks".
+        """
+        path = Path(path)
+        files = sorted(path.glob("*.json")) if path.is_dir() else [path]
+        history = cls()
+        for f in files:
+            data = json.loads(f.read_text(encoding="utf-8"))
+            attempts = data.get("attempts", []) if isinstance(data, dict) else data
+            for a in attempts:
+                history.add_attempt(a, a.get("tasks", []))
+        return history
+
+    @classmethod
+    def from_server(cls, base_url: str, cache_path: Path, limit: int) -> "AttemptHistory":
+        """
+        Page through the newest `limit` attempts of a Digdag server
+        (GET /api/attempts) and fetch each finished attempt's tasks
+        (GET /api/attempts/{id}/tasks). Finished attempts never change, so
+        their tasks are cached in `cache_path` and only new attempts cost a request.
+        """
+        base = base_url.rstrip("/")
+        cache_path = Path(cache_path)
+        try:
+            cache = json.loads(cache_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            cache = {}
+        fetched: Dict[str, Any] = {}
+        last_id: Optional[str] = None
+        requests = 0
+        while len(fetched) < limit:
+            size = min(PAGE_SIZE, limit - len(fetched))
+            url = f"{base}/api/attempts?page_size={size}" + (f"&last_id={last_id}" if last_id else "")
+            page = _get_json(url).get("attempts", [])
+            requests += 1
+            for a in page:
+                last_id = str(a["id"])
+                if not a.get("done"):
+                    continue
+                entry = cache.get(last_id)
+                if entry is None:
+                    entry = {"attempt": a, "tasks": _get_json(f"{base}/api/attempts/{last_id}/tasks").get("tasks", [])}
+                    requests += 1
+                fetched[last_id] = entry
+            if len(page) < size:
+                break
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        cache_path.write_text(json.dumps(fetched, separators=(",", ":")), encoding="utf-8")
+        logger.info(f"Attempt history: {len(fetched)} attempts from {base} ({requests} requests)")
+        history = cls()
+        for entry in fetched.values():
+            history.add_attempt(entry["attempt"], entry["tasks"])
+        return history
+
+
+def _get_json(url: str) -> Dict[str, Any]:
+    with urllib.request.urlopen(url, timeout=30) as resp:
+        return json.loads(resp.read().decode("utf-8"))
+
+
+def load_history(source: str, cache_path: Path, limit: int) -> AttemptHistory:
+    """`source` is a Digdag server URL (http[s]://...) or an export file/directory."""
+    if source.startswith(("http://", "https://")):
+        return AttemptHistory.from_server(source, cache_path, limit)
+    return AttemptHistory.from_export(Path(source))
+
+
+def _tasks(root: Block) -> Iterable[Block]:
+    stack = [root]
+    while stack:
+        b = stack.pop()
+        if b.task_path:
+            yield b
+        stack.extend(b.subblocks)
+
+
+def critical_path(block: Block, stats: Dict[str, TaskStats]) -> Tuple[float, List[Block]]:
+    """
+    Longest chain of p50 durations through the tree: sequential children add
+    up, the slowest `_parallel` child wins. A group without timed children
+    counts its own duration. `_error` branches are not part of a normal run.
+    """
+    kids = [b for b in block.subblocks if b.task_path and not b.task_path.endswith("^error")]
+    own = stats.get(block.task_path)
+    results = [critical_path(k, stats) for k in kids]
+    if block.parallel:
+        cost, path = max(results, key=lambda r: r[0], default=(0.0, []))
+    else:
+        cost, path = sum(r[0] for r in results), [b for r in results for b in r[1]]
+    if not cost and own:
+        cost = own.p50
+    return cost, ([block] if own else []) + path
+
+
+def apply_history(root: Block, info: WorkflowInfo, history: AttemptHistory) -> None:
+    """
+    Annotate the tree with p50/p95 task durations, fill nodes by duration,
+    highlight the critical path and store the summary in `info.history`.
+    """
+    stats = history.stats(info.key)
+    runs = history.runs.get(info.key, [])
+    info.history = {}
+    if not stats and not runs:
+        return
+    timed = [b for b in _tasks(root) if b.task_path in stats and b is not root]
+    top = max((stats[b.task_path].p50 for b in timed), default=0.0)
+    for b in timed:
+        s = stats[b.task_path]
+        b.label = f"{b.label}\np50 {format_duration(s.p50)} · p95 {format_duration(s.p95)}"
+        tip = f"{s.runs} runs, p50 {format_duration(s.p50)}, p95 {format_duration(s.p95)}"
+        b.tooltip = f"{b.tooltip} • {tip}" if b.tooltip else tip
+        share = s.p50 / top if top else 0.0
+        b.fillcolor = HEAT_COLORS[min(len(HEAT_COLORS) - 1, int(share * len(HEAT_COLORS)))]
+
+    cost, path = critical_path(root, stats)
+    for b in path:
+        if b is not root:
+            b.color, b.penwidth = CRITICAL_COLOR, CRITICAL_PENWIDTH
+    info.history = {
+        "attempts": len(runs),
+        "p50": percentile(runs, 50),
+        "p95": percentile(runs, 95),
+        "critical_s": cost,
+        "critical_path": [[b.task_path, stats[b.task_path].p50] for b in path if b is not root],
+    }
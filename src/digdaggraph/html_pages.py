@@ -1,16 +1,110 @@
 # src/digdaggraph/html_pages.py
 from __future__ import annotations
 
+import json
 from pathlib import Path
 from html import escape as _escape_html
-from typing import Optional, Dict
+from typing import Any, Dict, Iterator, List, Optional
 
+from .constants import SQL_CHUNK_BYTES, SQL_PAGED_BYTES, SQL_PART_SUFFIX
 from .html_theme import dark_base_css  # shared dark CSS
 
+# The upstream/downstream section sits between these markers so `digdaggraph
+# merge` can fill it in after a sharded build without re-rendering the page.
+RELATED_BEGIN = "<!-- digdaggraph:related -->"
+RELATED_END = "<!-- /digdaggraph:related -->"
 
-def write_workflow_html_inline(svg_text: str, html_path: str, project: str, workflow: str) -> None:
+
+def _workflow_link(key: str) -> str:
+    # "project/workflow.dig" -> link relative to another graphs/<project>/ page
+    project, workflow = key.split("/", 1)
+    return f"../{project}/{workflow.replace('.dig', '.html')}"
+
+
+def history_summary_html(summary: Dict[str, Any]) -> str:
+    """Attempt durations and critical path of a workflow page (WorkflowInfo.history)."""
+    if not summary:
+        return ""
+    from .history import CRITICAL_COLOR, format_duration
+
+    chain = " → ".join(
+        f"{_escape_html(name.rsplit('+', 1)[-1] or name)} <span class='muted'>{format_duration(secs)}</span>"
+        for name, secs in summary.get("critical_path", [])
+    )
+    return f"""
+  <div class="card" style="padding:10px 16px;margin-bottom:12px">
+    <div>{summary.get("attempts", 0)} attempts · p50 <b>{format_duration(summary.get("p50", 0.0))}</b>
+      · p95 <b>{format_duration(summary.get("p95", 0.0))}</b>
+      · critical path <b>{format_duration(summary.get("critical_s", 0.0))}</b>
+      <span class="muted">(outlined in {CRITICAL_COLOR}; fill shows each task's p50)</span></div>
+    {f"<div class='muted' style='margin-top:4px'>{chain}</div>" if chain else ""}
+  </div>"""
+
+
+def related_workflows_html(graph, key: str) -> str:
+    """
+    Upstream/downstream section for a workflow page, from a DependencyGraph.
+    Direct neighbours are listed with the edge kind; transitive ones are folded.
+    """
+    if key not in graph.upstream:
+        return ""
+
+    def _items(pairs) -> str:
+        return "".join(
+            f"<li><a href='{_escape_html(_workflow_link(k))}'>{_escape_html(k.replace('.dig', ''))}</a>"
+            + (f" <span class='muted'>({_escape_html(', '.join(kinds))})</span>" if kinds else "")
+            + "</li>"
+            for k, kinds in pairs
+        ) or "<li class='muted'>none</li>"
+
+    up_direct = graph.direct_upstream(key)
+    down_direct = graph.direct_downstream(key)
+    up_all = graph.upstream.get(key, [])
+    down_all = graph.downstream.get(key, [])
+    cyclic = any(key in c for c in graph.cycles)
+    return f"""
+  <div class="card related" style="padding:12px 16px;margin-top:12px">
+    {"<div style='color:#f87171'>This workflow is part of a dependency cycle.</div>" if cyclic else ""}
+    <div class="related-cols">
+      <div><b>Upstream</b>
+        <ul>{_items(sorted(up_direct.items()))}</ul>
+        <details><summary class="muted">All upstream ({len(up_all)})</summary><ul>{_items((k, []) for k in up_all)}</ul></details>
+      </div>
+      <div><b>Downstream</b>
+        <ul>{_items(sorted(down_direct.items()))}</ul>
+        <details><summary class="muted">All downstream ({len(down_all)})</summary><ul>{_items((k, []) for k in down_all)}</ul></details>
+      </div>
+    </div>
+  </div>"""
+
+
+def write_workflow_html_inline(
+    svg_text: str,
+    html_path: str,
+    project: str,
+    workflow: str,
+    related_html: str = "",
+    graph_model: Optional[str] = None,
+    layout_src: str = "../assets/graph_layout.js",
+    history_html: str = "",
+    details_href: str = "",
+    task_index: Optional[str] = None,
+) -> None:
     """
     Inline the SVG and add zoom controls + bigger layout with reliable Fit.
+    `related_html` (e.g. from related_workflows_html) is placed below the graph,
+    `history_html` (from history_summary_html) above it.
+
+    With `details_href` (the node_details sidecar, relative to the page)
+    clicking a node that has details opens them in a side panel; the sidecar
+    is fetched on the first click. Ctrl/Cmd-click still follows a node's link.
+
+    With `task_index` (JSON from task_index.task_index_json) the toolbar gets a
+    task finder: typing filters the embedded index and the selected task's node
+    is centered (at 100% zoom or more) and outlined. "/" focuses the box.
+
+    With `graph_model` (JSON from graph_model.model_json) the page carries no
+    SVG: the model is embedded and laid out in the browser by `layout_src`.
     """
     DEFAULT_ZOOM_MIN = 0.25
     DEFAULT_ZOOM_MAX = 3.0
@@ -25,11 +119,34 @@ def write_workflow_html_inline(svg_text: str, html_path: str, project: str, work
                      border-radius:12px; background:#0f1117; position:relative}
         .toolbar{display:flex; gap:8px; align-items:center; justify-content:flex-end;
                   padding:6px 0 10px 0; color:var(--muted)}
+        .finder{position:relative; margin-right:auto}
+        .finder input{background:#0f1117; border:1px solid #2c3342; color:var(--text);
+                      padding:6px 10px; border-radius:8px; width:min(360px, 50vw); font-size:12px}
+        #task-find-results{position:absolute; top:100%; left:0; z-index:10; min-width:100%;
+                           max-height:50vh; overflow:auto; margin:4px 0 0 0; padding:4px 0;
+                           list-style:none; background:#111827; border:1px solid var(--border);
+                           border-radius:8px}
+        #task-find-results li{padding:4px 10px; cursor:pointer; white-space:nowrap; font-size:12px;
+                              color:var(--text)}
+        #task-find-results li.active{background:#1f2937}
+        #task-find-results li.more{cursor:default; color:var(--muted)}
+        #svg-stage .dg-found :is(polygon, ellipse, rect, path){stroke:#facc15; stroke-width:4px}
         .btn{background:#1f2937; border:1px solid #2c3342; color:var(--text);
               padding:6px 10px; border-radius:8px; cursor:pointer; font-size:12px}
         .btn:disabled{opacity:.5; cursor:default}
         #svg-stage{transform-origin:top left; width:max-content}
         #svg-stage svg{display:block}
+        .related-cols{display:flex; gap:32px; flex-wrap:wrap}
+        .related ul{margin:6px 0; padding-left:18px}
+        #node-panel{position:fixed; top:0; right:0; bottom:0; width:min(440px, 90vw); z-index:20;
+                    background:#111827; border-left:1px solid var(--border); padding:14px 16px;
+                    overflow:auto; box-shadow:-8px 0 24px rgba(0,0,0,.4)}
+        #node-panel[hidden]{display:none}
+        #node-panel h2{font-size:14px; margin:0 32px 10px 0; word-break:break-all}
+        #node-panel h3{font-size:12px; margin:14px 0 4px 0; color:var(--muted); text-transform:uppercase}
+        #node-panel pre{white-space:pre-wrap; word-break:break-word; font-size:12px; margin:0}
+        #node-panel .close{position:absolute; top:10px; right:10px}
+        #svg-stage g.node[id^="dg-"]{cursor:pointer}
         """
 
     def _zoom_controls_script() -> str:
@@ -82,6 +199,33 @@ def write_workflow_html_inline(svg_text: str, html_path: str, project: str, work
     applyZoom();
   }}
 
+  // Task finder: center a node ({{id, box}}, box in viewBox units), zoomed to at least 100%
+  let found = null;
+  stage.addEventListener('dg-focus', (e) => {{
+    const el = document.getElementById(e.detail.id);
+    if (found) found.classList.remove('dg-found');
+    found = el;
+    if (el) el.classList.add('dg-found');
+    if (zoom < 1) {{ zoom = 1; applyZoom(); }}
+    const svg = stage.querySelector('svg');
+    if (!svg) return;
+    const s = getSvgSize(), r = svg.getBoundingClientRect(), box = e.detail.box;
+    let x, y;
+    if (box && s.w && s.h) {{
+      x = r.left + (box[0] + box[2] / 2) / s.w * r.width;
+      y = r.top + (box[1] + box[3] / 2) / s.h * r.height;
+    }} else if (el) {{
+      const b = el.getBoundingClientRect();
+      x = b.left + b.width / 2;
+      y = b.top + b.height / 2;
+    }} else {{
+      return;
+    }}
+    const w = wrap.getBoundingClientRect();
+    wrap.scrollLeft += x - (w.left + wrap.clientWidth / 2);
+    wrap.scrollTop += y - (w.top + wrap.clientHeight / 2);
+  }});
+
   btnIn.addEventListener('click', zoomIn);
   btnOut.addEventListener('click', zoomOut);
   btnReset.addEventListener('click', zoomReset);
@@ -114,6 +258,168 @@ def write_workflow_html_inline(svg_text: str, html_path: str, project: str, work
   }});
 }})();
 </script>
+"""
+
+    def _details_panel() -> str:
+        if not details_href:
+            return ""
+        return f"""
+<aside id="node-panel" hidden>
+  <button class="btn close" id="node-panel-close" title="Close">×</button>
+  <h2 id="node-panel-title"></h2>
+  <div id="node-panel-body"></div>
+</aside>
+<script>
+(function() {{
+  const HREF = {json.dumps(details_href)};
+  const stage = document.getElementById('svg-stage');
+  const panel = document.getElementById('node-panel');
+  const title = document.getElementById('node-panel-title');
+  const body = document.getElementById('node-panel-body');
+  let details = null;
+
+  function load() {{
+    if (!details) {{
+      details = fetch(HREF).then(r => {{ if (!r.ok) throw new Error(r.status); return r.json(); }});
+      details.catch(() => {{ details = null; }});
+    }}
+    return details;
+  }}
+
+  function text(v, indent) {{
+    if (v === null || typeof v !== 'object') return String(v);
+    const pad = '  '.repeat(indent);
+    return Object.keys(v).map(k => {{
+      const x = v[k], key = pad + (Array.isArray(v) ? '-' : k + ':');
+      if (x !== null && typeof x === 'object' && Object.keys(x).length) return key + '\\n' + text(x, indent + 1);
+      return key + ' ' + (x !== null && typeof x === 'object' ? (Array.isArray(x) ? '[]' : '{{}}') : String(x));
+    }}).join('\\n');
+  }}
+
+  function el(tag, content) {{
+    const e = document.createElement(tag);
+    e.textContent = content;
+    return e;
+  }}
+
+  function show(entry) {{
+    title.textContent = entry.title;
+    body.replaceChildren();
+    if (entry.url) {{
+      const a = el('a', 'Open →');
+      a.href = entry.url;
+      body.appendChild(a);
+    }}
+    for (const [name, value] of Object.entries(entry.details)) {{
+      body.appendChild(el('h3', name));
+      body.appendChild(el('pre', text(value, 0)));
+    }}
+    panel.hidden = false;
+  }}
+
+  stage.addEventListener('click', (e) => {{
+    if (e.ctrlKey || e.metaKey || e.shiftKey || e.button !== 0) return;
+    const g = e.target.closest('g.node');
+    if (!g || !g.id.startsWith('dg-')) return;
+    e.preventDefault();
+    // No details, or sidecar unavailable (e.g. opened from file://): follow the node's link
+    const follow = () => {{
+      const a = g.closest('a') || g.querySelector('a');
+      const href = a && (a.getAttribute('href') || a.getAttribute('xlink:href'));
+      if (href) window.location.href = href;
+    }};
+    load().then(d => {{ if (d.nodes[g.id]) show(d.nodes[g.id]); else follow(); }}).catch(follow);
+  }});
+  document.getElementById('node-panel-close').addEventListener('click', () => {{ panel.hidden = true; }});
+  document.addEventListener('keydown', (e) => {{ if (e.key === 'Escape') panel.hidden = true; }});
+}})();
+</script>
+"""
+
+    def _finder_box() -> str:
+        return """
+    <div class="finder">
+      <input id="task-find" type="search" placeholder="Find task…  ( / )" autocomplete="off"
+             aria-label="Find task">
+      <ul id="task-find-results" hidden></ul>
+    </div>"""
+
+    def _task_finder() -> str:
+        if task_index is None:
+            return ""
+        return f"""
+<script type="application/json" id="task-index">{task_index}</script>
+<script>
+(function() {{
+  const tasks = JSON.parse(document.getElementById('task-index').textContent).tasks;
+  const keys = tasks.map(t => (t[0] + ' ' + t[1]).toLowerCase());
+  const input = document.getElementById('task-find');
+  const list = document.getElementById('task-find-results');
+  const stage = document.getElementById('svg-stage');
+  const LIMIT = 50;
+  let hits = [], active = 0;
+
+  function go(k) {{
+    active = k;
+    list.querySelectorAll('li').forEach((li, j) => li.classList.toggle('active', j === k));
+    const t = tasks[hits[k]];
+    stage.dispatchEvent(new CustomEvent('dg-focus', {{ detail: {{ id: t[2], box: t.length > 3 ? t.slice(3) : null }} }}));
+  }}
+
+  function item(text, cls) {{
+    const li = document.createElement('li');
+    li.textContent = text;
+    if (cls) li.className = cls;
+    return li;
+  }}
+
+  input.addEventListener('input', () => {{
+    const words = input.value.toLowerCase().split(/\\s+/).filter(Boolean);
+    let total = 0;
+    hits = [];
+    if (words.length) keys.forEach((key, i) => {{
+      if (!words.every(w => key.includes(w))) return;
+      total += 1;
+      if (hits.length < LIMIT) hits.push(i);
+    }});
+    list.replaceChildren(...hits.map((i, k) => {{
+      const li = item(tasks[i][0] + (tasks[i][1] ? '  ' + tasks[i][1] : ''));
+      li.addEventListener('mousedown', (e) => {{ e.preventDefault(); go(k); }});
+      return li;
+    }}));
+    if (total > hits.length) list.appendChild(item('… ' + (total - hits.length) + ' more', 'more'));
+    if (words.length && !total) list.appendChild(item('No matching task', 'more'));
+    list.hidden = !list.children.length;
+    if (hits.length) go(0);
+  }});
+  input.addEventListener('keydown', (e) => {{
+    if (e.key === 'Escape') {{ input.value = ''; hits = []; list.hidden = true; input.blur(); return; }}
+    if (!hits.length) return;
+    if (e.key === 'ArrowDown' || e.key === 'ArrowUp') {{
+      e.preventDefault();
+      go((active + (e.key === 'ArrowDown' ? 1 : hits.length - 1)) % hits.length);
+    }} else if (e.key === 'Enter') {{
+      go(active);
+    }}
+  }});
+  input.addEventListener('blur', () => {{ list.hidden = true; }});
+  input.addEventListener('focus', () => {{ list.hidden = !list.children.length; }});
+  document.addEventListener('keydown', (e) => {{
+    if (e.key !== '/' || e.target.closest('input, textarea')) return;
+    e.preventDefault();
+    input.focus();
+  }});
+}})();
+</script>
+"""
+
+    def _client_layout_scripts() -> str:
+        if graph_model is None:
+            return ""
+        return f"""
+<script type="application/json" id="graph-model">{graph_model}</script>
+<script src="{_escape_html(layout_src)}"></script>
+<script>DigdagGraphLayout.mount('svg-stage', 'graph-model');</script>
 """
 
     doc = f"""<!doctype html>
@@ -134,28 +440,101 @@ def write_workflow_html_inline(svg_text: str, html_path: str, project: str, work
 </header>
 
 <main class="wrap">
-  <div class="toolbar">
+  <div class="toolbar">{_finder_box() if task_index is not None else ""}
     <button class="btn" id="zoom-out">−</button>
     <button class="btn" id="zoom-in">+</button>
     <button class="btn" id="zoom-reset">100%</button>
     <button class="btn" id="zoom-fit">Fit</button>
-  </div>
+  </div>{history_html}
   <div class="card stage">
     <div class="graph-wrap" id="graph-wrap">
       <div id="svg-stage">{svg_text}</div>
     </div>
-  </div>
+  </div>{RELATED_BEGIN}{related_html}{RELATED_END}
 </main>
 
 <a class="btn-back" href="../../scheduled_workflows.html" title="Back to schedules">← Back</a>
-
+{_client_layout_scripts()}
 {_zoom_controls_script()}
+{_details_panel()}
+{_task_finder()}
 
 </body>
 </html>"""
     Path(html_path).write_text(doc, encoding="utf-8")
 
 
+def sql_chunks(data: bytes, size: int, encoding: str = "utf-8") -> Iterator[str]:
+    """
+    Decode `data` (bytes or an mmap) about `size` bytes at a time, cutting
+    after a newline where there is one (else on a character boundary), with
+    universal newlines as Path.read_text.
+    """
+    n = len(data)
+    start = 0
+    while start < n:
+        end = min(start + size, n)
+        if end < n:
+            cut = data.rfind(b"\n", start, end)
+            if cut >= start:
+                end = cut + 1
+            else:
+                while end > start + 1 and (data[end] & 0xC0 == 0x80 or data[end - 1 : end] == b"\r"):
+                    end -= 1
+        yield bytes(data[start:end]).decode(encoding).replace("\r\n", "\n").replace("\r", "\n")
+        start = end
+
+
+def _sql_part_path(out_html_abs: Path, n: int) -> Path:
+    return out_html_abs.with_name(out_html_abs.stem + SQL_PART_SUFFIX.format(n))
+
+
+def sql_part_files(out_html_abs: Path) -> List[Path]:
+    """The sidecar parts written next to a paged SQL page, in order."""
+    parts = []
+    while _sql_part_path(out_html_abs, len(parts) + 1).is_file():
+        parts.append(_sql_part_path(out_html_abs, len(parts) + 1))
+    return parts
+
+
+def _paged_sql_script() -> str:
+    # Appends q.part1.txt, q.part2.txt, ... to the <pre> as it is scrolled to its end
+    return """<script>
+(() => {
+  const pre = document.querySelector('pre[data-parts]');
+  if (!pre) return;
+  const total = +pre.dataset.parts, more = pre.querySelector('.more');
+  const href = (n) => pre.dataset.partHref.replace('{}', n);
+  let next = 1, busy = false;
+  const near = () => more.getBoundingClientRect().top < pre.getBoundingClientRect().bottom + 400;
+  function load() {
+    if (busy || next > total) return;
+    busy = true;
+    fetch(href(next))
+      .then((r) => { if (!r.ok) throw new Error(r.status); return r.text(); })
+      .then((text) => {
+        const code = document.createElement('code');
+        code.className = 'language-sql';
+        code.textContent = text;
+        pre.insertBefore(code, more);
+        if (window.Prism) Prism.highlightElement(code);
+        next += 1;
+        busy = false;
+        more.textContent = next > total ? '' : `… ${total - next + 1} more part(s), loaded on scroll`;
+        if (next > total) observer.disconnect();
+        else if (near()) load();
+      })
+      .catch(() => {
+        more.textContent = `Could not load ${href(next)}; serve the site over HTTP to read the rest.`;
+      });
+  }
+  const observer = new IntersectionObserver((es) => { if (es.some((e) => e.isIntersecting)) load(); },
+    { root: pre, rootMargin: '400px' });
+  observer.observe(more);
+})();
+</script>"""
+
+
 def write_sql_page(
     project: str,
     querypath: str,
@@ -164,12 +543,18 @@ def write_sql_page(
     out_html_abs: Path,
     td_meta: Optional[Dict] = None,
     td_links: Optional[Dict[str, str]] = None,
+    sql_bytes: Optional[bytes] = None,
 ) -> None:
     """
     Write a Prism-highlighted SQL page, with optional Treasure Data meta & console links.
 
     Arguments match graph_generate.py's call-site. Older call styles that passed
     positional args will still work because we keep the order stable.
+
+    With `sql_bytes` (the file's raw bytes, typically an mmap) the SQL is
+    escaped and written SQL_CHUNK_BYTES at a time instead of from `sql_text`.
+    Above SQL_PAGED_BYTES only the first chunk is inlined: the others go to
+    sidecar parts (SQL_PART_SUFFIX) that the page fetches as it is scrolled.
     """
     td_meta = td_meta or {}
     td_links = td_links or {}
@@ -202,9 +587,27 @@ def write_sql_page(
         else ""
     )
 
-    escaped_sql = _escape_html(sql_text)
-
-    doc = f"""<!doctype html>
+    chunks = sql_chunks(sql_bytes, SQL_CHUNK_BYTES) if sql_bytes is not None else iter([sql_text])
+    # Paged: the sidecars are written first, so the page knows how many there are
+    part_count = 0
+    if sql_bytes is not None and len(sql_bytes) > SQL_PAGED_BYTES:
+        first = next(chunks, "")
+        for part_count, chunk in enumerate(chunks, 1):
+            _sql_part_path(out_html_abs, part_count).write_text(chunk, encoding="utf-8")
+        chunks = iter([first])
+    stale = part_count + 1
+    while _sql_part_path(out_html_abs, stale).is_file():
+        _sql_part_path(out_html_abs, stale).unlink()
+        stale += 1
+
+    pre_attrs = ""
+    more = ""
+    if part_count:
+        part_href = _escape_html(out_html_abs.stem + SQL_PART_SUFFIX)
+        pre_attrs = f' data-parts="{part_count}" data-part-href="{part_href}"'
+        more = f"<span class='more muted'>… {part_count} more part(s), loaded on scroll</span>"
+
+    head = f"""<!doctype html>
 <html lang="en">
 <head>
   <meta charset="utf-8">
@@ -214,6 +617,7 @@ def write_sql_page(
   <style>{dark_base_css()}
     pre{{white-space:pre;overflow:auto;max-height:75vh;padding:12px;border-radius:12px;
         border:1px solid var(--border);background:#0f1117}}
+    pre .more{{display:block;padding-top:8px}}
     .meta{{color:var(--muted);font-size:12px;margin-top:8px}}
   </style>
 </head>
@@ -230,7 +634,9 @@ def write_sql_page(
   {links_block}
   {meta_html}
   <div class="card" style="padding:16px 18px">
-    <pre><code class="language-sql">{escaped_sql}</code></pre>
+    <pre{pre_attrs}><code class="language-sql">"""
+
+    tail = f"""</code>{more}</pre>
     <div class="meta">Generated by digdag-pages</div>
   </div>
 </main>
@@ -240,6 +646,11 @@ def write_sql_page(
 <script src="https://unpkg.com/prismjs/components/prism-core.min.js"></script>
 <script src="https://unpkg.com/prismjs/components/prism-clike.min.js"></script>
 <script src="https://unpkg.com/prismjs/components/prism-sql.min.js"></script>
+{_paged_sql_script() if part_count else ""}
 </body>
 </html>"""
-    out_html_abs.write_text(doc, encoding="utf-8")
+    with open(out_html_abs, "w", encoding="utf-8") as f:
+        f.write(head)
+        for chunk in chunks:
+            f.write(_escape_html(chunk))
+        f.write(tail)
@@ -1,11 +1,17 @@
 
 from dataclasses import dataclass
+from datetime import timedelta
 from pathlib import Path
 from html import escape
-from typing import List
+import json
+from typing import Dict, List, Optional
 from .html_theme import dark_base_css
 from .constants import SCHEDULE_INDEX_FILE
 from .constants import UNSCHEDULED_INDEX_FILE  
+from .constants import TABLE_INDEX_FILE, TABLE_INDEX_JSON
+from .constants import DEPENDENCY_INDEX_FILE, DEPENDENCY_INDEX_JSON, GRAPHS_DIR
+from .constants import SCHEDULE_HEATMAP_FILE, SCHEDULE_HEATMAP_JSON
+from .constants import SQL_SEARCH_FILE, SEARCH_DIR, SLOWEST_WORKFLOWS_FILE
 
 def _esc(s: str) -> str:
     return escape(s, quote=False)
@@ -13,6 +19,16 @@ def _esc(s: str) -> str:
 def _esca(s: str) -> str:
     return escape(s, quote=True)
 
+def _write(path, text: str) -> None:
+    # Unchanged pages are left alone: a no-op build rewrites nothing at the root
+    path = Path(path)
+    try:
+        if path.read_text(encoding="utf-8") == text:
+            return
+    except OSError:
+        pass
+    path.write_text(text, encoding="utf-8")
+
 @dataclass
 class ScheduleEntry:
     project: str
@@ -61,7 +77,12 @@ def write_scheduled_workflows(entries: List[ScheduleEntry], out_path: str = SCHE
         "</style></head><body>"
         "<header><div class='wrap'><h1>Scheduled Workflows</h1>"
         "<div class='muted'>Search and filter schedules generated from your Digdag projects.</div>"
-        "<p style='margin:10px 0'><a class='button' href='./unscheduled_workflows.html'>Unscheduled workflows</a></p>"
+        "<p style='margin:10px 0'><a class='button' href='./unscheduled_workflows.html'>Unscheduled workflows</a>"
+        f" · <a class='button' href='./{TABLE_INDEX_FILE}'>Table usage</a>"
+        f" · <a class='button' href='./{DEPENDENCY_INDEX_FILE}'>Dependencies</a>"
+        f" · <a class='button' href='./{SCHEDULE_HEATMAP_FILE}'>Schedule heatmap</a>"
+        f" · <a class='button' href='./{SQL_SEARCH_FILE}'>SQL search</a>"
+        f" · <a class='button' href='./{SLOWEST_WORKFLOWS_FILE}'>Slowest workflows</a></p>"
         "<div class='controls'>"
         "<input id='q' type='search' placeholder='Search workflows, projects, schedule text…'>"
         f"<select id='proj'>{options_html}</select>"
@@ -88,7 +109,7 @@ def write_scheduled_workflows(entries: List[ScheduleEntry], out_path: str = SCHE
         "})();</script>"
         "</body></html>"
     )
-    Path(out_path).write_text(doc, encoding="utf-8")
+    _write(out_path, doc)
 
 
 
@@ -212,5 +233,633 @@ def write_unscheduled_workflows(entries: list[ScheduleEntry], out_path: str = UN
 </body>
 </html>
 """
-    Path(out_path).write_text(doc, encoding="utf-8")
+    _write(out_path, doc)
+
+
+
+def write_table_index(
+    usage: Dict[str, Dict[str, List[Dict[str, str]]]],
+    out_path: str = TABLE_INDEX_FILE,
+    json_path: str = TABLE_INDEX_JSON,
+) -> None:
+    """
+    Render "which workflows touch table X": one row per table with the workflows
+    (and SQL pages) that read or write it. The same data is written as JSON.
+    """
+    _write(json_path, json.dumps(usage, indent=1, sort_keys=True))
+
+    def _links(rows: List[Dict[str, str]]) -> str:
+        seen = set()
+        parts = []
+        for r in sorted(rows, key=lambda r: (r["project"], r["workflow"], r["sql"])):
+            key = (r["href"], r["sql_href"])
+            if key in seen:
+                continue
+            seen.add(key)
+            wf_clean = r["workflow"].replace(".dig", "")
+            parts.append(
+                f'<div><a href="{_esca(r["href"])}">{_esc(r["project"])}/{_esc(wf_clean)}</a> '
+                f'<a class="muted" href="{_esca(r["sql_href"])}">{_esc(r["sql"])}</a></div>'
+            )
+        return "".join(parts) or '<span class="muted">—</span>'
+
+    rows_html = "\n".join(
+        f"""<tr>
+          <td class="c-table"><code>{_esc(name)}</code></td>
+          <td class="c-writes">{_links(u["writes"])}</td>
+          <td class="c-reads">{_links(u["reads"])}</td>
+        </tr>"""
+        for name, u in usage.items()
+    )
+
+    doc = f"""<!doctype html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Table Usage</title>
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<style>{dark_base_css()}
+  a.button{{display:inline-block;margin-right:8px;padding:8px 10px;border-radius:10px;border:1px solid var(--border);background:#1f2937;color:var(--text)}}
+  table{{width:100%;border-collapse:separate;border-spacing:0;overflow:hidden;
+         border:1px solid var(--border);border-radius:12px;background:var(--panel)}}
+  thead th{{position:sticky;top:0;background:var(--panel);border-bottom:1px solid var(--border);
+           text-align:left;padding:12px;font-weight:600}}
+  tbody tr{{background:#101219}}
+  tbody tr:nth-child(even){{background:#0e1017}}
+  tbody td{{padding:12px;border-bottom:1px solid var(--border);vertical-align:top}}
+  tbody tr:hover{{background:#131826}}
+  code{{background:#0f1117;padding:2px 6px;border-radius:6px;word-break:break-word}}
+  .controls{{display:flex;gap:12px;align-items:center;margin-top:8px;flex-wrap:wrap}}
+  .controls input[type="search"]{{
+    background:#0f1117;color:var(--text);border:1px solid var(--border);border-radius:8px;
+    padding:10px 12px;outline:none
+  }}
+  .badge{{background:#1f2937;border:1px solid #2c3342;border-radius:999px;padding:2px 8px;font-size:12px}}
+  .c-table{{width:30%}} .c-writes{{width:35%}} .c-reads{{width:35%}}
+</style>
+</head>
+<body>
+
+<header>
+  <div class="wrap">
+    <h1>Table Usage</h1>
+    <div class="muted">Tables read and written by the SQL of <code>td&gt;</code> tasks (<a href="./{_esca(Path(json_path).name)}">JSON</a>).</div>
+    <p style="margin:10px 0">
+      <a class="button" href="./{SCHEDULE_INDEX_FILE}">← Scheduled index</a>
+    </p>
+    <div class="controls">
+      <input id="q" type="search" placeholder="Search table, project or workflow…">
+      <span class="badge" id="count"></span>
+    </div>
+  </div>
+</header>
+
+<main class="wrap">
+  <table id="tbl">
+    <thead>
+      <tr>
+        <th>Table</th>
+        <th>Written by</th>
+        <th>Read by</th>
+      </tr>
+    </thead>
+    <tbody>
+      {rows_html}
+    </tbody>
+  </table>
+</main>
+
+<footer class="wrap muted" style="font-size:12px;padding-bottom:28px">
+  Generated by <code>digdag-pages</code>
+</footer>
+
+<script>
+(function() {{
+  const q = document.getElementById('q');
+  const count = document.getElementById('count');
+  const rows = Array.from(document.querySelectorAll('#tbl tbody tr'));
+  const texts = rows.map(tr => tr.innerText.toLowerCase());
+
+  function apply() {{
+    const term = (q.value || '').toLowerCase();
+    let visible = 0;
+    rows.forEach((tr, i) => {{
+      const show = !term || texts[i].includes(term);
+      tr.style.display = show ? '' : 'none';
+      if (show) visible++;
+    }});
+    count.textContent = visible + ' tables';
+  }}
+
+  q.addEventListener('input', apply);
+  apply();
+}})();
+</script>
+
+</body>
+</html>
+"""
+    _write(out_path, doc)
+
+
+def write_dependency_index(
+    graph,
+    overview_svg: Optional[str],
+    out_path: str = DEPENDENCY_INDEX_FILE,
+    json_path: str = DEPENDENCY_INDEX_JSON,
+) -> None:
+    """
+    Render the repo-wide dependency view: the project-level overview SVG,
+    any dependency cycles, and per-workflow upstream/downstream counts.
+    The adjacency index (with transitive closure) is written as JSON.
+    """
+    _write(json_path, json.dumps(graph.to_json(), indent=1))
+
+    def _href(key: str) -> str:
+        project, workflow = key.split("/", 1)
+        return f"./{GRAPHS_DIR}/{project}/{workflow.replace('.dig', '.html')}"
+
+    def _wf_links(keys) -> str:
+        return ", ".join(
+            f'<a href="{_esca(_href(k))}">{_esc(k.replace(".dig", ""))}</a>' for k in sorted(keys)
+        ) or '<span class="muted">—</span>'
+
+    cycles_html = "".join(f"<li>{_wf_links(c)}</li>" for c in graph.cycles)
+    cycles_block = (
+        f'<div class="card" style="padding:12px 16px;margin-bottom:12px;color:#f87171">'
+        f"<b>Dependency cycles ({len(graph.cycles)})</b><ul>{cycles_html}</ul></div>"
+        if graph.cycles
+        else ""
+    )
+    svg_block = (
+        f'<div class="card" style="padding:12px;margin-bottom:12px;overflow:auto">{overview_svg}</div>'
+        if overview_svg
+        else ""
+    )
+
+    rows = []
+    last_project = None
+    for key in graph.nodes:
+        project, workflow = key.split("/", 1)
+        up, down = graph.direct_upstream(key), graph.direct_downstream(key)
+        if not (up or down or graph.upstream[key] or graph.downstream[key]):
+            continue
+        anchor = f' id="project-{_esca(project)}"' if project != last_project else ""
+        last_project = project
+        rows.append(
+            f"""<tr{anchor}>
+          <td class="c-workflow"><a href="{_esca(_href(key))}">{_esc(key.replace(".dig", ""))}</a></td>
+          <td>{_wf_links(up)} <span class="badge">{len(graph.upstream[key])} total</span></td>
+          <td>{_wf_links(down)} <span class="badge">{len(graph.downstream[key])} total</span></td>
+        </tr>"""
+        )
+    rows_html = "\n".join(rows)
+
+    doc = f"""<!doctype html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Workflow Dependencies</title>
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<style>{dark_base_css()}
+  a.button{{display:inline-block;margin-right:8px;padding:8px 10px;border-radius:10px;border:1px solid var(--border);background:#1f2937;color:var(--text)}}
+  table{{width:100%;border-collapse:separate;border-spacing:0;overflow:hidden;
+         border:1px solid var(--border);border-radius:12px;background:var(--panel)}}
+  thead th{{position:sticky;top:0;background:var(--panel);border-bottom:1px solid var(--border);
+           text-align:left;padding:12px;font-weight:600}}
+  tbody tr{{background:#101219}}
+  tbody tr:nth-child(even){{background:#0e1017}}
+  tbody td{{padding:12px;border-bottom:1px solid var(--border);vertical-align:top}}
+  .badge{{background:#1f2937;border:1px solid #2c3342;border-radius:999px;padding:2px 8px;font-size:12px}}
+  .c-workflow{{width:30%}}
+</style>
+</head>
+<body>
+
+<header>
+  <div class="wrap">
+    <h1>Workflow Dependencies</h1>
+    <div class="muted">Edges from <code>call&gt;</code>, <code>require&gt;</code> and <code>td_wait&gt;</code> table waits (<a href="./{_esca(Path(json_path).name)}">JSON</a>).</div>
+    <p style="margin:10px 0">
+      <a class="button" href="./{SCHEDULE_INDEX_FILE}">← Scheduled index</a>
+    </p>
+  </div>
+</header>
+
+<main class="wrap">
+  {cycles_block}
+  {svg_block}
+  <table id="tbl">
+    <thead>
+      <tr>
+        <th>Workflow</th>
+        <th>Upstream</th>
+        <th>Downstream</th>
+      </tr>
+    </thead>
+    <tbody>
+      {rows_html}
+    </tbody>
+  </table>
+</main>
+
+<footer class="wrap muted" style="font-size:12px;padding-bottom:28px">
+  Generated by <code>digdag-pages</code>
+</footer>
+
+</body>
+</html>
+"""
+    _write(out_path, doc)
+
+
+def write_schedule_heatmap(
+    heat,
+    out_path: str = SCHEDULE_HEATMAP_FILE,
+    json_path: str = SCHEDULE_HEATMAP_JSON,
+    top: int = 20,
+) -> None:
+    """
+    Render a day × hour (UTC) grid of scheduled workflow fires, plus the busiest
+    hours and the workflows firing in them. The expansion is written as JSON.
+    """
+    _write(json_path, json.dumps(heat.to_json(top)))
+    peak = max(heat.counts) if heat.counts else 0
+
+    def _cell(i: int) -> str:
+        n = heat.counts[i]
+        alpha = (0.15 + 0.85 * n / peak) if n and peak else 0
+        return (
+            f'<td title="{n} fires" style="background:rgba(248,113,113,{alpha:.2f})">'
+            f'{n or ""}</td>'
+        )
+
+    head = "".join(f"<th>{h:02d}</th>" for h in range(24))
+    rows = []
+    for d in range(heat.days):
+        day = (heat.start + timedelta(days=d)).strftime("%a %Y-%m-%d")
+        cells = "".join(_cell(d * 24 + h) for h in range(24))
+        rows.append(f"<tr><th class='day'>{_esc(day)}</th>{cells}</tr>")
+    rows_html = "\n".join(rows)
+
+    peak_rows = "\n".join(
+        f"<tr><td>{_esc((heat.start + timedelta(hours=i)).strftime('%a %Y-%m-%d %H:00'))}</td>"
+        f"<td>{n}</td><td>"
+        + ", ".join(
+            f'<a href="./{GRAPHS_DIR}/{_esca(k.split("/", 1)[0])}/{_esca(k.split("/", 1)[1].replace(".dig", ".html"))}">'
+            f'{_esc(k.replace(".dig", ""))}</a>'
+            for k in names
+        )
+        + "</td></tr>"
+        for i, n, names in heat.peaks(top)
+    )
+    errors_html = "".join(f"<li>{_esc(k)}: {_esc(v)}</li>" for k, v in sorted(heat.errors.items()))
+    errors_block = (
+        f'<div class="card" style="padding:12px 16px;margin-bottom:12px;color:#f87171">'
+        f"<b>Unparseable schedules</b><ul>{errors_html}</ul></div>"
+        if errors_html
+        else ""
+    )
+
+    doc = f"""<!doctype html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Schedule Heatmap</title>
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<style>{dark_base_css()}
+  a.button{{display:inline-block;margin-right:8px;padding:8px 10px;border-radius:10px;border:1px solid var(--border);background:#1f2937;color:var(--text)}}
+  table{{border-collapse:separate;border-spacing:0;border:1px solid var(--border);border-radius:12px;background:var(--panel)}}
+  .heat td{{width:34px;height:22px;text-align:center;font-size:11px;border-bottom:1px solid var(--border)}}
+  .heat th{{font-weight:600;font-size:11px;padding:4px 6px;color:var(--muted)}}
+  .heat th.day{{text-align:right;white-space:nowrap}}
+  .peaks{{width:100%;margin-top:16px}}
+  .peaks td, .peaks th{{padding:8px 12px;border-bottom:1px solid var(--border);text-align:left;vertical-align:top}}
+</style>
+</head>
+<body>
+
+<header>
+  <div class="wrap">
+    <h1>Schedule Heatmap</h1>
+    <div class="muted">Scheduled fires per hour (UTC) over {heat.days} days from {_esc(heat.start.strftime("%Y-%m-%d"))}, across {len(heat.fires)} workflows (<a href="./{_esca(Path(json_path).name)}">JSON</a>).</div>
+    <p style="margin:10px 0">
+      <a class="button" href="./{SCHEDULE_INDEX_FILE}">← Scheduled index</a>
+    </p>
+  </div>
+</header>
+
+<main class="wrap">
+  {errors_block}
+  <div style="overflow:auto">
+    <table class="heat">
+      <thead><tr><th></th>{head}</tr></thead>
+      <tbody>
+      {rows_html}
+      </tbody>
+    </table>
+  </div>
+  <table class="peaks">
+    <thead><tr><th>Busiest hours (UTC)</th><th>Fires</th><th>Workflows</th></tr></thead>
+    <tbody>
+    {peak_rows}
+    </tbody>
+  </table>
+</main>
+
+<footer class="wrap muted" style="font-size:12px;padding-bottom:28px">
+  Generated by <code>digdag-pages</code>
+</footer>
+
+</body>
+</html>
+"""
+    _write(out_path, doc)
+
+
+def write_sql_search_page(
+    stop_words: List[str],
+    search_version: int,
+    out_path: str = SQL_SEARCH_FILE,
+    data_href: str = f"./{GRAPHS_DIR}/{SEARCH_DIR}",
+) -> None:
+    """
+    Full-text search over the generated SQL pages. The page fetches meta.json,
+    then only the index shards (first two characters of each query term) and
+    docs chunks the query needs, so it stays small however large the repo is.
+    """
+    doc = f"""<!doctype html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>SQL Search</title>
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<style>{dark_base_css()}
+  a.button{{display:inline-block;margin-right:8px;padding:8px 10px;border-radius:10px;border:1px solid var(--border);background:#1f2937;color:var(--text)}}
+  table{{width:100%;border-collapse:separate;border-spacing:0;overflow:hidden;
+         border:1px solid var(--border);border-radius:12px;background:var(--panel)}}
+  thead th{{position:sticky;top:0;background:var(--panel);border-bottom:1px solid var(--border);
+           text-align:left;padding:12px;font-weight:600}}
+  tbody tr{{background:#101219}}
+  tbody tr:nth-child(even){{background:#0e1017}}
+  tbody td{{padding:12px;border-bottom:1px solid var(--border);vertical-align:top}}
+  tbody tr:hover{{background:#131826}}
+  code{{background:#0f1117;padding:2px 6px;border-radius:6px;word-break:break-word}}
+  .controls{{display:flex;gap:12px;align-items:center;margin-top:8px;flex-wrap:wrap}}
+  .controls input[type="search"]{{
+    background:#0f1117;color:var(--text);border:1px solid var(--border);border-radius:8px;
+    padding:10px 12px;outline:none;min-width:320px
+  }}
+  .badge{{background:#1f2937;border:1px solid #2c3342;border-radius:999px;padding:2px 8px;font-size:12px}}
+  .c-sql{{width:45%}} .c-proj{{width:15%}} .c-wf{{width:40%}}
+</style>
+</head>
+<body>
+
+<header>
+  <div class="wrap">
+    <h1>SQL Search</h1>
+    <div class="muted">Find the SQL files that mention every word you type (identifiers, table and column names; end a word with <code>*</code> for a prefix match).
+      Served over HTTP only, e.g. <code>digdaggraph serve</code>.</div>
+    <p style="margin:10px 0">
+      <a class="button" href="./{SCHEDULE_INDEX_FILE}">← Scheduled index</a>
+    </p>
+    <div class="controls">
+      <input id="q" type="search" placeholder="e.g. customer_id orders_*" autofocus>
+      <span class="badge" id="count"></span>
+    </div>
+  </div>
+</header>
+
+<main class="wrap">
+  <table id="tbl">
+    <thead>
+      <tr>
+        <th>SQL file</th>
+        <th>Project</th>
+        <th>Used by</th>
+      </tr>
+    </thead>
+    <tbody></tbody>
+  </table>
+</main>
+
+<footer class="wrap muted" style="font-size:12px;padding-bottom:28px">
+  Generated by <code>digdag-pages</code>
+</footer>
+
+<script>
+(function() {{
+  const BASE = {json.dumps(data_href)};
+  const STOP = new Set({json.dumps(sorted(stop_words))});
+  const LIMIT = 200;
+  const q = document.getElementById('q');
+  const count = document.getElementById('count');
+  const tbody = document.querySelector('#tbl tbody');
+  const cache = {{}};
+  let meta = null, seq = 0;
+
+  function load(path) {{
+    if (!cache[path]) cache[path] = fetch(BASE + '/' + path).then(r => r.ok ? r.json() : {{}}).catch(() => ({{}}));
+    return cache[path];
+  }}
+  function esc(s) {{
+    return String(s).replace(/[&<>"']/g, c => ({{'&':'&amp;','<':'&lt;','>':'&gt;','"':'&quot;',"'":'&#39;'}})[c]);
+  }}
+  // Same rules as sql_search.tokenize; "word*" is kept as a prefix term
+  function terms(text) {{
+    const out = [];
+    for (const m of text.toLowerCase().matchAll(/[a-z_][a-z0-9_]*\\*?/g)) {{
+      const t = m[0], prefix = t.endsWith('*'), word = prefix ? t.slice(0, -1) : t;
+      if (word.length < 2 || (!prefix && STOP.has(word))) continue;
+      out.push({{word, prefix}});
+    }}
+    return out;
+  }}
+  async function ids(term) {{
+    const key = term.word.slice(0, 2);
+    if (!meta.shards.includes(key)) return [];
+    const shard = await load('idx/' + key + '.json');
+    if (!term.prefix) return shard[term.word] || [];
+    const all = new Set();
+    for (const [t, list] of Object.entries(shard)) if (t.startsWith(term.word)) list.forEach(i => all.add(i));
+    return Array.from(all).sort((a, b) => a - b);
+  }}
+  function intersect(a, b) {{
+    const out = [];
+    let i = 0, j = 0;
+    while (i < a.length && j < b.length) {{
+      if (a[i] === b[j]) {{ out.push(a[i]); i++; j++; }}
+      else if (a[i] < b[j]) i++;
+      else j++;
+    }}
+    return out;
+  }}
+
+  async function apply() {{
+    const mine = ++seq;
+    const ts = terms(q.value || '');
+    if (!ts.length) {{ tbody.innerHTML = ''; count.textContent = meta.docs + ' SQL files'; return; }}
+    const lists = (await Promise.all(ts.map(ids))).sort((a, b) => a.length - b.length);
+    let hits = lists[0];
+    for (const l of lists.slice(1)) hits = intersect(hits, l);
+    const shown = hits.slice(0, LIMIT);
+    const chunks = await Promise.all(Array.from(new Set(shown.map(i => Math.floor(i / meta.chunk))))
+      .map(n => load('docs/' + n + '.json')));
+    if (mine !== seq) return;
+    const docs = Object.assign({{}}, ...chunks);
+    tbody.innerHTML = shown.filter(i => docs[i]).map(i => {{
+      const [href, path, project, wfs] = docs[i];
+      const links = wfs.map(([key, wfHref]) => '<div><a href="' + esc(wfHref) + '">' + esc(key) + '</a></div>').join('');
+      return '<tr><td class="c-sql"><a href="' + esc(href) + '"><code>' + esc(path) + '</code></a></td>'
+        + '<td class="c-proj"><span class="badge">' + esc(project) + '</span></td>'
+        + '<td class="c-wf">' + links + '</td></tr>';
+    }}).join('');
+    count.textContent = hits.length + ' SQL files' + (hits.length > LIMIT ? ' (first ' + LIMIT + ' shown)' : '');
+  }}
+
+  load('meta.json').then(m => {{
+    meta = m;
+    if (meta.v !== {search_version}) {{ count.textContent = 'search index missing or outdated; rebuild'; return; }}
+    q.addEventListener('input', apply);
+    apply();
+  }});
+}})();
+</script>
+
+</body>
+</html>
+"""
+    _write(out_path, doc)
+
+
+def write_slowest_workflows(workflows, out_path: str = SLOWEST_WORKFLOWS_FILE) -> None:
+    """
+    Workflows with attempt history (WorkflowInfo.history), slowest p95 first,
+    with the p50 length of their critical path and its slowest tasks.
+    """
+    from .history import format_duration
+
+    timed = sorted(
+        (w for w in workflows if w.history),
+        key=lambda w: (-w.history.get("p95", 0.0), -w.history.get("critical_s", 0.0), w.key),
+    )
+
+    def _tasks(path: List[List]) -> str:
+        top = sorted(path, key=lambda t: -t[1])[:3]
+        return "".join(
+            f'<div><code>{_esc(name)}</code> <span class="muted">{format_duration(secs)}</span></div>'
+            for name, secs in top
+        ) or '<span class="muted">—</span>'
+
+    rows_html = "\n".join(
+        f"""<tr>
+          <td><a href="{_esca(w.href)}">{_esc(w.workflow.replace(".dig", ""))}</a></td>
+          <td><span class="badge">{_esc(w.project)}</span></td>
+          <td class="num">{w.history.get("attempts", 0)}</td>
+          <td class="num">{format_duration(w.history.get("p50", 0.0))}</td>
+          <td class="num">{format_duration(w.history.get("p95", 0.0))}</td>
+          <td class="num">{format_duration(w.history.get("critical_s", 0.0))}</td>
+          <td>{_tasks(w.history.get("critical_path", []))}</td>
+        </tr>"""
+        for w in timed
+    )
+    empty = (
+        ""
+        if timed
+        else '<p class="muted">No attempt history was loaded; build with <code>--history</code>.</p>'
+    )
+
+    doc = f"""<!doctype html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Slowest Workflows</title>
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<style>{dark_base_css()}
+  a.button{{display:inline-block;margin-right:8px;padding:8px 10px;border-radius:10px;border:1px solid var(--border);background:#1f2937;color:var(--text)}}
+  table{{width:100%;border-collapse:separate;border-spacing:0;overflow:hidden;
+         border:1px solid var(--border);border-radius:12px;background:var(--panel)}}
+  thead th{{position:sticky;top:0;background:var(--panel);border-bottom:1px solid var(--border);
+           text-align:left;padding:12px;font-weight:600}}
+  tbody tr{{background:#101219}}
+  tbody tr:nth-child(even){{background:#0e1017}}
+  tbody td{{padding:12px;border-bottom:1px solid var(--border);vertical-align:top}}
+  tbody tr:hover{{background:#131826}}
+  code{{background:#0f1117;padding:2px 6px;border-radius:6px;word-break:break-word}}
+  .controls{{display:flex;gap:12px;align-items:center;margin-top:8px;flex-wrap:wrap}}
+  .controls input[type="search"]{{
+    background:#0f1117;color:var(--text);border:1px solid var(--border);border-radius:8px;
+    padding:10px 12px;outline:none
+  }}
+  .badge{{background:#1f2937;border:1px solid #2c3342;border-radius:999px;padding:2px 8px;font-size:12px}}
+  .num{{text-align:right;white-space:nowrap}}
+</style>
+</head>
+<body>
+
+<header>
+  <div class="wrap">
+    <h1>Slowest Workflows</h1>
+    <div class="muted">Attempt durations from Digdag history (p50/p95) and the critical path: the chain of tasks that bounds a run, by p50 task duration.</div>
+    <p style="margin:10px 0">
+      <a class="button" href="./{SCHEDULE_INDEX_FILE}">← Scheduled index</a>
+    </p>
+    <div class="controls">
+      <input id="q" type="search" placeholder="Search workflow, project or task…">
+      <span class="badge" id="count"></span>
+    </div>
+  </div>
+</header>
+
+<main class="wrap">
+  {empty}
+  <table id="tbl">
+    <thead>
+      <tr>
+        <th>Workflow</th>
+        <th>Project</th>
+        <th class="num">Attempts</th>
+        <th class="num">p50</th>
+        <th class="num">p95</th>
+        <th class="num">Critical path</th>
+        <th>Slowest critical tasks</th>
+      </tr>
+    </thead>
+    <tbody>
+      {rows_html}
+    </tbody>
+  </table>
+</main>
+
+<footer class="wrap muted" style="font-size:12px;padding-bottom:28px">
+  Generated by <code>digdag-pages</code>
+</footer>
 
+<script>
+(function() {{
+  const q = document.getElementById('q');
+  const count = document.getElementById('count');
+  const rows = Array.from(document.querySelectorAll('#tbl tbody tr'));
+  const texts = rows.map(tr => tr.innerText.toLowerCase());
+
+  function apply() {{
+    const term = (q.value || '').toLowerCase();
+    let visible = 0;
+    rows.forEach((tr, i) => {{
+      const show = !term || texts[i].includes(term);
+      tr.style.display = show ? '' : 'none';
+      if (show) visible++;
+    }});
+    count.textContent = visible + ' workflows';
+  }}
+
+  q.addEventListener('input', apply);
+  apply();
+}})();
+</script>
+
+</body>
+</html>
+"""
+    _write(out_path, doc)
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import json
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from .graph_blocks import Block
+
+
+@dataclass
+class GraphSize:
+    nodes: int = 0
+    edges: int = 0
+    clusters: int = 0
+
+
+@dataclass
+class LayoutProfile:
+    """
+    Graphviz graph attributes for workflows up to the given size (None: no
+    limit). `flatten` drops the cluster boxes, which are the costliest part of
+    laying out deep trees.
+    """
+
+    name: str
+    max_nodes: Optional[int] = None
+    max_edges: Optional[int] = None
+    max_clusters: Optional[int] = None
+    graph_attr: Dict[str, str] = field(default_factory=dict)
+    flatten: bool = False
+
+    def fits(self, size: GraphSize) -> bool:
+        return all(
+            limit is None or value <= limit
+            for limit, value in (
+                (self.max_nodes, size.nodes),
+                (self.max_edges, size.edges),
+                (self.max_clusters, size.clusters),
+            )
+        )
+
+
+# Checked in order; the first profile the graph fits wins, the last one takes the rest.
+# nslimit/nslimit1 cap network-simplex iterations (ranking and x placement),
+# mclimit scales crossing-minimization passes, searchsize bounds the negative
+# cut-value search; polyline/line splines skip spline routing.
+DEFAULT_PROFILES: List[LayoutProfile] = [
+    LayoutProfile("small", max_nodes=200, max_edges=400),
+    LayoutProfile(
+        "medium",
+        max_nodes=1500,
+        max_edges=3000,
+        max_clusters=300,
+        graph_attr={"nslimit": "8", "nslimit1": "8", "mclimit": "1", "searchsize": "100"},
+    ),
+    LayoutProfile(
+        "large",
+        max_nodes=6000,
+        max_edges=12000,
+        max_clusters=1500,
+        graph_attr={"splines": "polyline", "nslimit": "2", "nslimit1": "2", "mclimit": "0.3", "searchsize": "30"},
+    ),
+    LayoutProfile(
+        "huge",
+        graph_attr={
+            "splines": "line",
+            "nslimit": "1",
+            "nslimit1": "1",
+            "mclimit": "0.1",
+            "searchsize": "10",
+            "remincross": "false",
+        },
+        flatten=True,
+    ),
+]
+
+_FIELDS = ("name", "max_nodes", "max_edges", "max_clusters", "graph_attr", "flatten")
+
+
+def measure(root: Block) -> GraphSize:
+    """Nodes, edges and clusters of the graph `Block.draw` emits for `root`."""
+    size = GraphSize()
+    stack = [root]
+    while stack:
+        b = stack.pop()
+        size.nodes += 1
+        if not b.subblocks:
+            continue
+        size.clusters += 1
+        prev = [b]
+        for child in b.subblocks:
+            size.edges += len(prev)
+            if not b.parallel:
+                prev = child.last()
+        stack.extend(b.subblocks)
+    return size
+
+
+def pick_profile(size: GraphSize, profiles: Sequence[LayoutProfile]) -> LayoutProfile:
+    for profile in profiles:
+        if profile.fits(size):
+            return profile
+    return profiles[-1]
+
+
+def load_profiles(path: str) -> List[LayoutProfile]:
+    """
+    Profiles from a JSON file: a list of objects with the LayoutProfile fields,
+    smallest first. Raises ValueError when the file doesn't describe profiles.
+    """
+    try:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        raise ValueError(f"cannot read layout profiles {path}: {e}") from None
+    if not isinstance(data, list) or not data:
+        raise ValueError(f"{path}: expected a non-empty list of profiles")
+    profiles = []
+    for i, item in enumerate(data):
+        if not isinstance(item, dict) or "name" not in item:
+            raise ValueError(f"{path}: profile {i + 1} needs a name")
+        unknown = sorted(set(item) - set(_FIELDS))
+        if unknown:
+            raise ValueError(f"{path}: profile {item['name']!r} has unknown keys {', '.join(unknown)}")
+        for key in ("max_nodes", "max_edges", "max_clusters"):
+            if item.get(key) is not None and not isinstance(item[key], int):
+                raise ValueError(f"{path}: profile {item['name']!r}: {key} must be an integer")
+        attrs = item.get("graph_attr", {})
+        if not isinstance(attrs, dict):
+            raise ValueError(f"{path}: profile {item['name']!r}: graph_attr must be an object")
+        profiles.append(
+            LayoutProfile(
+                name=str(item["name"]),
+                max_nodes=item.get("max_nodes"),
+                max_edges=item.get("max_edges"),
+                max_clusters=item.get("max_clusters"),
+                graph_attr={str(k): str(v) for k, v in attrs.items()},
+                flatten=bool(item.get("flatten", False)),
+            )
+        )
+    return profiles
+
+
+def profiles_key(profiles: Sequence[LayoutProfile]) -> str:
+    """Canonical text of `profiles`, stored in the catalog to detect a changed configuration."""
+    return json.dumps([asdict(p) for p in profiles], sort_keys=True, separators=(",", ":"))
+
+
+def size_bucket(nodes: int) -> int:
+    """Upper bound of the power-of-two node-count bucket `nodes` falls in."""
+    bucket = 16
+    while bucket < nodes:
+        bucket *= 2
+    return bucket
+
+
+def record_layout(stats: Dict[str, Dict[str, List[float]]], profile: str, size: GraphSize, seconds: float) -> None:
+    """
+    Add one layout to `stats` (the report's "layout_profiles" section):
+    profile -> node bucket -> [workflows, total seconds, max seconds],
+    i.e. the layout time vs. size curve of each profile.
+    """
+    row = stats.setdefault(profile, {}).setdefault(str(size_bucket(size.nodes)), [0, 0.0, 0.0])
+    row[0] += 1
+    row[1] = round(row[1] + seconds, 4)
+    row[2] = round(max(row[2], seconds), 4)
+
+
+def merge_layout_stats(into: Dict[str, Dict[str, List[float]]], other: Dict[str, Dict[str, List[float]]]) -> None:
+    for profile, buckets in other.items():
+        for bucket, (count, total, worst) in buckets.items():
+            row = into.setdefault(profile, {}).setdefault(bucket, [0, 0.0, 0.0])
+            row[0] += count
+            row[1] = round(row[1] + total, 4)
+            row[2] = max(row[2], worst)
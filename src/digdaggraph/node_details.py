@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Dict, Tuple
+
+from .graph_blocks import Block
+
+# No label line is drawn wider than this many characters
+LABEL_LINE_WIDTH = 60
+# Written next to the workflow page, fetched by its side panel on the first node click
+DETAILS_SUFFIX = ".details.json"
+# SVG ids of all nodes (sidecar entries and the task finder refer to them)
+ID_PREFIX = "dg-"
+
+
+def fit_label(label: str, budget: int) -> Tuple[str, bool]:
+    """
+    `label` cut to `budget` characters (0: no limit): the first line (the task
+    name) is always kept, long lines are cut at LABEL_LINE_WIDTH and dropped
+    lines are counted on a last line. Returns the label and whether it was cut.
+    """
+    if budget <= 0:
+        return label, False
+    lines = label.split("\n")
+    kept = []
+    used = 0
+    cut = False
+    for i, line in enumerate(lines):
+        if len(line) > LABEL_LINE_WIDTH:
+            line, cut = line[: LABEL_LINE_WIDTH - 1] + "…", True
+        if kept and used + len(line) > budget:
+            kept.append(f"… (+{len(lines) - i} lines)")
+            return "\n".join(kept), True
+        kept.append(line)
+        used += len(line)
+    return "\n".join(kept), cut
+
+
+def apply_label_budget(root: Block, budget: int) -> int:
+    """
+    Shorten every label of the tree to `budget`; a shortened label is kept in
+    full in the node's details. Returns how many labels were shortened.
+    """
+    shortened = 0
+    stack = [root]
+    while stack:
+        b = stack.pop()
+        label, cut = fit_label(str(b.label), budget)
+        if cut:
+            b.details.setdefault("label", b.label)
+            b.label = label
+            shortened += 1
+        stack.extend(b.subblocks)
+    return shortened
+
+
+def collect_details(root: Block) -> Dict[str, Dict[str, Any]]:
+    """
+    Give every node an SVG id (dg-1, dg-2, ... in tree order, so rebuilding
+    an unchanged workflow yields the same ids) and return the sidecar entries
+    of the nodes with details by id: title, link and the details themselves.
+    """
+    nodes: Dict[str, Dict[str, Any]] = {}
+    count = 0
+    stack = [root]
+    while stack:
+        b = stack.pop()
+        count += 1
+        b.detail_id = f"{ID_PREFIX}{count}"
+        if b.details:
+            entry: Dict[str, Any] = {"title": b.task_path or str(b.label).split("\n", 1)[0]}
+            if b.URL:
+                entry["url"] = b.URL
+            entry["details"] = b.details
+            nodes[b.detail_id] = entry
+        stack.extend(reversed(b.subblocks))
+    return nodes
+
+
+def write_details(path: Path, nodes: Dict[str, Dict[str, Any]]) -> bool:
+    """Write the sidecar (or remove a stale one when there is nothing to show); True if written."""
+    path = Path(path)
+    if not nodes:
+        path.unlink(missing_ok=True)
+        return False
+    text = json.dumps({"v": 1, "nodes": nodes}, default=str, ensure_ascii=False, separators=(",", ":"))
+    path.write_text(text, encoding="utf-8")
+    return True
@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from .logging_config import get_logger
+
+logger = get_logger(__name__)
+
+_MONTHS = {m: i + 1 for i, m in enumerate("jan feb mar apr may jun jul aug sep oct nov dec".split())}
+_DOWS = {d: i for i, d in enumerate("sun mon tue wed thu fri sat".split())}
+_MACROS = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+
+
+@dataclass(frozen=True)
+class CronSpec:
+    """Expanded cron fields. dow uses 0=Sunday; `*_star` keep cron's dom/dow OR rule."""
+
+    minutes: Tuple[int, ...]
+    hours: FrozenSet[int]
+    doms: FrozenSet[int]
+    months: FrozenSet[int]
+    dows: FrozenSet[int]
+    dom_star: bool = True
+    dow_star: bool = True
+
+
+def _parse_field(text: str, lo: int, hi: int, names: Optional[Dict[str, int]] = None) -> FrozenSet[int]:
+    out = set()
+    for part in str(text).lower().split(","):
+        step = 1
+        if "/" in part:
+            part, step_s = part.split("/", 1)
+            step = int(step_s)
+        if part in ("*", ""):
+            a, b = lo, hi
+        elif "-" in part:
+            a_s, b_s = part.split("-", 1)
+            a = names[a_s[:3]] if names and a_s[:3] in names else int(a_s)
+            b = names[b_s[:3]] if names and b_s[:3] in names else int(b_s)
+        else:
+            a = names[part[:3]] if names and part[:3] in names else int(part)
+            b = hi if step > 1 else a
+        if step < 1 or a < lo or b > hi or a > b:
+            raise ValueError(f"cron field out of range: {text!r}")
+        out.update(range(a, b + 1, step))
+    return frozenset(out)
+
+
+def parse_cron(expr: str) -> CronSpec:
+    """Parse a 5-field cron expression (names, ranges, steps and @macros allowed)."""
+    expr = _MACROS.get(expr.strip().lower(), expr)
+    fields = expr.split()
+    if len(fields) != 5:
+        raise ValueError(f"expected 5 cron fields: {expr!r}")
+    m, h, dom, mon, dow = fields
+    dows = frozenset(d % 7 for d in _parse_field(dow, 0, 7, _DOWS))
+    return CronSpec(
+        minutes=tuple(sorted(_parse_field(m, 0, 59))),
+        hours=_parse_field(h, 0, 23),
+        doms=_parse_field(dom, 1, 31),
+        months=_parse_field(mon, 1, 12, _MONTHS),
+        dows=dows,
+        dom_star=dom.strip() in ("*", "?"),
+        dow_star=dow.strip() in ("*", "?"),
+    )
+
+
+def _hms(text: Any) -> Tuple[int, int]:
+    # "HH:MM:SS" / "HH:MM" -> (hour, minute)
+    parts = [int(p) for p in str(text).strip().split(":")]
+    return parts[0], parts[1] if len(parts) > 1 else 0
+
+
+def spec_for_schedule(schedule: Any) -> Optional[CronSpec]:
+    """
+    Turn a Digdag `schedule:` block into a CronSpec.
+    Supports cron>, daily>, hourly>, weekly>, monthly> and minutes_interval>.
+    Returns None for anything else; raises ValueError for malformed values.
+    """
+    if not isinstance(schedule, dict):
+        return None
+    if "cron>" in schedule:
+        return parse_cron(str(schedule["cron>"]))
+    if "daily>" in schedule:
+        h, m = _hms(schedule["daily>"])
+        return parse_cron(f"{m} {h} * * *")
+    if "hourly>" in schedule:
+        m, _s = _hms(schedule["hourly>"])
+        return parse_cron(f"{m} * * * *")
+    if "weekly>" in schedule:
+        day, at = str(schedule["weekly>"]).split(",", 1)
+        h, m = _hms(at)
+        return parse_cron(f"{m} {h} * * {day.strip()}")
+    if "monthly>" in schedule:
+        day, at = str(schedule["monthly>"]).split(",", 1)
+        h, m = _hms(at)
+        return parse_cron(f"{m} {h} {int(day)} * *")
+    if "minutes_interval>" in schedule:
+        return parse_cron(f"*/{int(schedule['minutes_interval>'])} * * * *")
+    return None
+
+
+@dataclass
+class ScheduleHeatmap:
+    """Fire counts per UTC hour over [start, start + days)."""
+
+    start: datetime
+    days: int
+    counts: List[int]
+    # workflow key -> total fires in horizon
+    fires: Dict[str, int] = field(default_factory=dict)
+    # workflow key -> {hour index: fires}; kept sparse for peak drill-down
+    per_workflow: Dict[str, Dict[int, int]] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+
+    def peaks(self, top: int = 20) -> List[Tuple[int, int, List[str]]]:
+        order = sorted(range(len(self.counts)), key=lambda i: (-self.counts[i], i))
+        out = []
+        for i in order[:top]:
+            if not self.counts[i]:
+                break
+            names = sorted(k for k, hours in self.per_workflow.items() if i in hours)
+            out.append((i, self.counts[i], names))
+        return out
+
+    def to_json(self, top: int = 20) -> Dict[str, Any]:
+        return {
+            "start": self.start.isoformat(),
+            "days": self.days,
+            "timezone": "UTC",
+            "hours": self.counts,
+            "fires": self.fires,
+            "peaks": [
+                {"hour": (self.start + timedelta(hours=i)).isoformat(), "count": n, "workflows": names}
+                for i, n, names in self.peaks(top)
+            ],
+            "errors": self.errors,
+        }
+
+
+class _Horizon:
+    """
+    Calendar attributes of every local day touching the horizon, kept as
+    bitmasks (bit d set <=> local day d has that value) so a schedule's
+    matching days are a handful of big-int ORs/ANDs instead of a per-day loop.
+    """
+
+    def __init__(self, start: datetime, days: int):
+        self.start = start
+        self.days = days
+        # one extra local day on each side covers any UTC offset
+        self.first_day = (start - timedelta(days=1)).date()
+        self.n_local = days + 2
+        self.dom_bits = [0] * 32
+        self.month_bits = [0] * 13
+        self.dow_bits = [0] * 7
+        for d in range(self.n_local):
+            day = self.first_day + timedelta(days=d)
+            self.dom_bits[day.day] |= 1 << d
+            self.month_bits[day.month] |= 1 << d
+            self.dow_bits[(day.weekday() + 1) % 7] |= 1 << d
+        self._offsets: Dict[str, List[int]] = {}
+
+    def day_mask(self, spec: CronSpec) -> int:
+        dom = 0
+        for v in spec.doms:
+            dom |= self.dom_bits[v]
+        dow = 0
+        for v in spec.dows:
+            dow |= self.dow_bits[v]
+        month = 0
+        for v in spec.months:
+            month |= self.month_bits[v]
+        if spec.dom_star or spec.dow_star:
+            return dom & dow & month
+        return (dom | dow) & month
+
+    def offsets(self, tz_name: str) -> List[int]:
+        """UTC offset in minutes for each local (day, hour), cached per timezone."""
+        cached = self._offsets.get(tz_name)
+        if cached is not None:
+            return cached
+        if tz_name.upper() in ("UTC", "Z", "GMT"):
+            offs = [0] * (self.n_local * 24)
+        else:
+            from zoneinfo import ZoneInfo
+
+            tz = ZoneInfo(tz_name)
+            offs = []
+            base = datetime.combine(self.first_day, datetime.min.time())
+            for i in range(self.n_local * 24):
+                local = (base + timedelta(hours=i)).replace(tzinfo=tz)
+                offs.append(int(local.utcoffset().total_seconds() // 60))
+        self._offsets[tz_name] = offs
+        return offs
+
+    def expand(self, spec: CronSpec, tz_name: str) -> Dict[int, int]:
+        """Fires per UTC hour index (0 = start) for one schedule in one timezone."""
+        mask = self.day_mask(spec)
+        offs = self.offsets(tz_name)
+        hours = sorted(spec.hours)
+        first = datetime.combine(self.first_day, datetime.min.time(), dt_timezone.utc)
+        start_hour = int((self.start - first).total_seconds() // 3600)
+        limit = self.days * 24
+        # For a given UTC offset, the minutes of one local hour land in a fixed
+        # set of relative UTC hours; compute that histogram once per offset.
+        spread: Dict[int, List[Tuple[int, int]]] = {}
+        out: Dict[int, int] = {}
+        d = 0
+        while mask:
+            if mask & 1:
+                for h in hours:
+                    off = offs[d * 24 + h]
+                    rel = spread.get(off)
+                    if rel is None:
+                        counts: Dict[int, int] = {}
+                        for m in spec.minutes:
+                            counts[(m - off) // 60] = counts.get((m - off) // 60, 0) + 1
+                        rel = spread[off] = sorted(counts.items())
+                    base = d * 24 + h - start_hour
+                    for delta, n in rel:
+                        idx = base + delta
+                        if 0 <= idx < limit:
+                            out[idx] = out.get(idx, 0) + n
+            mask >>= 1
+            d += 1
+        return out
+
+
+def expand_schedules(
+    workflows: Iterable[Any],
+    days: int = 30,
+    start: Optional[datetime] = None,
+) -> ScheduleHeatmap:
+    """
+    Expand every workflow schedule into fires per UTC hour over `days` days.
+
+    Schedules are interpreted in the workflow's `timezone` (Digdag default UTC).
+    Identical (schedule, timezone) pairs are expanded once and reused, which is
+    what makes thousands of workflows sharing a few dozen crons cheap.
+    """
+    if start is None:
+        start = datetime.now(dt_timezone.utc).replace(hour=0)
+    start = start.replace(minute=0, second=0, microsecond=0)
+    horizon = _Horizon(start, days)
+    heat = ScheduleHeatmap(start=start, days=days, counts=[0] * (days * 24))
+    memo: Dict[Tuple[CronSpec, str], Dict[int, int]] = {}
+
+    for wf in workflows:
+        if wf.schedule is None:
+            continue
+        try:
+            spec = spec_for_schedule(wf.schedule)
+            if spec is None:
+                continue
+            tz_name = wf.timezone or "UTC"
+            key = (spec, tz_name)
+            fires = memo.get(key)
+            if fires is None:
+                fires = memo[key] = horizon.expand(spec, tz_name)
+        except Exception as e:
+            logger.warning(f"Cannot expand schedule for {wf.key}: {e}")
+            heat.errors[wf.key] = str(e)
+            continue
+        for idx, n in fires.items():
+            heat.counts[idx] += n
+        heat.fires[wf.key] = sum(fires.values())
+        heat.per_workflow[wf.key] = fires
+    return heat
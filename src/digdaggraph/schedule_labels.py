@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from .logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# cron_descriptor is imported on the first cache miss, once per process.
+_get_description: Optional[Callable[[str], str]] = None
+
+
+def _describe(expr: str) -> str:
+    global _get_description
+    if _get_description is None:
+        from cron_descriptor import get_description
+
+        _get_description = get_description
+    return _get_description(expr)
+
+
+def _key(obj: Any) -> str:
+    return json.dumps(obj, sort_keys=True, default=str)
+
+
+class ScheduleLabels:
+    """
+    Memo for cron descriptions and the two schedule label forms (graph node and
+    schedule index row). Most workflows share a few dozen crons, so this turns
+    thousands of cron_descriptor/yaml calls into dict lookups. Can be persisted
+    as JSON between runs.
+    """
+
+    def __init__(self) -> None:
+        self.cron: Dict[str, str] = {}
+        self.rows: Dict[str, str] = {}
+        self.nodes: Dict[str, str] = {}
+        self.path: Optional[Path] = None
+        self.hits = 0
+        self.misses = 0
+        self.cron_calls = 0
+
+    def describe_cron(self, expr: str) -> str:
+        expr = str(expr)
+        desc = self.cron.get(expr)
+        if desc is not None:
+            self.hits += 1
+            return desc
+        self.misses += 1
+        self.cron_calls += 1
+        desc = self.cron[expr] = _describe(expr)
+        return desc
+
+    def node_label(self, schedule_obj: Any) -> str:
+        """Label for the schedule node in a workflow graph."""
+        key = _key(schedule_obj)
+        label = self.nodes.get(key)
+        if label is not None:
+            self.hits += 1
+            return label
+        self.misses += 1
+        label = f"schedule\n{json.dumps(schedule_obj)}"
+        if isinstance(schedule_obj, dict) and "cron>" in schedule_obj:
+            try:
+                label = f"{json.dumps(schedule_obj)}\n{self.describe_cron(schedule_obj['cron>'])}"
+            except Exception as e:
+                logger.warning(f"cron description failed: {e}")
+        self.nodes[key] = label
+        return label
+
+    def row_label(self, schedule_obj: Any) -> str:
+        """
+        Build a robust label for the schedule table row.
+        Prefer cron humanization when possible, but never fail the row.
+        """
+        key = _key(schedule_obj)
+        label = self.rows.get(key)
+        if label is not None:
+            self.hits += 1
+            return label
+        self.misses += 1
+        try:
+            import yaml
+
+            label_core = yaml.safe_dump(schedule_obj).strip()
+        except Exception:
+            label_core = f"{schedule_obj!r}" if isinstance(schedule_obj, str) else json.dumps(schedule_obj)
+
+        label = f"schedule\n{label_core}"
+        # Try to humanize cron, but never make this fatal
+        try:
+            if isinstance(schedule_obj, dict) and "cron>" in schedule_obj:
+                label = f"{label_core}\n{self.describe_cron(schedule_obj['cron>'])}"
+        except Exception as e:
+            logger.warning(f"cron description failed: {e}")
+        self.rows[key] = label
+        return label
+
+    def load(self, path: Path) -> None:
+        self.path = Path(path)
+        if not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            self.cron.update(data.get("cron", {}))
+            self.rows.update(data.get("rows", {}))
+            self.nodes.update(data.get("nodes", {}))
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable schedule label cache {self.path}: {e}")
+
+    def save(self) -> None:
+        if not self.path or not self.misses:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {"cron": self.cron, "rows": self.rows, "nodes": self.nodes}
+        self.path.write_text(json.dumps(data, sort_keys=True), encoding="utf-8")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "cron_descriptor_calls": self.cron_calls,
+            "distinct_crons": len(self.cron),
+        }
+
+
+# Process-wide instance used by graph building and the CLI
+LABELS = ScheduleLabels()
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .build_cost import CostModel, features_for
+from .html_pages import RELATED_BEGIN, RELATED_END
+from .logging_config import get_logger
+from .workflow_info import WorkflowInfo
+
+logger = get_logger(__name__)
+
+SHARD_VERSION = 1
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """"i/N" (1-based) -> (i, N); raises ValueError on anything else."""
+    try:
+        index, count = (int(part) for part in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"expected i/N, got {spec!r}") from None
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"shard {spec!r} out of range (need 1 <= i <= N)")
+    return index, count
+
+
+def shard_file(shard_dir: Path, index: int, count: int) -> Path:
+    return Path(shard_dir) / f"shard-{index}-of-{count}.json"
+
+
+def _rel(path: str, root: Path) -> str:
+    try:
+        return Path(path).relative_to(root).as_posix()
+    except ValueError:
+        return Path(path).as_posix()
+
+
+def _stable_bucket(rel_path: str, count: int) -> int:
+    digest = hashlib.sha1(rel_path.encode("utf-8", "surrogatepass")).digest()
+    return int.from_bytes(digest[:8], "big") % count
+
+
+def predicted_cost(path: Path, model: Optional[CostModel] = None) -> float:
+    """Estimated build seconds of a workflow (see build_cost), from its .dig text alone."""
+    return (model or CostModel()).estimate(features_for(path))
+
+
+def assign_shards(rel_paths: Sequence[str], count: int, costs: Optional[Dict[str, float]] = None) -> Dict[str, int]:
+    """
+    Map each repo-relative path to a shard in 1..count.
+
+    Without `costs` a path's shard is a stable hash of the path, so adding or
+    removing a workflow never moves the others. With `costs`, workflows are
+    assigned longest-first to the least-loaded shard; ties break on the path,
+    so every runner computes the same plan from the same checkout.
+    """
+    if not costs:
+        return {p: _stable_bucket(p, count) + 1 for p in rel_paths}
+    loads = [0.0] * count
+    plan: Dict[str, int] = {}
+    for p in sorted(rel_paths, key=lambda p: (-costs.get(p, 0.0), p)):
+        shard = min(range(count), key=lambda i: (loads[i], i))
+        loads[shard] += costs.get(p, 0.0)
+        plan[p] = shard + 1
+    return plan
+
+
+def select_shard(
+    dig_files: Sequence[Path],
+    root: Path,
+    index: int,
+    count: int,
+    balance: bool = False,
+    model: Optional[CostModel] = None,
+) -> List[Path]:
+    """
+    The subset of `dig_files` shard `index` of `count` builds. With `balance`,
+    costs come from `model`, which must be the same on every runner.
+    """
+    rel = {_rel(str(p), root): p for p in dig_files}
+    costs = {r: predicted_cost(p, model) for r, p in rel.items()} if balance else None
+    plan = assign_shards(list(rel), count, costs)
+    return [p for r, p in sorted(rel.items()) if plan[r] == index]
+
+
+def write_shard(
+    path: Path,
+    index: int,
+    count: int,
+    workflows: Sequence[WorkflowInfo],
+    root: Path,
+    options: Dict[str, Any],
+    report: Dict[str, Any],
+) -> None:
+    """Partial metadata of one shard; workflow and input paths are stored repo-relative."""
+    infos = []
+    for info in workflows:
+        d = info.to_dict()
+        d["path"] = _rel(info.path, root)
+        d["inputs"] = [_rel(p, root) for p in info.inputs]
+        infos.append(d)
+    data = {
+        "version": SHARD_VERSION,
+        "shard": index,
+        "count": count,
+        "options": options,
+        "workflows": infos,
+        "report": report,
+    }
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, separators=(",", ":"), default=str), encoding="utf-8")
+
+
+def load_shards(shard_dir: Path, root: Path) -> Tuple[List[WorkflowInfo], List[Dict[str, Any]], List[str]]:
+    """
+    Read every shard file in `shard_dir`, rebasing paths onto `root`.
+    Returns (workflows, shard headers, problems); problems name missing or
+    inconsistent shards, in which case the merge should not go ahead.
+    """
+    files = sorted(Path(shard_dir).glob("shard-*-of-*.json"))
+    if not files:
+        return [], [], [f"no shard files in {shard_dir}"]
+    headers: List[Dict[str, Any]] = []
+    workflows: Dict[str, WorkflowInfo] = {}
+    problems: List[str] = []
+    for f in files:
+        try:
+            data = json.loads(f.read_text(encoding="utf-8"))
+        except Exception as e:
+            problems.append(f"{f}: unreadable ({e})")
+            continue
+        if data.get("version") != SHARD_VERSION:
+            problems.append(f"{f}: written by an incompatible version")
+            continue
+        headers.append({k: data.get(k) for k in ("shard", "count", "options", "report")})
+        for d in data.get("workflows", []):
+            d = dict(d)
+            d["path"] = str(root / d["path"])
+            d["inputs"] = [str(root / p) for p in d.get("inputs", [])]
+            info = WorkflowInfo.from_dict(d)
+            if info.path in workflows:
+                problems.append(f"{info.path} was built by more than one shard")
+            workflows[info.path] = info
+
+    counts = {h["count"] for h in headers}
+    if len(counts) > 1:
+        problems.append(f"shards disagree on N: {sorted(counts)}")
+    elif counts:
+        (count,) = counts
+        missing = sorted(set(range(1, count + 1)) - {h["shard"] for h in headers})
+        if missing:
+            problems.append(f"missing shard(s) {', '.join(f'{i}/{count}' for i in missing)}")
+    options = {json.dumps(h["options"], sort_keys=True) for h in headers}
+    if len(options) > 1:
+        problems.append("shards were built with different options (--render/--layout/--layout-profiles/--label-budget/--shard-balance)")
+    return [workflows[p] for p in sorted(workflows)], headers, problems
+
+
+def patch_related(html_path: str, related_html: str) -> bool:
+    """Replace the section between the related markers; False if the page has none."""
+    try:
+        text = Path(html_path).read_text(encoding="utf-8")
+    except OSError:
+        return False
+    start = text.find(RELATED_BEGIN)
+    end = text.find(RELATED_END, start)
+    if start < 0 or end < 0:
+        return False
+    patched = text[: start + len(RELATED_BEGIN)] + related_html + text[end:]
+    if patched != text:
+        Path(html_path).write_text(patched, encoding="utf-8")
+    return True
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import shutil
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .constants import ASSETS_DIR, GRAPHS_DIR, SCHEDULE_INDEX_FILE, SEARCH_DIR
+from .logging_config import get_logger
+from .html_pages import sql_part_files
+from .node_details import DETAILS_SUFFIX
+
+logger = get_logger(__name__)
+
+SITE_MANIFEST = "manifest.json"
+# Asset types copied from graphs/assets/; .gv sources, standalone .svg files,
+# caches and the catalog are never deployed.
+SITE_SUFFIXES = (".html", ".json", ".js", ".css")
+
+_REDIRECT = (
+    "<!doctype html><meta charset='utf-8'>"
+    f"<meta http-equiv='refresh' content='0; url={SCHEDULE_INDEX_FILE}'><title>Redirect</title>\n"
+)
+
+
+@dataclass
+class SiteDelta:
+    added: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    unchanged: int = 0
+
+    def summary(self) -> str:
+        return (
+            f"Site: {len(self.added)} added, {len(self.changed)} changed, "
+            f"{len(self.removed)} removed, {self.unchanged} unchanged"
+        )
+
+    def lines(self) -> List[str]:
+        return (
+            [f"+ {p}" for p in self.added]
+            + [f"~ {p}" for p in self.changed]
+            + [f"- {p}" for p in self.removed]
+        )
+
+
+def _signature(path: Path) -> str:
+    st = path.stat()
+    return f"{st.st_mtime_ns}:{st.st_size}"
+
+
+def _sha1(path: Path) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def deployable_files(workflows: Iterable[object], index_pages: Iterable[str]) -> List[str]:
+    """
+    Site-relative paths of everything the current build links to: the root
+    index pages, each workflow's page (and its node details) and the SQL pages
+    (and parts of paged ones) of its td> tasks, plus shared assets under
+    graphs/assets/ and the SQL search index under graphs/search/. Pages left
+    in graphs/ by deleted workflows or SQL files are not part of it.
+    """
+    paths: Dict[str, None] = {name: None for name in index_pages}
+    for wf in workflows:
+        page = wf.href[2:] if wf.href.startswith("./") else wf.href
+        paths[page] = None
+        details = page[: -len(".html")] + DETAILS_SUFFIX
+        if Path(details).is_file():
+            paths[details] = None
+        for ref in wf.sql_refs:
+            if ref.href:
+                sql_page = ref.href[2:] if ref.href.startswith("./") else ref.href
+                paths[sql_page] = None
+                for part in sql_part_files(Path(sql_page)):
+                    paths[part.as_posix()] = None
+    for shared in (ASSETS_DIR, SEARCH_DIR):
+        directory = Path(GRAPHS_DIR) / shared
+        if directory.is_dir():
+            for p in sorted(directory.rglob("*")):
+                if p.is_file() and p.name.endswith(SITE_SUFFIXES):
+                    paths[p.as_posix()] = None
+    return list(paths)
+
+
+def load_manifest(site_dir: Path) -> Dict[str, Dict[str, object]]:
+    path = Path(site_dir) / SITE_MANIFEST
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text(encoding="utf-8")).get("files", {})
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable site manifest {path}: {e}")
+        return {}
+
+
+def stage_site(root: Path, site_dir: Path, rel_paths: Iterable[str]) -> SiteDelta:
+    """
+    Mirror `rel_paths` (relative to `root`, see `deployable_files`) into
+    `site_dir` and write its manifest (path, size, sha1 per file).
+
+    Only files whose content changed since the previous manifest are copied;
+    files the previous manifest listed that no longer exist are deleted.
+    Source hashes are reused while a file's mtime and size are unchanged.
+    """
+    root, site_dir = Path(root), Path(site_dir)
+    site_dir.mkdir(parents=True, exist_ok=True)
+    previous = load_manifest(site_dir)
+    files: Dict[str, Dict[str, object]] = {}
+    delta = SiteDelta()
+
+    sources = [(rel, root / rel) for rel in rel_paths]
+    missing = [rel for rel, src in sources if not src.is_file()]
+    for rel in missing:
+        logger.warning(f"Not in build output, skipped from site: {rel}")
+    sources = [(rel, src) for rel, src in sources if src.is_file()]
+
+    redirect = site_dir / "index.html"
+    if not any(rel == "index.html" for rel, _src in sources):
+        data = _REDIRECT.encode("utf-8")
+        digest = hashlib.sha1(data).hexdigest()
+        old = previous.get("index.html")
+        if not old or old.get("sha1") != digest or not redirect.exists():
+            redirect.write_bytes(data)
+        files["index.html"] = {"size": len(data), "sha1": digest}
+
+    for rel, src in sources:
+        sig = _signature(src)
+        old = previous.get(rel)
+        digest = old["sha1"] if old and old.get("sig") == sig else _sha1(src)
+        dest = site_dir / rel
+        if not old or old.get("sha1") != digest or not dest.exists():
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(src, dest)
+        files[rel] = {"size": src.stat().st_size, "sha1": digest, "sig": sig}
+
+    for rel, entry in files.items():
+        old = previous.get(rel)
+        if old is None:
+            delta.added.append(rel)
+        elif old.get("sha1") != entry["sha1"]:
+            delta.changed.append(rel)
+        else:
+            delta.unchanged += 1
+
+    for rel in sorted(set(previous) - set(files)):
+        orphan = site_dir / rel
+        try:
+            orphan.unlink()
+        except FileNotFoundError:
+            pass
+        delta.removed.append(rel)
+        _prune_empty_dirs(orphan.parent, site_dir)
+
+    manifest = {"version": 1, "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "files": files}
+    (site_dir / SITE_MANIFEST).write_text(json.dumps(manifest, indent=1, sort_keys=True), encoding="utf-8")
+    return delta
+
+
+def _prune_empty_dirs(path: Path, stop: Path) -> None:
+    while path != stop and stop in path.parents:
+        try:
+            path.rmdir()
+        except OSError:
+            return
+        path = path.parent
+
+
+def site_delta_report(delta: SiteDelta, limit: Optional[int] = None) -> Dict[str, object]:
+    lines = delta.lines()
+    return {
+        "added": len(delta.added),
+        "changed": len(delta.changed),
+        "removed": len(delta.removed),
+        "unchanged": delta.unchanged,
+        "paths": lines[:limit] if limit else lines,
+    }
@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+from html import escape
+from typing import List
+
+from .graph_blocks import Block
+from .graph_model import X11_COLORS, css_color
+
+# Same geometry as assets/graph_layout.js so both render modes look alike.
+FONT = 12
+LINE = 16
+CHAR_W = 7
+PAD_X = 10
+PAD_Y = 8
+MIN_W = 54
+MIN_H = 36
+RANK_SEP = 30
+NODE_SEP = 20
+CLUSTER_PAD = 10
+MARGIN = 8
+EDGE_COLOR = "#ff0000"
+
+SUPPORTED_SHAPES = frozenset(
+    {"box", "rect", "rectangle", "diamond", "hexagon", "cds", "Mcircle", "circle", "ellipse",
+     "note", "folder", "box3d", "component"}
+)
+
+
+class _Box:
+    """Layout state for one Block: node size, subtree size, positions."""
+
+    __slots__ = ("block", "lines", "nw", "nh", "w", "h", "kw", "kh", "cw", "ch",
+                 "cx", "top", "bottom", "clx", "cly", "kids")
+
+    def __init__(self, block: Block):
+        self.block = block
+        self.kids = [_Box(b) for b in block.subblocks]
+
+
+def qualifies(root: Block) -> bool:
+    """
+    True when the built-in layout can draw the tree faithfully: every shape
+    and color is one it knows (the tree structure itself is always
+    series-parallel, since Block.draw only emits sequential/parallel edges).
+    """
+    stack = [root]
+    while stack:
+        b = stack.pop()
+        if b.shape not in SUPPORTED_SHAPES:
+            return False
+        if b.color and not b.color.startswith("#") and b.color.lower() not in X11_COLORS:
+            return False
+        stack.extend(b.subblocks)
+    return True
+
+
+def _node_size(n: _Box) -> None:
+    n.lines = str(n.block.label).split("\n")
+    w = max(MIN_W, max(len(line) for line in n.lines) * CHAR_W + 2 * PAD_X)
+    h = max(MIN_H, len(n.lines) * LINE + 2 * PAD_Y)
+    shape = n.block.shape
+    if shape == "diamond":
+        w, h = w * 1.6, h * 1.6
+    elif shape in ("hexagon", "cds"):
+        w += 20
+    elif shape in ("Mcircle", "circle", "ellipse"):
+        w, h = w * 1.25, h * 1.25
+    n.nw, n.nh = w, h
+
+
+def _measure(n: _Box) -> None:
+    _node_size(n)
+    if not n.kids:
+        n.w, n.h = n.nw, n.nh
+        return
+    for k in n.kids:
+        _measure(k)
+    if n.block.parallel:
+        n.kw = sum(k.w for k in n.kids) + NODE_SEP * (len(n.kids) - 1)
+        n.kh = max(k.h for k in n.kids)
+    else:
+        n.kw = max(k.w for k in n.kids)
+        n.kh = sum(k.h for k in n.kids) + RANK_SEP * (len(n.kids) - 1)
+    n.cw, n.ch = n.kw + 2 * CLUSTER_PAD, n.kh + 2 * CLUSTER_PAD
+    n.w = max(n.nw, n.cw)
+    n.h = n.nh + RANK_SEP + n.ch
+
+
+def _place(n: _Box, x: float, y: float) -> None:
+    n.cx, n.top, n.bottom = x + n.w / 2, y, y + n.nh
+    if not n.kids:
+        return
+    n.clx, n.cly = x + (n.w - n.cw) / 2, y + n.nh + RANK_SEP
+    kx, ky = n.clx + CLUSTER_PAD, n.cly + CLUSTER_PAD
+    for k in n.kids:
+        if n.block.parallel:
+            _place(k, kx, ky)
+            kx += k.w + NODE_SEP
+        else:
+            _place(k, kx + (n.kw - k.w) / 2, ky)
+            ky += k.h + RANK_SEP
+
+
+def _last(n: _Box) -> List[_Box]:
+    # Same rule as Block.last()
+    if not n.kids:
+        return [n]
+    if not n.block.parallel:
+        return _last(n.kids[-1])
+    out: List[_Box] = []
+    for k in n.kids:
+        out.extend(_last(k))
+    return out
+
+
+def _f(v: float) -> str:
+    return f"{v:.1f}".rstrip("0").rstrip(".")
+
+
+def _shape_svg(n: _Box) -> str:
+    b = n.block
+    x, y, w, h = n.cx - n.nw / 2, n.top, n.nw, n.nh
+    r, bt, my = x + w, y + h, y + h / 2
+    fill = css_color(b.fillcolor) if b.fillcolor else "none"
+    attrs = f' fill="{fill}" stroke="{css_color(b.color)}" stroke-width="{_f(float(b.penwidth))}"'
+
+    def poly(*pts) -> str:
+        return f'<polygon points="{" ".join(f"{_f(px)},{_f(py)}" for px, py in pts)}"{attrs}/>'
+
+    def rect(rx, ry, rw, rh) -> str:
+        return f'<rect x="{_f(rx)}" y="{_f(ry)}" width="{_f(rw)}" height="{_f(rh)}"{attrs}/>'
+
+    shape = b.shape
+    if shape == "diamond":
+        return poly((n.cx, y), (r, my), (n.cx, bt), (x, my))
+    if shape == "hexagon":
+        return poly((x + 10, y), (r - 10, y), (r, my), (r - 10, bt), (x + 10, bt), (x, my))
+    if shape == "cds":
+        return poly((x, y), (r - 12, y), (r, my), (r - 12, bt), (x, bt))
+    if shape in ("Mcircle", "circle", "ellipse"):
+        out = f'<ellipse cx="{_f(n.cx)}" cy="{_f(my)}" rx="{_f(w / 2)}" ry="{_f(h / 2)}"{attrs}/>'
+        if shape == "Mcircle":
+            for ly in (y + h * 0.12, bt - h * 0.12):
+                out += f'<line x1="{_f(n.cx - w * 0.3)}" y1="{_f(ly)}" x2="{_f(n.cx + w * 0.3)}" y2="{_f(ly)}"{attrs}/>'
+        return out
+    if shape == "note":
+        return poly((x, y), (r - 8, y), (r, y + 8), (r, bt), (x, bt))
+    if shape == "folder":
+        return poly((x, y), (x + w * 0.35, y), (x + w * 0.4, y + 5), (r, y + 5), (r, bt), (x, bt))
+    if shape == "box3d":
+        return rect(x + 4, y, w - 4, h - 4) + rect(x, y + 4, w - 4, h - 4)
+    if shape == "component":
+        return rect(x, y, w, h) + rect(x - 4, y + 6, 8, 6) + rect(x - 4, bt - 12, 8, 6)
+    return rect(x, y, w, h)
+
+
+def _node_svg(n: _Box) -> str:
+    b = n.block
+    y0 = n.top + n.nh / 2 - (len(n.lines) - 1) * LINE / 2 + FONT / 3
+    spans = "".join(
+        f'<tspan x="{_f(n.cx)}" y="{_f(y0 + i * LINE)}">{escape(line, quote=False)}</tspan>'
+        for i, line in enumerate(n.lines)
+    )
+    node_id = f' id="{b.detail_id}"' if b.detail_id else ""
+    g = (
+        f'<g{node_id} class="node"><title>{escape(b.tooltip or n.lines[0], quote=False)}</title>{_shape_svg(n)}'
+        f'<text text-anchor="middle" font-family="Helvetica,Arial,sans-serif" font-size="{FONT}">{spans}</text></g>'
+    )
+    if b.URL:
+        g = f'<a href="{escape(b.URL)}" target="_top">{g}</a>'
+    return g
+
+
+def _edge_svg(a: _Box, b: _Box) -> str:
+    sx, sy, tx, ty = a.cx, a.bottom, b.cx, b.top - 6
+    my = (sy + ty) / 2
+    return (
+        f'<path d="M{_f(sx)},{_f(sy)} C{_f(sx)},{_f(my)} {_f(tx)},{_f(my)} {_f(tx)},{_f(ty)}" '
+        f'fill="none" stroke="{EDGE_COLOR}" marker-end="url(#dg-arrow)"/>'
+    )
+
+
+def render_svg(root: Block) -> str:
+    """Lay out a Block tree in-process and return a standalone SVG document."""
+    top = _Box(root)
+    _measure(top)
+    _place(top, MARGIN, MARGIN)
+    nodes: List[str] = []
+    edges: List[str] = []
+    clusters: List[str] = []
+    stack = [top]
+    while stack:
+        n = stack.pop()
+        nodes.append(_node_svg(n))
+        if not n.kids:
+            continue
+        clusters.append(
+            f'<rect class="cluster" x="{_f(n.clx)}" y="{_f(n.cly)}" width="{_f(n.cw)}" '
+            f'height="{_f(n.ch)}" fill="none" stroke="#000000"/>'
+        )
+        prev = [n]
+        for k in n.kids:
+            edges.extend(_edge_svg(p, k) for p in prev)
+            if not n.block.parallel:
+                prev = _last(k)
+        stack.extend(reversed(n.kids))
+    width, height = int(top.w + 2 * MARGIN + 0.999), int(top.h + 2 * MARGIN + 0.999)
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}pt" height="{height}pt" viewBox="0 0 {width} {height}">'
+        '<defs><marker id="dg-arrow" viewBox="0 0 10 10" refX="1" refY="5" markerWidth="7" markerHeight="7" orient="auto">'
+        f'<path d="M0,0 L10,5 L0,10 z" fill="{EDGE_COLOR}"/></marker></defs>'
+        '<rect width="100%" height="100%" fill="#ffffff"/>'
+        + "".join(clusters) + "".join(edges) + "".join(nodes) + "</svg>"
+    )
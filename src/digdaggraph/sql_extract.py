@@ -2,6 +2,7 @@ from typing import Any, Optional
 
 # Keys commonly used to hold a SQL file path in Digdag/td> task shapes
 SQL_HINT_KEYS = ("query", "file", "path", "sql", "script")
+_HINT_RANK = {k: i for i, k in enumerate(SQL_HINT_KEYS)}
 
 
 def _looks_like_sql_path(s: str) -> bool:
@@ -28,21 +29,27 @@ def maybe_sql_path(val: Any) -> Optional[str]:
     if isinstance(val, str):
         return val.strip() if _looks_like_sql_path(val) else None
 
-    # Dict: check common keys first, then any direct string values, then recurse
+    # Dict, in one pass over the items: the first common key holding a SQL
+    # path wins, then the first direct string value, then recurse into children
     if isinstance(val, dict):
-        # 1) common keys
-        for k in SQL_HINT_KEYS:
-            v = val.get(k)
-            if isinstance(v, str) and _looks_like_sql_path(v):
-                return v.strip()
-
-        # 2) any direct string values
-        for v in val.values():
-            if isinstance(v, str) and _looks_like_sql_path(v):
-                return v.strip()
-
-        # 3) recurse into child containers
-        for v in val.values():
+        hint: Optional[str] = None
+        hint_rank = len(SQL_HINT_KEYS)
+        direct: Optional[str] = None
+        children = []
+        for k, v in val.items():
+            if isinstance(v, str):
+                if not _looks_like_sql_path(v):
+                    continue
+                rank = _HINT_RANK.get(k, hint_rank)
+                if rank < hint_rank:
+                    hint, hint_rank = v.strip(), rank
+                if direct is None:
+                    direct = v.strip()
+            elif isinstance(v, (dict, list, tuple)):
+                children.append(v)
+        if hint is not None or direct is not None:
+            return hint if hint is not None else direct
+        for v in children:
             found = maybe_sql_path(v)
             if found:
                 return found
@@ -0,0 +1,405 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+# One alternation, scanned left-to-right exactly once. Comments and string
+# literals are consumed as whole tokens so keywords inside them are never seen.
+_TOKEN_RE = re.compile(
+    r"""
+      (?P<ws>\s+)
+    | (?P<comment>--[^\n]*|/\*.*?(?:\*/|\Z))
+    | (?P<string>'(?:[^']|'')*(?:'|\Z))
+    | (?P<qident>"(?:[^"]|"")*"|`[^`]*`)
+    | (?P<word>(?:\$\{[^}]*\}|[A-Za-z0-9_$])+)
+    | (?P<punct>[(),.;])
+    | (?P<other>.)
+    """,
+    re.S | re.X,
+)
+
+# Words after which "(" opens a subquery/group rather than a function call.
+_RESERVED = frozenset(
+    """
+    select from where in exists as join on and or not union all intersect except
+    values with into table using when then else case by group order having limit
+    lateral over partition recursive insert overwrite create view merge update
+    delete set any some is
+    """.split()
+)
+
+# Words that end a comma-separated FROM list or can never be a table alias.
+_CLAUSE_WORDS = _RESERVED | frozenset(
+    """
+    left right full inner outer cross natural semi anti window qualify tablesample
+    cluster distribute sort offset fetch for
+    """.split()
+)
+
+_JOIN_NOT_TABLE = frozenset({"lateral", "unnest"})
+
+
+@dataclass
+class SqlTables:
+    reads: List[str] = field(default_factory=list)
+    writes: List[str] = field(default_factory=list)
+
+
+def normalize_table_name(name: str) -> str:
+    # Templated names (${db}.tbl) keep their case; plain identifiers don't have one.
+    return name if "${" in name else name.lower()
+
+
+def _tokenize(sql: str) -> List[Tuple[str, str]]:
+    """
+    Return ("name" | "kw" | "punct", text) tokens, with dotted names joined.
+
+    "kw" marks bare words (candidates for keywords, lowercased); "name" marks
+    quoted identifiers and dotted paths.
+    """
+    toks: List[Tuple[str, str]] = []
+    dotted = False
+    for m in _TOKEN_RE.finditer(sql):
+        kind = m.lastgroup
+        if kind in ("ws", "comment", "string", "other"):
+            dotted = False
+            if kind in ("string", "other"):
+                toks.append(("punct", "?"))
+            continue
+        text = m.group()
+        if kind == "punct":
+            if text == "." and toks and toks[-1][0] in ("name", "kw"):
+                dotted = True
+                continue
+            dotted = False
+            toks.append(("punct", text))
+            continue
+        if kind == "qident":
+            text = text[1:-1].replace('""', '"')
+        if dotted and toks and toks[-1][0] in ("name", "kw"):
+            toks[-1] = ("name", f"{toks[-1][1]}.{text}")
+        else:
+            toks.append(("kw" if kind == "word" else "name", text))
+        dotted = False
+    return toks
+
+
+def extract_tables(sql: str) -> SqlTables:
+    """
+    Find the tables a SQL script reads and writes.
+
+    Understands FROM/JOIN (including comma lists), INSERT INTO/OVERWRITE,
+    CREATE TABLE/VIEW [AS], MERGE INTO ... USING, UPDATE and DELETE FROM.
+    CTE names are never reported as tables, and comments / string literals
+    are skipped by the tokenizer. Names are lowercased unless templated.
+    """
+    toks = _tokenize(sql or "")
+    n = len(toks)
+    reads: Dict[str, None] = {}
+    writes: Dict[str, None] = {}
+    ctes: Set[str] = set()
+
+    def word(j: int) -> str:
+        return toks[j][1].lower() if j < n and toks[j][0] == "kw" else ""
+
+    def is_name(j: int) -> bool:
+        return j < n and (
+            toks[j][0] == "name" or (toks[j][0] == "kw" and toks[j][1].lower() not in _CLAUSE_WORDS)
+        )
+
+    def tok(j: int) -> str:
+        return toks[j][1] if j < n else ""
+
+    def skip_parens(j: int) -> int:
+        # toks[j] is "(": return the index just past its matching ")"
+        d = 0
+        while j < n:
+            if toks[j] == ("punct", "("):
+                d += 1
+            elif toks[j] == ("punct", ")"):
+                d -= 1
+                if d == 0:
+                    return j + 1
+            j += 1
+        return j
+
+    # Paren stack entries: True when the paren is a function call (FROM inside
+    # it is `extract(x FROM y)` and friends, not a table reference).
+    parens: List[bool] = []
+    cte_watch: List[int] = []
+    stmt_start = True
+    stmt_kind = ""
+    i = 0
+
+    def cte_header(j: int) -> int:
+        # toks[j] is the CTE name; returns the index after "AS (" (or where parsing stopped)
+        if not is_name(j):
+            return j
+        ctes.add(normalize_table_name(tok(j)))
+        j += 1
+        if tok(j) == "(":
+            j = skip_parens(j)
+        if word(j) == "as":
+            j += 1
+        while word(j) in ("not", "materialized"):
+            j += 1
+        if tok(j) == "(":
+            cte_watch.append(len(parens))
+            parens.append(False)
+            j += 1
+        return j
+
+    def table_ref(j: int, target: Dict[str, None], column_list: bool = False) -> int:
+        # Record a table name at j unless it is a subquery, function or CTE.
+        # Write targets may be followed by a column list instead of call args.
+        if not is_name(j) or word(j) in _JOIN_NOT_TABLE:
+            return j
+        if tok(j + 1) == "(" and not column_list:
+            return j
+        name = normalize_table_name(tok(j))
+        if name not in ctes:
+            target.setdefault(name, None)
+        return j + 1
+
+    def skip_alias(j: int) -> int:
+        if word(j) == "as":
+            return j + 2
+        if is_name(j):
+            return j + 1
+        return j
+
+    # Paren depths at which a FROM comma list resumes once a derived table closes
+    from_lists: List[int] = []
+
+    def from_items(j: int) -> int:
+        # FROM a x, b AS y, (subquery) z, c: record each table; at a derived
+        # table, stop at its "(" and let its ")" pick the list up again
+        while True:
+            if tok(j) == "(":
+                from_lists.append(len(parens))
+                return j
+            k = table_ref(j, reads)
+            if k == j:
+                return j
+            after = skip_alias(k)
+            if tok(after) != ",":
+                return k
+            j = after + 1
+
+    while i < n:
+        kind, text = toks[i]
+        low = text.lower() if kind == "kw" else ""
+
+        if kind == "punct":
+            if text == "(":
+                prev_fn = i > 0 and (toks[i - 1][0] == "name" or (toks[i - 1][0] == "kw" and word(i - 1) not in _RESERVED))
+                parens.append(prev_fn)
+            elif text == ")":
+                if parens:
+                    parens.pop()
+                if cte_watch and cte_watch[-1] == len(parens):
+                    cte_watch.pop()
+                    if tok(i + 1) == ",":
+                        i = cte_header(i + 2)
+                        continue
+                if from_lists and from_lists[-1] == len(parens):
+                    from_lists.pop()
+                    j = skip_alias(i + 1)
+                    if tok(j) == ",":
+                        i = from_items(j + 1)
+                        continue
+            elif text == ";":
+                stmt_start, stmt_kind = True, ""
+                parens.clear()
+                cte_watch.clear()
+                from_lists.clear()
+                ctes.clear()
+                i += 1
+                continue
+            stmt_start = False
+            i += 1
+            continue
+
+        in_function = bool(parens) and parens[-1]
+        if stmt_start:
+            stmt_kind = low
+        stmt_start = False
+
+        if low == "with":
+            j = i + 1
+            if word(j) == "recursive":
+                j += 1
+            i = cte_header(j)
+            continue
+
+        if low in ("from", "join") and not in_function:
+            if low == "from" and word(i - 1) == "delete":
+                i = table_ref(i + 1, writes)
+                continue
+            j = from_items(i + 1) if low == "from" else table_ref(i + 1, reads)
+            i = max(j, i + 1)
+            continue
+
+        if low == "insert":
+            j = i + 1
+            while word(j) in ("into", "overwrite", "table"):
+                j += 1
+            i = table_ref(j, writes, column_list=True) if j > i + 1 else i + 1
+            continue
+
+        if low == "create":
+            j = i + 1
+            while word(j) in ("or", "replace", "temporary", "temp", "external", "transient", "materialized"):
+                j += 1
+            if word(j) not in ("table", "view"):
+                i = j
+                continue
+            j += 1
+            if word(j) == "if" and word(j + 1) == "not" and word(j + 2) == "exists":
+                j += 3
+            i = table_ref(j, writes, column_list=True)
+            continue
+
+        if low == "merge" and word(i + 1) == "into":
+            i = table_ref(i + 2, writes)
+            continue
+
+        if low == "using" and stmt_kind == "merge":
+            i = table_ref(i + 1, reads)
+            continue
+
+        if low == "update" and stmt_kind == "update":
+            i = table_ref(i + 1, writes)
+            continue
+
+        i += 1
+
+    return SqlTables(reads=list(reads), writes=list(writes))
+
+
+def _statements_end(text: str) -> int:
+    """Offset just past the last `;` outside comments and string literals (0 without one)."""
+    end = 0
+    for m in _TOKEN_RE.finditer(text):
+        if m.lastgroup == "punct" and m.group() == ";":
+            end = m.end()
+    return end
+
+
+def extract_tables_chunked(chunks: Iterable[str]) -> SqlTables:
+    """
+    `extract_tables` over a script decoded a piece at a time: each batch of
+    whole statements is extracted on its own, so the full text is never one string.
+    """
+    reads: Dict[str, None] = {}
+    writes: Dict[str, None] = {}
+
+    def add(text: str) -> None:
+        tables = extract_tables(text)
+        reads.update(dict.fromkeys(tables.reads))
+        writes.update(dict.fromkeys(tables.writes))
+
+    rest = ""
+    for chunk in chunks:
+        text = rest + chunk
+        cut = _statements_end(text)
+        if cut:
+            add(text[:cut])
+        rest = text[cut:]
+    if rest.strip():
+        add(rest)
+    return SqlTables(reads=list(reads), writes=list(writes))
+
+
+def sql_hash(sql_text: str) -> str:
+    return hashlib.sha1(sql_text.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+# Part of every LineageCache key: bump when extract_tables' results change
+EXTRACTOR_VERSION = 3
+
+
+class LineageCache:
+    """
+    Content-hash keyed memo of `extract_tables`, optionally persisted as JSON
+    so unchanged SQL is never re-tokenized across runs.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else None
+        self._entries: Dict[str, Dict[str, List[str]]] = {}
+        self._used: Set[str] = set()
+        self.hits = 0
+        self.misses = 0
+        if self.path and self.path.exists():
+            try:
+                self._entries = json.loads(self.path.read_text(encoding="utf-8"))
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable lineage cache {self.path}: {e}")
+
+    def tables_for(self, sql_text: str) -> SqlTables:
+        return self._lookup(f"{EXTRACTOR_VERSION}:{sql_hash(sql_text)}", lambda: extract_tables(sql_text))
+
+    def _lookup(self, key: str, extract: Callable[[], SqlTables]) -> SqlTables:
+        self._used.add(key)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            return SqlTables(reads=list(entry["reads"]), writes=list(entry["writes"]))
+        self.misses += 1
+        tables = extract()
+        self._entries[key] = {"reads": tables.reads, "writes": tables.writes}
+        return tables
+
+    def tables_for_bytes(self, data: Any, chunks: Iterable[str]) -> SqlTables:
+        """
+        Like `tables_for`, keyed on a file's raw bytes (or mmap); the decoded
+        `chunks` are only read on a miss.
+        """
+        key = f"{EXTRACTOR_VERSION}:b:{hashlib.sha1(data).hexdigest()}"
+        return self._lookup(key, lambda: extract_tables_chunked(chunks))
+
+    def save(self, prune: bool = True) -> None:
+        """
+        Persist the cache. With `prune`, keep only entries seen this run (drops
+        SQL that no longer exists); incremental runs that skipped workflows pass False.
+        """
+        if not self.path:
+            return
+        if not prune and not self.misses:
+            return
+        kept = {k: v for k, v in self._entries.items() if k in self._used or not prune}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps(kept, separators=(",", ":")), encoding="utf-8")
+
+
+def build_table_usage(workflows: Iterable[Any]) -> Dict[str, Dict[str, List[Dict[str, str]]]]:
+    """
+    Invert per-workflow SQL references into {table: {"reads": [...], "writes": [...]}}.
+
+    Each usage row carries project, workflow, workflow href, task and SQL path.
+    """
+    usage: Dict[str, Dict[str, List[Dict[str, str]]]] = {}
+    for wf in workflows:
+        for ref in wf.sql_refs:
+            row = {
+                "project": wf.project,
+                "workflow": wf.workflow,
+                "href": wf.href,
+                "task": ref.task,
+                "sql": ref.path,
+                "sql_href": ref.href,
+            }
+            for mode, names in (("reads", ref.reads), ("writes", ref.writes)):
+                for name in names:
+                    usage.setdefault(name, {"reads": [], "writes": []})[mode].append(row)
+    return dict(sorted(usage.items()))
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import os
+import posixpath
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set
+
+from . import vfs
+from .constants import GRAPHS_DIR
+from .logging_config import get_logger
+
+logger = get_logger(__name__)
+
+_VAR = re.compile(r"\$\{\s*([^}]*?)\s*\}")
+
+
+@dataclass
+class SqlResolution:
+    """Outcome of resolving one SQL reference from a .dig file."""
+
+    ref: str
+    # path relative to the .dig directory (the reference itself, or its expansion)
+    path: str
+    abs_path: str
+    found: bool
+    reason: str = ""
+
+
+class SqlResolver:
+    """
+    Every `.sql` file under the indexed project directories, collected with one
+    directory walk per project. References are then answered from memory: a
+    set lookup for literal paths, a match against the indexed names for
+    `${...}` templates whose variables aren't known. A reference outside every
+    indexed project indexes its own directory (once) instead of probing the file.
+    """
+
+    def __init__(self) -> None:
+        self._files: Set[str] = set()
+        self._by_dir: Dict[str, List[str]] = {}
+        self._roots: Set[str] = set()
+        self._shallow: Set[str] = set()
+        self.resolved = 0
+        self.unresolved = 0
+
+    def index_dirs(self, dirs: Iterable[Path]) -> None:
+        for d in sorted({os.path.abspath(str(d)) for d in dirs}, key=len):
+            self.index_dir(d)
+
+    def index_dir(self, directory: str, recursive: bool = True) -> None:
+        directory = os.path.abspath(directory)
+        if self._covered(directory):
+            return
+        for dirpath, dirnames, filenames in vfs.walk(directory):
+            dirnames[:] = [d for d in dirnames if d != GRAPHS_DIR and not d.startswith(".")]
+            names = [f for f in filenames if f.endswith(".sql")]
+            if names:
+                self._by_dir.setdefault(dirpath, []).extend(names)
+                self._files.update(os.path.join(dirpath, f) for f in names)
+            if not recursive:
+                break
+        (self._roots if recursive else self._shallow).add(directory)
+
+    def _covered(self, directory: str) -> bool:
+        if directory in self._shallow:
+            return True
+        d = directory
+        while True:
+            if d in self._roots:
+                return True
+            parent = os.path.dirname(d)
+            if parent == d:
+                return False
+            d = parent
+
+    def _ensure_indexed(self, directory: str) -> None:
+        if not self._covered(directory):
+            self.index_dir(directory, recursive=False)
+
+    def exists(self, abs_path: str) -> bool:
+        self._ensure_indexed(os.path.dirname(abs_path))
+        return abs_path in self._files
+
+    def resolve(self, base_dir: str, ref: str, variables: Optional[Mapping[str, Any]] = None) -> SqlResolution:
+        """
+        Resolve `ref` (as written in the .dig, relative to `base_dir`).
+        `${name}` is substituted from `variables` (e.g. ExportScope.vars); an
+        unknown variable matches any file name part, and resolves if exactly
+        one indexed file fits.
+        """
+        base_dir = os.path.abspath(base_dir)
+        missing: List[str] = []
+
+        def _sub(m: "re.Match[str]") -> str:
+            name = m.group(1)
+            if variables and name in variables:
+                return str(variables[name])
+            missing.append(name)
+            return m.group(0)
+
+        text = posixpath.normpath(_VAR.sub(_sub, ref.strip()) if "${" in ref else ref.strip())
+        abs_path = os.path.normpath(os.path.join(base_dir, text))
+        if not missing:
+            return self._result(ref, text, base_dir, abs_path, self.exists(abs_path), "not found")
+
+        candidates = self._template_matches(base_dir, text)
+        if len(candidates) == 1:
+            return self._result(ref, text, base_dir, candidates[0], True)
+        names = ", ".join("${" + n + "}" for n in missing)
+        reason = f"unknown {names}; " + (f"{len(candidates)} files match" if candidates else "no file matches")
+        return self._result(ref, text, base_dir, abs_path, False, reason)
+
+    def _template_matches(self, base_dir: str, text: str) -> List[str]:
+        # split() alternates literal text and variable names; variables match one path segment part
+        pattern = "".join(re.escape(p) if i % 2 == 0 else "[^/]*" for i, p in enumerate(_VAR.split(text)))
+        regex = re.compile(pattern + r"\Z")
+        literal_dir = posixpath.dirname(text)
+        if "${" not in literal_dir:
+            directory = os.path.normpath(os.path.join(base_dir, literal_dir))
+            self._ensure_indexed(directory)
+            pool = [os.path.join(directory, n) for n in self._by_dir.get(directory, [])]
+        else:
+            self.index_dir(base_dir)
+            pool = [f for f in self._files if f.startswith(base_dir + os.sep)]
+        return sorted(f for f in pool if regex.match(Path(os.path.relpath(f, base_dir)).as_posix()))
+
+    def _result(
+        self, ref: str, text: str, base_dir: str, abs_path: str, found: bool, reason: str = ""
+    ) -> SqlResolution:
+        if found:
+            self.resolved += 1
+            return SqlResolution(ref, Path(os.path.relpath(abs_path, base_dir)).as_posix(), abs_path, True)
+        self.unresolved += 1
+        return SqlResolution(ref, text, abs_path, False, reason)
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+from . import vfs
+from .catalog import Catalog, file_signature
+from .logging_config import get_logger
+
+logger = get_logger(__name__)
+
+SEARCH_VERSION = 1
+# Documents per docs/<n>.json chunk; the page only fetches chunks holding hits
+DOC_CHUNK = 500
+
+_TOKEN = re.compile(r"[a-z_][a-z0-9_]*")
+_COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+
+# Keywords nearly every query contains; their posting lists would be most of
+# the index and match everything anyway.
+STOP_WORDS = frozenset(
+    """
+    select from where and or not as on join left right inner outer full cross by group
+    order having limit union all distinct case when then else end is null in with
+    insert into overwrite table values create drop if exists partition over asc desc
+    between like true false cast
+    """.split()
+)
+
+
+def tokenize(sql_text: str) -> List[str]:
+    """Distinct lowercase identifiers/keywords (2+ chars, comments and stop words dropped), sorted."""
+    text = _COMMENT.sub(" ", sql_text.lower())
+    return sorted({t for t in _TOKEN.findall(text) if 2 <= len(t) <= 64 and t not in STOP_WORDS})
+
+
+def shard_key(token: str) -> str:
+    return token[:2]
+
+
+@dataclass
+class SearchStats:
+    docs: int = 0
+    tokenized: int = 0
+    removed: int = 0
+    files_written: int = 0
+    files_removed: int = 0
+
+
+def _sql_documents(workflows: Iterable[object]) -> Dict[str, Dict[str, object]]:
+    """One document per generated SQL page (href), with every workflow that links to it."""
+    docs: Dict[str, Dict[str, object]] = {}
+    for wf in workflows:
+        for ref in wf.sql_refs:
+            if not ref.href:
+                continue
+            doc = docs.setdefault(
+                ref.href,
+                {
+                    "path": ref.path,
+                    "project": wf.project,
+                    "source": str(Path(wf.path).parent / ref.path),
+                    "workflows": {},
+                },
+            )
+            doc["workflows"][wf.key] = wf.href
+    return docs
+
+
+def _write_if_changed(path: Path, data: object, stats: SearchStats) -> None:
+    text = json.dumps(data, separators=(",", ":"), sort_keys=True)
+    try:
+        if path.read_text(encoding="utf-8") == text:
+            return
+    except OSError:
+        pass
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+    stats.files_written += 1
+
+
+def update_search_index(workflows: Iterable[object], catalog: Catalog, out_dir: Path) -> SearchStats:
+    """
+    Bring the sharded SQL search index in `out_dir` up to date.
+
+    Tokens per SQL file are kept in the catalog and only recomputed when the
+    file's signature changed; document ids are stable, so a changed file only
+    rewrites the shards of the tokens it gained or lost and its docs chunk.
+    Layout: meta.json (shard list), idx/<first two token chars>.json
+    (token -> doc ids) and docs/<id // DOC_CHUNK>.json (id -> page, SQL path,
+    project, workflows).
+    """
+    out_dir = Path(out_dir)
+    stats = SearchStats()
+    docs = _sql_documents(workflows)
+    known = catalog.search_docs()
+
+    stale = [href for href in known if href not in docs]
+    catalog.drop_search_docs(stale)
+    stats.removed = len(stale)
+
+    postings: Dict[str, Dict[str, List[int]]] = {}
+    chunks: Dict[int, Dict[str, object]] = {}
+    for href in sorted(docs):
+        doc = docs[href]
+        source = str(doc["source"])
+        sig = file_signature(source)
+        old = known.get(href)
+        if old and old[1] == source and old[2] == sig:
+            doc_id, tokens = old[0], old[3].split()
+        else:
+            try:
+                tokens = tokenize(vfs.read_text(source))
+            except OSError:
+                tokens = []
+            doc_id = catalog.record_search_doc(href, source, sig, " ".join(tokens))
+            stats.tokenized += 1
+        for t in tokens:
+            postings.setdefault(shard_key(t), {}).setdefault(t, []).append(doc_id)
+        chunks.setdefault(doc_id // DOC_CHUNK, {})[str(doc_id)] = [
+            href,
+            doc["path"],
+            doc["project"],
+            sorted(doc["workflows"].items()),
+        ]
+    stats.docs = len(docs)
+
+    for key, tokens in postings.items():
+        _write_if_changed(out_dir / "idx" / f"{key}.json", {t: sorted(ids) for t, ids in tokens.items()}, stats)
+    for n, chunk in chunks.items():
+        _write_if_changed(out_dir / "docs" / f"{n}.json", chunk, stats)
+    _write_if_changed(
+        out_dir / "meta.json",
+        {"v": SEARCH_VERSION, "docs": stats.docs, "chunk": DOC_CHUNK, "shards": sorted(postings)},
+        stats,
+    )
+
+    keep = {f"idx/{k}.json" for k in postings} | {f"docs/{n}.json" for n in chunks}
+    for sub in ("idx", "docs"):
+        for f in sorted((out_dir / sub).glob("*.json")):
+            if f"{sub}/{f.name}" not in keep:
+                f.unlink()
+                stats.files_removed += 1
+    return stats
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import json
+import re
+from typing import Dict, List, Optional, Tuple
+
+from .graph_blocks import Block
+from .node_details import ID_PREFIX
+
+Box = Tuple[float, float, float, float]
+
+_NODE = re.compile(rf'<g id="({re.escape(ID_PREFIX)}\d+)" class="node">')
+_TAG = re.compile(r"<g\b|</g>")
+_VIEWBOX = re.compile(r'<svg\b[^>]*\bviewBox="([^"]+)"')
+_GRAPH_TRANSFORM = re.compile(r'<g id="graph0" class="graph" transform="([^"]+)"')
+_NUM = r"-?[\d.]+(?:e-?\d+)?"
+_POINTS = re.compile(r'\bpoints="([^"]+)"')
+_PATH = re.compile(r'\bd="([^"]+)"')
+_ATTR = re.compile(r'(?<![\w-])(cx|cy|rx|ry|x|y|width|height|x1|y1|x2|y2)="(' + _NUM + ')"')
+
+
+def _transform(svg: str) -> Tuple[float, float, float, float]:
+    """(scale x, scale y, translate x, translate y) of Graphviz's top group, minus the viewBox origin."""
+    sx = sy = 1.0
+    tx = ty = 0.0
+    m = _GRAPH_TRANSFORM.search(svg)
+    if m:
+        scale = re.search(rf"scale\(({_NUM})[ ,]*({_NUM})?\)", m.group(1))
+        if scale:
+            sx = float(scale.group(1))
+            sy = float(scale.group(2) or scale.group(1))
+        shift = re.search(rf"translate\(({_NUM})[ ,]+({_NUM})\)", m.group(1))
+        if shift:
+            tx, ty = float(shift.group(1)), float(shift.group(2))
+    ox = oy = 0.0
+    vb = _VIEWBOX.search(svg)
+    if vb:
+        parts = vb.group(1).replace(",", " ").split()
+        if len(parts) == 4:
+            ox, oy = float(parts[0]), float(parts[1])
+    return sx, sy, tx - ox / sx, ty - oy / sy
+
+
+def _segment(svg: str, start: int) -> str:
+    """The markup of the <g> element opening at `start`, nested groups included."""
+    depth = 0
+    for m in _TAG.finditer(svg, start):
+        depth += 1 if m.group() == "<g" else -1
+        if depth == 0:
+            return svg[start : m.end()]
+    return svg[start:]
+
+
+def _points(segment: str) -> List[Tuple[float, float]]:
+    pts: List[Tuple[float, float]] = []
+    for raw in _POINTS.findall(segment) + _PATH.findall(segment):
+        nums = [float(n) for n in re.findall(_NUM, raw)]
+        pts.extend(zip(nums[0::2], nums[1::2]))
+    for shape in re.findall(r"<(?:ellipse|rect|line)\b[^>]*>", segment):
+        a = {k: float(v) for k, v in _ATTR.findall(shape)}
+        if "rx" in a:
+            pts += [(a["cx"] - a["rx"], a["cy"] - a["ry"]), (a["cx"] + a["rx"], a["cy"] + a["ry"])]
+        elif "width" in a:
+            pts += [(a["x"], a["y"]), (a["x"] + a["width"], a["y"] + a["height"])]
+        elif "x1" in a:
+            pts += [(a["x1"], a["y1"]), (a["x2"], a["y2"])]
+    return pts
+
+
+def node_boxes(svg: str) -> Dict[str, Box]:
+    """
+    Bounding box (x, y, width, height in viewBox units) of every node with an
+    SVG id in a Graphviz or built-in layout, from its outline shapes.
+    """
+    sx, sy, tx, ty = _transform(svg)
+    boxes: Dict[str, Box] = {}
+    for m in _NODE.finditer(svg):
+        pts = _points(_segment(svg, m.start()))
+        if not pts:
+            continue
+        xs = [(x + tx) * sx for x, _y in pts]
+        ys = [(y + ty) * sy for _x, y in pts]
+        boxes[m.group(1)] = (
+            round(min(xs), 1), round(min(ys), 1), round(max(xs) - min(xs), 1), round(max(ys) - min(ys), 1)
+        )
+    return boxes
+
+
+def task_index_json(root: Block, svg: Optional[str] = None) -> str:
+    """
+    The page's task finder index as compact JSON, safe to embed in a <script>
+    element: one [task path, operator, SVG id, x, y, width, height] row per
+    task, in tree order. The box is left out without an `svg` (client-side
+    layout) and for tasks the layout doesn't draw (collapsed views).
+    """
+    boxes = node_boxes(svg) if svg else {}
+    rows: List[list] = []
+    stack = [root]
+    while stack:
+        b = stack.pop()
+        if b.task_path and b.detail_id:
+            rows.append([b.task_path, b.operator, b.detail_id, *boxes.get(b.detail_id, ())])
+        stack.extend(reversed(b.subblocks))
+    text = json.dumps({"v": 1, "tasks": rows}, separators=(",", ":"), ensure_ascii=False)
+    return text.replace("</", "<\\/")
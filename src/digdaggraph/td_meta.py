@@ -1,9 +1,10 @@
 from __future__ import annotations
 
 import os
-import re
 from typing import Any, Dict, Optional
 
+from .sql_lineage import SqlTables, extract_tables
+
 TD_CONSOLE_BASE = os.getenv("TD_CONSOLE_BASE", "https://console.treasuredata.com").rstrip("/")
 
 
@@ -11,48 +12,104 @@ def _looks_nonempty(v: Any) -> bool:
     return v is not None and v != ""
 
 
-def td_task_meta(task_val: Any, exports: Dict[str, Any]) -> Dict[str, Any]:
+# meta field -> param names that set it, in priority order
+_META_KEYS = {
+    "database": ("database",),
+    "engine": ("engine",),  # presto|hive|spark
+    "priority": ("priority",),
+    "retry": ("_retry", "retry", "retries"),
+    "timezone": ("timezone",),
+    "result_connection": ("result_connection",),
+    "result_settings": ("result_settings",),
+}
+
+
+def _meta_from(params: Any) -> Dict[str, Any]:
+    """td meta set directly by one params dict (`td:` nested params first, then top-level)."""
+    if not isinstance(params, dict):
+        return {}
+    out: Dict[str, Any] = {}
+    for source in (params.get("td"), params):
+        if not isinstance(source, dict):
+            continue
+        for field, keys in _META_KEYS.items():
+            for key in keys:
+                v = source.get(key)
+                if _looks_nonempty(v):
+                    out[field] = v
+                    break
+    return out
+
+
+class ExportScope:
+    """
+    The `_export` chain visible at one level of a workflow (root → group → task),
+    flattened into resolved td meta and `${...}` variables once. Children without
+    their own `_export` share their parent's scope object, so nothing is
+    re-merged or re-scanned per task.
+    """
+
+    __slots__ = ("meta", "vars")
+
+    def __init__(self, meta: Optional[Dict[str, Any]] = None, vars: Optional[Dict[str, Any]] = None):
+        self.meta: Dict[str, Any] = meta or {}
+        self.vars: Dict[str, Any] = vars or {}
+
+    def child(self, export: Any) -> "ExportScope":
+        own = _meta_from(export)
+        own_vars = _flat_vars(export)
+        if not own and not own_vars:
+            return self
+        return ExportScope({**self.meta, **own}, {**self.vars, **own_vars})
+
+
+def _flat_vars(export: Any, prefix: str = "") -> Dict[str, Any]:
+    """Scalar `_export` values by dotted name, as `${a.b}` would look them up."""
+    if not isinstance(export, dict):
+        return {}
+    out: Dict[str, Any] = {}
+    for k, v in export.items():
+        if not isinstance(k, str):
+            continue
+        if isinstance(v, dict):
+            out.update(_flat_vars(v, f"{prefix}{k}."))
+        elif isinstance(v, (str, int, float, bool)):
+            out[f"{prefix}{k}"] = v
+    return out
+
+
+def td_task_meta(task_val: Any, exports: Any, task: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """
     Extract Treasure Data meta for a td> task.
-    Prefers task-specific values over _export.
-    Also recognizes Digdag `_retry`.
+
+    Resolution order: the operator value (when it is a mapping), then the task's
+    own params (`task`, siblings of `td>` such as `database:` or `_retry:`), then
+    the inherited exports. `exports` is an ExportScope, or a plain `_export` dict.
+    """
+    scope = exports if isinstance(exports, ExportScope) else ExportScope().child(exports)
+    own = _meta_from(task)
+    own.update(_meta_from(task_val))
+    if not own:
+        return dict(scope.meta)
+    return {**scope.meta, **own}
+
+
+def guess_table(sql_text: str, tables: Optional[SqlTables] = None) -> Optional[str]:
+    """
+    Pick the table a query is "about": the first table it writes, else the first it reads.
+    Pass precomputed `tables` to avoid re-tokenizing the SQL.
     """
-    task = task_val if isinstance(task_val, dict) else {}
-    exp = exports if isinstance(exports, dict) else {}
-
-    def pick(*keys: str) -> Optional[str]:
-        for key in keys:
-            v = task.get(key)
-            if _looks_nonempty(v):
-                return v
-            v = exp.get(key)
-            if _looks_nonempty(v):
-                return v
-        return None
-
-    meta = {
-        "database": pick("database"),
-        "engine": pick("engine"),  # presto|hive|spark
-        "priority": pick("priority"),
-        "retry": pick("_retry", "retry", "retries"),  # <-- include _retry
-        "timezone": pick("timezone"),
-        "result_connection": pick("result_connection"),
-        "result_settings": pick("result_settings"),
-    }
-    return {k: v for k, v in meta.items() if v is not None}
-
-
-_TABLE_RE = re.compile(r"\bfrom\s+([a-zA-Z0-9_\.]+)", re.IGNORECASE)
-
-
-def guess_table(sql_text: str) -> Optional[str]:
-    if not isinstance(sql_text, str):
-        return None
-    m = _TABLE_RE.search(sql_text)
-    return m.group(1) if m else None
-
-
-def td_console_links(meta: Dict[str, Any], sql_text: Optional[str]) -> Dict[str, str]:
+    if tables is None:
+        if not isinstance(sql_text, str):
+            return None
+        tables = extract_tables(sql_text)
+    names = tables.writes or tables.reads
+    return names[0] if names else None
+
+
+def td_console_links(
+    meta: Dict[str, Any], sql_text: Optional[str], tables: Optional[SqlTables] = None
+) -> Dict[str, str]:
     links: Dict[str, str] = {}
     base = TD_CONSOLE_BASE
 
@@ -66,7 +123,7 @@ def td_console_links(meta: Dict[str, Any], sql_text: Optional[str]) -> Dict[str,
             params.append(f"engine={eng}")
         q = "&".join(params)
         links["Open in query editor"] = f"{base}/app/new_query?{q}"
-        table = guess_table(sql_text or "")
+        table = guess_table(sql_text or "", tables)
         if table:
             if "." in table:
                 db2, tbl = table.split(".", 1)
@@ -0,0 +1,351 @@
+from __future__ import annotations
+
+import fnmatch
+import io
+import mmap
+import os
+import posixpath
+import tarfile
+import zipfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .constants import GRAPHS_DIR
+from .logging_config import get_logger
+
+logger = get_logger(__name__)
+
+ARCHIVE_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".zip")
+
+
+class Mount:
+    """
+    Read-only files served from memory under `root` (a directory that needn't
+    exist): for a project archive, `<cwd>/<project>/queries/a.sql` reads member
+    `queries/a.sql`, exactly as if the archive were extracted there; for a git
+    revision, every path under the working directory reads that revision's blob.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        root: Path,
+        files: Dict[str, Tuple[int, str]],
+        reader: Callable[[str], bytes],
+        close: Optional[Callable[[], None]] = None,
+    ):
+        self.source = source
+        self.root = root
+        # member path (posix, relative to root) -> (size, change stamp)
+        self.files = files
+        self._reader = reader
+        self.close = close or (lambda: None)
+        self.dirs: Set[str] = {""}
+        for name in files:
+            d = posixpath.dirname(name)
+            while d not in self.dirs:
+                self.dirs.add(d)
+                d = posixpath.dirname(d)
+
+    @property
+    def project(self) -> str:
+        return self.root.name
+
+    def read_bytes(self, name: str) -> bytes:
+        if name not in self.files:
+            raise FileNotFoundError(f"{self.source}: no member {name}")
+        return self._reader(name)
+
+
+# mount root (str) -> mount
+_MOUNTS: Dict[str, Mount] = {}
+
+
+def is_archive(path: Path) -> bool:
+    return Path(path).name.lower().endswith(ARCHIVE_SUFFIXES) and Path(path).is_file()
+
+
+def _project_name(archive: Path) -> str:
+    name = archive.name
+    for suffix in ARCHIVE_SUFFIXES:
+        if name.lower().endswith(suffix):
+            return name[: -len(suffix)]
+    return archive.stem
+
+
+def _member(name: str) -> Optional[str]:
+    """Normalized member path, or None for names that would escape the mount."""
+    name = posixpath.normpath(name.replace("\\", "/")).lstrip("/")
+    if name in ("", ".") or name == ".." or name.startswith("../"):
+        return None
+    return name
+
+
+_Opened = Tuple[Dict[str, Tuple[int, str]], Callable[[str], bytes], Callable[[], None]]
+
+
+def _read_tar(path: Path) -> _Opened:
+    files: Dict[str, Tuple[int, str]] = {}
+    if path.name.lower().endswith(".tar"):
+        # Uncompressed: map the file once; members are slices at their data offsets
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if path.stat().st_size else None
+        offsets: Dict[str, Tuple[int, int]] = {}
+        try:
+            with tarfile.open(path, "r:") as tar:
+                for m in tar:
+                    name = _member(m.name)
+                    if m.isfile() and name:
+                        files[name] = (m.size, f"tar:{m.mtime}:{m.size}")
+                        offsets[name] = (m.offset_data, m.size)
+        except Exception:
+            if data is not None:
+                data.close()
+            raise
+        if data is None:
+            return files, lambda name: b"", lambda: None
+        return files, lambda name: data[offsets[name][0] : offsets[name][0] + offsets[name][1]], data.close
+    # Compressed: one sequential pass, every regular file kept in memory
+    contents: Dict[str, bytes] = {}
+    with tarfile.open(path, "r|*") as tar:
+        for m in tar:
+            name = _member(m.name)
+            if m.isfile() and name:
+                fh = tar.extractfile(m)
+                contents[name] = fh.read() if fh else b""
+                files[name] = (m.size, f"tar:{m.mtime}:{m.size}")
+    return files, contents.__getitem__, contents.clear
+
+
+def _read_zip(path: Path) -> _Opened:
+    zf = zipfile.ZipFile(path)
+    files: Dict[str, Tuple[int, str]] = {}
+    names: Dict[str, str] = {}
+    for info in zf.infolist():
+        name = _member(info.filename)
+        if not info.is_dir() and name:
+            files[name] = (info.file_size, f"zip:{info.CRC:08x}:{info.file_size}")
+            names[name] = info.filename
+    # Members are decompressed when read; the central directory is all that's loaded up front
+    return files, lambda name: zf.read(names[name]), zf.close
+
+
+def _prefixed(reader: Callable[[str], bytes], top: str) -> Callable[[str], bytes]:
+    return lambda name: reader(f"{top}/{name}")
+
+
+def _add(m: Mount) -> Mount:
+    if str(m.root) in _MOUNTS:
+        raise ValueError(f"{m.source}: {m.root} is already mounted from {_MOUNTS[str(m.root)].source}")
+    _MOUNTS[str(m.root)] = m
+    logger.info(f"Mounted {m.source} at {m.root} ({len(m.files)} files)")
+    return m
+
+
+def mount(archive: Path, base: Path) -> Mount:
+    """
+    Mount a .tar/.tar.gz/.tgz/.zip project archive (what `digdag push` uploads)
+    at `<base>/<project>`. The project is the archive's name without its
+    suffix, or its single top-level directory when every member is inside one.
+    Raises ValueError for an unreadable archive or a project that is already mounted.
+    """
+    archive = Path(archive)
+    try:
+        files, reader, close = (
+            _read_zip(archive) if archive.name.lower().endswith(".zip") else _read_tar(archive)
+        )
+    except (OSError, tarfile.TarError, zipfile.BadZipFile) as e:
+        raise ValueError(f"cannot read archive {archive}: {e}") from None
+    project = _project_name(archive)
+    tops = {name.split("/", 1)[0] for name in files}
+    if len(tops) == 1 and all("/" in name for name in files):
+        # e.g. `tar czf p1.tar.gz p1/`: the directory is the project
+        project = tops.pop()
+        prefix = len(project) + 1
+        files = {name[prefix:]: v for name, v in files.items()}
+        reader = _prefixed(reader, project)
+    root = Path(os.path.realpath(base)) / project
+    try:
+        return _add(Mount(str(archive), root, files, reader, close))
+    except ValueError:
+        close()
+        raise
+
+
+def mount_git(ref: str, base: Path) -> Mount:
+    """
+    Mount revision `ref` of the git repository `base` is in over `base`
+    itself: the files below `base` in that revision replace the working tree
+    as input. Blobs come from one `git cat-file --batch` process, and each
+    file's change stamp is its blob id. Raises ValueError for an unknown ref
+    or when `base` isn't in a git repository.
+    """
+    from .git_tree import CatFile, list_tree, resolve_ref
+
+    base = Path(os.path.realpath(base))
+    commit = resolve_ref(base, ref)
+    tree = list_tree(base, commit)
+    cat = CatFile(base)
+    files = {name: (size, f"git:{blob}") for name, (blob, size) in tree.items()}
+    return _add(Mount(f"{ref} ({commit[:12]})", base, files, lambda name: cat.read(tree[name][0]), cat.close))
+
+
+def mount_archives(paths: Iterable[str], base: Path) -> List[Mount]:
+    """Mount each archive, or every archive directly inside a given directory."""
+    mounts = []
+    for p in paths:
+        path = Path(p)
+        archives = sorted(a for a in path.iterdir() if is_archive(a)) if path.is_dir() else [path]
+        for a in archives:
+            mounts.append(mount(a, base))
+    return mounts
+
+
+def unmount_all() -> None:
+    for m in _MOUNTS.values():
+        m.close()
+    _MOUNTS.clear()
+
+
+def mounts() -> List[Mount]:
+    return list(_MOUNTS.values())
+
+
+def _lookup(path) -> Optional[Tuple[Mount, str]]:
+    if not _MOUNTS:
+        return None
+    p = os.path.abspath(path)
+    d = p
+    while True:
+        m = _MOUNTS.get(d)
+        if m is not None:
+            return m, Path(os.path.relpath(p, d)).as_posix() if p != d else ""
+        parent = os.path.dirname(d)
+        if parent == d:
+            return None
+        d = parent
+
+
+# ---- file access for inputs: archive members first, then the real filesystem ----
+
+
+def read_bytes(path) -> bytes:
+    hit = _lookup(path)
+    if hit is None:
+        return Path(path).read_bytes()
+    return hit[0].read_bytes(hit[1])
+
+
+@contextmanager
+def mapped(path) -> Iterator[bytes]:
+    """
+    The bytes of `path` without reading them onto the heap: a read-only mmap
+    for a real file (closed on exit), the member's in-memory bytes for a mounted one.
+    """
+    hit = _lookup(path)
+    if hit is not None:
+        yield hit[0].read_bytes(hit[1])
+        return
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield data  # type: ignore[misc]
+
+
+def read_text(path, encoding: str = "utf-8") -> str:
+    hit = _lookup(path)
+    if hit is None:
+        return Path(path).read_text(encoding=encoding)
+    # universal newlines, as Path.read_text
+    return hit[0].read_bytes(hit[1]).decode(encoding).replace("\r\n", "\n").replace("\r", "\n")
+
+
+def open_text(path, encoding: str = "utf-8") -> io.TextIOBase:
+    """A text stream of `path` whose `.name` is the path (DigLoader resolves includes from it)."""
+    hit = _lookup(path)
+    if hit is None:
+        return open(path, encoding=encoding)
+    stream = io.StringIO(hit[0].read_bytes(hit[1]).decode(encoding))
+    stream.name = str(path)
+    return stream
+
+
+def is_file(path) -> bool:
+    hit = _lookup(path)
+    return os.path.isfile(path) if hit is None else hit[1] in hit[0].files
+
+
+def exists(path) -> bool:
+    hit = _lookup(path)
+    if hit is None:
+        return os.path.exists(path)
+    return hit[1] in hit[0].files or hit[1] in hit[0].dirs
+
+
+def getsize(path) -> int:
+    hit = _lookup(path)
+    if hit is None:
+        return os.path.getsize(path)
+    if hit[1] not in hit[0].files:
+        raise FileNotFoundError(str(path))
+    return hit[0].files[hit[1]][0]
+
+
+def signature(path) -> Optional[str]:
+    """Change stamp of a mounted file (tar mtime or zip CRC and size, git blob id); None for real files."""
+    hit = _lookup(path)
+    if hit is None:
+        return None
+    entry = hit[0].files.get(hit[1])
+    return entry[1] if entry else "missing"
+
+
+def walk(directory) -> Iterator[Tuple[str, List[str], List[str]]]:
+    """os.walk (top-down, prunable dirnames) over a real or mounted directory."""
+    hit = _lookup(directory)
+    if hit is None:
+        yield from os.walk(directory)
+        return
+    m, rel = hit
+    if rel and rel not in m.dirs:
+        return
+    pending = [rel]
+    while pending:
+        d = pending.pop(0)
+        prefix = f"{d}/" if d else ""
+        dirnames = sorted(x[len(prefix):] for x in m.dirs if x and posixpath.dirname(x) == d)
+        filenames = sorted(x[len(prefix):] for x in m.files if posixpath.dirname(x) == d)
+        dirpath = os.path.join(str(m.root), *d.split("/")) if d else str(m.root)
+        yield dirpath, dirnames, filenames
+        pending.extend(prefix + x for x in dirnames)
+
+
+def rglob(directory, pattern: str) -> List[Path]:
+    """
+    Files matching `pattern` (a file name glob) under `directory`, skipping
+    GRAPHS_DIR: mounts below it included, anything a deeper mount shadows
+    (a real directory, or part of a mounted git tree) excluded.
+    """
+    directory = Path(os.path.abspath(directory))
+    hit = _lookup(directory)
+    if hit is None:
+        found = [p for p in directory.rglob(pattern) if GRAPHS_DIR not in p.relative_to(directory).parts]
+    else:
+        found = []
+        for dirpath, dirnames, filenames in walk(directory):
+            dirnames[:] = [d for d in dirnames if d != GRAPHS_DIR]
+            found.extend(Path(dirpath, f) for f in filenames if fnmatch.fnmatchcase(f, pattern))
+    owner = hit[0] if hit else None
+    found = [p for p in found if (_lookup(p) or (None,))[0] is owner]
+    for root, m in sorted(_MOUNTS.items()):
+        if m is not owner and directory in Path(root).parents:
+            found.extend(
+                Path(root, *name.split("/")) for name in sorted(m.files)
+                if fnmatch.fnmatchcase(posixpath.basename(name), pattern)
+                and GRAPHS_DIR not in name.split("/")
+                and _lookup(Path(root, *name.split("/")))[0] is m
+            )
+    return found
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+
+@dataclass
+class SqlRef:
+    """A SQL file referenced by a td> task, with the tables it reads/writes."""
+
+    task: str
+    path: str
+    href: str
+    reads: List[str] = field(default_factory=list)
+    writes: List[str] = field(default_factory=list)
+
+
+@dataclass
+class TaskMeta:
+    """Operator settings of one task (td meta merged with `_export`, `_retry` limit)."""
+
+    task: str
+    operator: str = ""
+    database: Optional[str] = None
+    engine: Optional[str] = None
+    priority: Optional[int] = None
+    retry: Optional[int] = None
+
+
+@dataclass
+class WorkflowInfo:
+    """Metadata collected while building one workflow's graph."""
+
+    project: str
+    workflow: str
+    path: str
+    href: str
+    schedule: Any = None
+    timezone: Optional[str] = None
+    sql_refs: List[SqlRef] = field(default_factory=list)
+    # (operator, "project/workflow.dig") for call>/require> targets
+    calls: List[Tuple[str, str]] = field(default_factory=list)
+    # tables waited on by td_wait>/td_wait_table> tasks
+    waits: List[str] = field(default_factory=list)
+    # tasks with an operator or _retry worth querying (engine, database, retry, ...)
+    tasks: List[TaskMeta] = field(default_factory=list)
+    # every file read while building (the .dig, includes, SQL); drives incremental rebuilds
+    inputs: List[str] = field(default_factory=list)
+    # (task, reference, reason) for td>/td_wait> SQL references that match no file
+    unresolved_sql: List[Tuple[str, str, str]] = field(default_factory=list)
+    # (task, kind, message) for other problems: missing includes, call>/require>
+    # targets that match no .dig file, malformed _retry
+    issues: List[Tuple[str, str, str]] = field(default_factory=list)
+    # attempt history summary (see history.py): runs, p50/p95 seconds, critical path
+    history: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def key(self) -> str:
+        return f"{self.project}/{self.workflow}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "WorkflowInfo":
+        d = dict(d)
+        d["sql_refs"] = [SqlRef(**r) for r in d.get("sql_refs", [])]
+        d["calls"] = [tuple(c) for c in d.get("calls", [])]
+        d["tasks"] = [TaskMeta(**t) for t in d.get("tasks", [])]
+        d["unresolved_sql"] = [tuple(u) for u in d.get("unresolved_sql", [])]
+        d["issues"] = [tuple(i) for i in d.get("issues", [])]
+        return cls(**d)
@@ -1,17 +1,83 @@
 
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 import yaml
+from . import vfs
 from .logging_config import get_logger
 
 logger = get_logger(__name__)
 
+_INCLUDE_TAGS = ("!include", "!include:")
+
+
+class IncludeCycleError(ValueError):
+    """A file (directly or indirectly) includes itself."""
+
+
+class _IncludeDict(dict):
+    """A mapping with an !include somewhere below it (see DigLoader)."""
+
+
+class _IncludeList(list):
+    """A sequence with an !include somewhere below it (see DigLoader)."""
+
+
+def _include_paths(root: yaml.Node) -> set:
+    """Mapping/sequence nodes that contain an !include node at any depth."""
+    marked = set()
+    done = set()
+    stack = [(root, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if isinstance(node, yaml.ScalarNode) or (not expanded and id(node) in done):
+            continue
+        if isinstance(node, yaml.MappingNode):
+            children = [n for pair in node.value for n in pair]
+        else:
+            children = list(node.value)
+        if not expanded:
+            done.add(id(node))
+            stack.append((node, True))
+            stack.extend((c, False) for c in children)
+        elif any(c.tag in _INCLUDE_TAGS or c in marked for c in children):
+            marked.add(node)
+    return marked
+
+
 class DigLoader(yaml.FullLoader):
+    """
+    YAML loader for .dig files: `!include` becomes an IncludeRef, and every
+    mapping/sequence on a path to one is built as an _IncludeDict/_IncludeList
+    so resolve_includes can return everything else untouched.
+    """
+
     def __init__(self, stream):
         self._root = Path(getattr(stream, "name", ".")).resolve().parent
+        self._marked: set = set()
         super().__init__(stream)
 
+    def construct_document(self, node):
+        self._marked = _include_paths(node)
+        try:
+            return super().construct_document(node)
+        finally:
+            self._marked = set()
+
+    def construct_yaml_map(self, node):
+        data = _IncludeDict() if node in self._marked else {}
+        yield data
+        data.update(self.construct_mapping(node))
+
+    def construct_yaml_seq(self, node):
+        data = _IncludeList() if node in self._marked else []
+        yield data
+        data.extend(self.construct_sequence(node))
+
+
+DigLoader.add_constructor("tag:yaml.org,2002:map", DigLoader.construct_yaml_map)
+DigLoader.add_constructor("tag:yaml.org,2002:seq", DigLoader.construct_yaml_seq)
+
 @dataclass(frozen=True)
 class IncludeRef:
     path: str
@@ -29,56 +95,85 @@ yaml.add_constructor("!include:", _construct_include, Loader=DigLoader)
 def _deep_merge(dst: Dict[str, Any], src: Dict[str, Any]) -> Dict[str, Any]:
     for k, v in src.items():
         if k in dst and isinstance(dst[k], dict) and isinstance(v, dict):
-            _deep_merge(dst[k], v)
+            # dst[k] may be a subtree shared with the loaded document; copy before merging
+            dst[k] = _deep_merge(dict(dst[k]), v)
         else:
             dst[k] = v
     return dst
 
-def resolve_includes(obj: Any) -> Any:
+
+def _load_include(
+    inc_path: Path, inputs: Optional[List[str]], missing: Optional[List[str]], stack: Tuple[Path, ...]
+) -> Any:
+    if inc_path in stack:
+        chain = " -> ".join(str(p) for p in stack + (inc_path,))
+        raise IncludeCycleError(f"Include cycle: {chain}")
+    if inputs is not None:
+        inputs.append(str(inc_path))
+    with vfs.open_text(inc_path) as f:
+        loaded = yaml.load(f, Loader=DigLoader)
+    return resolve_includes(loaded, inputs, missing, stack + (inc_path,))
+
+
+def resolve_includes(
+    obj: Any,
+    inputs: Optional[List[str]] = None,
+    missing: Optional[List[str]] = None,
+    stack: Tuple[Path, ...] = (),
+) -> Any:
+    """
+    Replace IncludeRef values/keys with the loaded (recursively resolved) files.
+    If `inputs` is given, every include path consulted is appended to it;
+    `missing` collects the include paths that don't exist; `stack` holds the
+    files being loaded around `obj` (the .dig file first), for cycle detection.
+
+    Only containers DigLoader marked as leading to an include are rebuilt;
+    every other subtree (and an include-free document as a whole) is returned
+    as is, shared with `obj`. Raises IncludeCycleError if a file includes itself.
+    """
     if isinstance(obj, IncludeRef):
         inc_path = (obj.base / obj.path).resolve()
         try:
-            with open(inc_path, "r", encoding="utf-8") as f:
-                loaded = yaml.load(f, Loader=DigLoader)
-            return resolve_includes(loaded)
+            return _load_include(inc_path, inputs, missing, stack)
         except FileNotFoundError:
             logger.warning(f"Include file not found: {inc_path}")
+            if missing is not None:
+                missing.append(str(inc_path))
             return {}
 
-    if isinstance(obj, dict):
+    if isinstance(obj, _IncludeDict):
         resolved = {}
+        include_keys = []
         for k, v in obj.items():
             if isinstance(k, IncludeRef):
-                continue
-            resolved[k] = resolve_includes(v)
+                include_keys.append((k, v))
+            else:
+                resolved[k] = resolve_includes(v, inputs, missing, stack)
 
-        for k, v in obj.items():
-            if not isinstance(k, IncludeRef):
-                continue
-            paths = []
+        for k, v in include_keys:
             if k.path:
                 paths = [k.path]
+            elif isinstance(v, str):
+                paths = [v]
+            elif isinstance(v, (list, tuple)):
+                paths = list(v)
             else:
-                if isinstance(v, str):
-                    paths = [v]
-                elif isinstance(v, (list, tuple)):
-                    paths = list(v)
-                else:
-                    continue
+                continue
             for rel in paths:
                 inc_abs = (k.base / rel).resolve()
                 try:
-                    with open(inc_abs, "r", encoding="utf-8") as f:
-                        inc_loaded = yaml.load(f, Loader=DigLoader)
-                    inc_resolved = resolve_includes(inc_loaded)
-                    if isinstance(inc_resolved, dict):
-                        _deep_merge(resolved, inc_resolved)
-                    else:
-                        resolved.setdefault("_included_values", []).append(inc_resolved)
+                    inc_resolved = _load_include(inc_abs, inputs, missing, stack)
                 except FileNotFoundError:
                     logger.warning(f"Include file not found: {inc_abs}")
+                    if missing is not None:
+                        missing.append(str(inc_abs))
+                    continue
+                if isinstance(inc_resolved, dict):
+                    _deep_merge(resolved, inc_resolved)
+                else:
+                    resolved.setdefault("_included_values", []).append(inc_resolved)
         return resolved
 
-    if isinstance(obj, list):
-        return [resolve_includes(v) for v in obj]
+    if isinstance(obj, _IncludeList):
+        return [resolve_includes(v, inputs, missing, stack) for v in obj]
     return obj
@@ -0,0 +1,34 @@
+from digdaggraph.bench import SyntheticSpec, compare_results, generate_repo
+from digdaggraph.build_report import BuildReport
+from digdaggraph.graph_generate import build_workflow
+
+
+def test_generated_repo_is_deterministic_and_parses(tmp_path, monkeypatch):
+    spec = SyntheticSpec(projects=2, workflows=3, depth=2, fanout=2, include_share=1.0, call_density=0.9)
+    counts = generate_repo(tmp_path / "a", spec)
+    generate_repo(tmp_path / "b", spec)
+    assert counts["workflows"] == 6 and counts["includes"] == 6
+    dig = sorted((tmp_path / "a").rglob("*.dig"))
+    assert len(dig) == 6
+    assert dig[0].read_text() == (tmp_path / "b" / dig[0].relative_to(tmp_path / "a")).read_text()
+
+    monkeypatch.chdir(tmp_path)
+    report = BuildReport()
+    root, info = build_workflow(str(dig[0]), report=report)
+    assert any(p.endswith("export.yml") for p in info.inputs)
+    assert {"parse", "includes", "tree"} <= set(report.timings)
+
+
+def test_nested_stages_are_exclusive():
+    report = BuildReport()
+    with report.stage("outer"):
+        with report.stage("inner"):
+            sum(range(100000))
+    assert report.timings["outer"] < report.timings["inner"]
+
+
+def test_compare_flags_only_real_slowdowns():
+    old = {"timings": {"parse": 1.0, "layout": 0.001, "pages": 1.0}}
+    new = {"timings": {"parse": 1.5, "layout": 0.005, "pages": 1.1, "dot": 0.2}}
+    rows = {stage: regressed for stage, _a, _b, regressed in compare_results(old, new)}
+    assert rows == {"parse": True, "layout": False, "pages": False, "dot": False}
@@ -0,0 +1,69 @@
+import json
+
+from digdaggraph.build_cost import MIN_SAMPLES, CostFeatures, CostModel, features_for
+from digdaggraph.cli import main
+
+
+def test_features_from_dig_text(tmp_path):
+    (tmp_path / "q.sql").write_text("x" * 2048)
+    dig = tmp_path / "wf.dig"
+    dig.write_text(
+        "timezone: UTC\n"
+        "+load:\n"
+        "  _parallel: true\n"
+        "  +a:\n"
+        "    td>: q.sql\n"
+        "  +b:\n"
+        "    +deep:\n"
+        "      echo>: hi\n"
+        "+report:\n"
+        "  td>: ${name}.sql\n"
+    )
+    assert features_for(dig) == CostFeatures(tasks=5, depth=3, parallel=2, sql_kb=2.0)
+
+
+def test_calibration_recovers_linear_costs():
+    truth = {"base": 0.1, "tasks": 0.05, "depth": 0.0, "parallel": 0.02, "sql_kb": 0.01}
+    samples = []
+    for i in range(20):
+        f = CostFeatures(tasks=5 + 7 * i, depth=1 + i % 4, parallel=i % 5, sql_kb=float(i * i % 13))
+        samples.append((f, CostModel(truth).estimate(f)))
+    model = CostModel.calibrated(samples)
+    assert model.samples == 20
+    for name, weight in truth.items():
+        assert abs(model.weights[name] - weight) < 1e-6
+    assert CostModel.calibrated(samples[:3]).weights == CostModel().weights
+
+
+def test_samples_accumulate_across_incremental_builds(tmp_path, monkeypatch):
+    (tmp_path / "p1").mkdir()
+    for i in range(MIN_SAMPLES + 2):
+        (tmp_path / "p1" / f"w{i}.dig").write_text("".join(f"+t{j}:\n  echo>: {j}\n" for j in range(i + 1)))
+    monkeypatch.chdir(tmp_path)
+    report_path = tmp_path / "graphs" / "build_report.json"
+
+    assert main(["build", "--layout", "builtin"]) == 0
+    (tmp_path / "p1" / "w0.dig").write_text("+t0:\n  echo>: changed\n")
+    assert main(["build", "--layout", "builtin"]) == 0
+    costs = json.loads(report_path.read_text())["sections"]["costs"]
+    assert list(costs["workflows"]) == ["p1/w0.dig"]
+    assert len(costs["samples"]) == MIN_SAMPLES + 2
+    assert costs["samples"]["p1/w3.dig"][1:] == [4, 1, 0, 0.0]
+
+    # a no-op build still reports every sample, so its report can calibrate shards
+    assert main(["build", "--layout", "builtin"]) == 0
+    costs = json.loads(report_path.read_text())["sections"]["costs"]
+    assert costs["workflows"] == {} and len(costs["samples"]) == MIN_SAMPLES + 2
+
+
+def test_report_samples_calibrate_the_model(tmp_path):
+    truth = CostModel({"base": 0.1, "tasks": 0.05, "depth": 0.0, "parallel": 0.0, "sql_kb": 0.0})
+    samples = {}
+    for i in range(MIN_SAMPLES):
+        f = CostFeatures(tasks=3 * i + 1, depth=1)
+        samples[f"p/w{i}.dig"] = [truth.estimate(f), f.tasks, f.depth, f.parallel, f.sql_kb]
+    report = tmp_path / "build_report.json"
+    report.write_text(json.dumps({"sections": {"costs": {"workflows": {}, "samples": samples}}}))
+    model = CostModel.from_report(report)
+    assert model.samples == MIN_SAMPLES
+    assert abs(model.weights["tasks"] - 0.05) < 1e-6
@@ -0,0 +1,72 @@
+from digdaggraph.catalog import Catalog, query_catalog
+from digdaggraph.workflow_info import SqlRef, TaskMeta, WorkflowInfo
+
+
+def _info(tmp_path, name, engine="presto", retry=None):
+    dig = tmp_path / name
+    dig.write_text("+t:\n  td>: q.sql\n")
+    return WorkflowInfo(
+        project="p",
+        workflow=name,
+        path=str(dig),
+        href=f"./graphs/p/{name}",
+        sql_refs=[SqlRef("+t", "q.sql", "", reads=["db.a"], writes=["db.b"])],
+        calls=[("call>", "p/other.dig")],
+        tasks=[TaskMeta("+t", "td>", database="db", engine=engine, retry=retry)],
+        inputs=[str(dig)],
+    )
+
+
+def test_catalog_drives_incremental_reuse(tmp_path):
+    html = tmp_path / "page.html"
+    html.write_text("x")
+    cat = Catalog(tmp_path / "catalog.sqlite")
+    info = _info(tmp_path, "a.dig")
+    cat.record(info, "h1")
+    cat.save()
+
+    again = Catalog(tmp_path / "catalog.sqlite")
+    fresh = again.fresh_info(info.path, str(html))
+    assert fresh == info
+    assert again.related_hash(info.path) == "h1"
+    (tmp_path / "a.dig").write_text("+t:\n  td>: other.sql\n")
+    assert again.fresh_info(info.path, str(html)) is None
+    again.retain([])
+    assert again.all_infos() == []
+
+
+def test_adhoc_query_by_engine_and_retry(tmp_path):
+    cat = Catalog(tmp_path / "catalog.sqlite")
+    cat.record(_info(tmp_path, "a.dig", engine="hive", retry=5), "")
+    cat.record(_info(tmp_path, "b.dig", engine="hive", retry=1), "")
+    cat.record(_info(tmp_path, "c.dig", engine="presto", retry=9), "")
+    cat.close()
+    cols, rows = query_catalog(
+        tmp_path / "catalog.sqlite",
+        "SELECT w.workflow FROM tasks t JOIN workflows w ON w.path = t.workflow_path "
+        "WHERE t.engine = 'hive' AND t.retry > 3",
+    )
+    assert cols == ["workflow"] and rows == [("a.dig",)]
+    _cols, rows = query_catalog(tmp_path / "catalog.sqlite", "SELECT tbl, mode FROM sql_tables WHERE workflow_path LIKE '%a.dig'")
+    assert sorted(rows) == [("db.a", "read"), ("db.b", "write")]
+
+
+def test_only_recent_runs_are_kept(tmp_path):
+    cat = Catalog(tmp_path / "catalog.sqlite")
+    for i in range(5):
+        cat.record_run(float(i), {"parse": 0.1, "pages": 0.2}, {}, keep=3)
+    cat.close()
+    _cols, runs = query_catalog(tmp_path / "catalog.sqlite", "SELECT started FROM runs ORDER BY id")
+    assert [r[0] for r in runs] == [2.0, 3.0, 4.0]
+    _cols, rows = query_catalog(tmp_path / "catalog.sqlite", "SELECT COUNT(*), MIN(run_id) FROM timings")
+    assert rows == [(6, 3)]
+
+
+def test_adhoc_query_path_with_uri_characters(tmp_path):
+    path = tmp_path / "ci #3 ?x 100%" / "catalog.sqlite"
+    path.parent.mkdir()
+    cat = Catalog(path)
+    cat.record(_info(tmp_path, "a.dig", engine="hive", retry=1), "")
+    cat.close()
+    _cols, rows = query_catalog(path, "SELECT workflow FROM workflows")
+    assert rows == [("a.dig",)]
@@ -0,0 +1,39 @@
+from digdaggraph.cli import main
+
+
+def test_check_reports_problems_and_writes_nothing(tmp_path, monkeypatch, capsys):
+    proj = tmp_path / "p"
+    proj.mkdir()
+    (proj / "ok.dig").write_text("+a:\n  echo>: hi\n")
+    (proj / "bad.dig").write_text(
+        'schedule:\n  cron>: "61 * * * *"\n'
+        "_export:\n  !include : missing.yml\n"
+        "+a:\n  td>: queries/nope.sql\n"
+        "+b:\n  call>: ghost\n"
+        "+c:\n  call>: ok\n"
+        "+d:\n  echo>: x\n  _retry: lots\n"
+    )
+    monkeypatch.chdir(tmp_path)
+
+    assert main(["check", "p/ok.dig"]) == 0
+    assert main(["check", "p"]) == 1
+    out = capsys.readouterr().out
+    for kind in ("include:", "+a: sql:", "+b: call:", "+d: retry:", "schedule: cron:"):
+        assert kind in out
+    assert "+c:" not in out
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["p"]
+
+
+def test_check_reports_include_cycles(tmp_path, monkeypatch, capsys):
+    proj = tmp_path / "p"
+    proj.mkdir()
+    (proj / "w.dig").write_text("+a:\n  !include : b.yml\n")
+    (proj / "b.yml").write_text("+b:\n  !include : w.dig\n")
+    monkeypatch.chdir(tmp_path)
+
+    assert main(["check", "p"]) == 1
+    out = capsys.readouterr().out
+    assert "include: Include cycle:" in out
+    assert "could not be parsed" not in out
+    chain = out.split("Include cycle: ", 1)[1].splitlines()[0].split(" -> ")
+    assert [p.rsplit("/", 1)[-1] for p in chain] == ["w.dig", "b.yml", "w.dig"]
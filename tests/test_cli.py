@@ -0,0 +1,50 @@
+import subprocess
+import sys
+import time
+
+import pytest
+
+from digdaggraph.cli import main
+
+
+def test_cli_import_stays_light():
+    code = (
+        "import sys, digdaggraph.cli; "
+        "print(sorted(m for m in ('yaml', 'graphviz', 'cron_descriptor') if m in sys.modules))"
+    )
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, check=True
+    )
+    assert out.stdout.strip() == "[]"
+    # "import time: self [us] | cumulative | imported package"
+    cumulative = {
+        parts[2].strip(): int(parts[1])
+        for parts in (line.split(":", 1)[1].split("|") for line in out.stderr.splitlines())
+        if parts[1].strip().isdigit()
+    }
+    assert cumulative["digdaggraph.cli"] < 250_000  # ~20 ms today; heavy imports would blow this
+
+
+def test_noop_build_is_fast(tmp_path, monkeypatch):
+    (tmp_path / "p1" / "queries").mkdir(parents=True)
+    (tmp_path / "p1" / "queries" / "q.sql").write_text("select * from sales.orders\n")
+    (tmp_path / "p1" / "a.dig").write_text(
+        "timezone: UTC\nschedule:\n  daily>: 07:00:00\n+q:\n  td>: queries/q.sql\n"
+    )
+    (tmp_path / "p1" / "b.dig").write_text("+x:\n  echo>: hi\n+y:\n  call>: a\n")
+    monkeypatch.chdir(tmp_path)
+    assert main(["build", "--layout", "builtin"]) == 0
+
+    page = tmp_path / "scheduled_workflows.html"
+    mtime = page.stat().st_mtime_ns
+    t0 = time.perf_counter()
+    assert main(["build", "--layout", "builtin"]) == 0
+    assert time.perf_counter() - t0 < 0.5
+    assert page.stat().st_mtime_ns == mtime  # unchanged pages aren't rewritten
+
+
+def test_help_exits_cleanly(capsys):
+    with pytest.raises(SystemExit) as exc:
+        main(["--help"])
+    assert exc.value.code == 0
+    assert "build" in capsys.readouterr().out
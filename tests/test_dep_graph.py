@@ -0,0 +1,39 @@
+from digdaggraph.dep_graph import build_dependency_graph
+from digdaggraph.workflow_info import SqlRef, WorkflowInfo
+
+
+def _wf(key, calls=(), waits=(), writes=()):
+    project, workflow = key.split("/")
+    wf = WorkflowInfo(project=project, workflow=workflow, path=key, href="")
+    wf.calls = [("call>", c) for c in calls]
+    wf.waits = list(waits)
+    if writes:
+        wf.sql_refs = [SqlRef(task="+t", path="q.sql", href="", writes=list(writes))]
+    return wf
+
+
+def test_transitive_upstream_and_downstream():
+    g = build_dependency_graph(
+        [
+            _wf("p/a.dig", calls=["p/b.dig"]),
+            _wf("p/b.dig", waits=["db.t"]),
+            _wf("q/c.dig", writes=["db.t"]),
+        ]
+    )
+    assert g.upstream["p/a.dig"] == ["p/b.dig", "q/c.dig"]
+    assert g.downstream["q/c.dig"] == ["p/a.dig", "p/b.dig"]
+    assert g.direct_upstream("p/b.dig") == {"q/c.dig": ["td_wait> db.t"]}
+    assert g.cycles == []
+
+
+def test_cycles_are_reported():
+    g = build_dependency_graph(
+        [
+            _wf("p/a.dig", calls=["p/b.dig"]),
+            _wf("p/b.dig", calls=["p/a.dig"]),
+            _wf("p/c.dig", calls=["p/a.dig"]),
+        ]
+    )
+    assert g.cycles == [["p/a.dig", "p/b.dig"]]
+    assert g.upstream["p/c.dig"] == ["p/a.dig", "p/b.dig"]
+    assert g.upstream["p/a.dig"] == ["p/b.dig"]
@@ -0,0 +1,71 @@
+import os
+import sys
+from pathlib import Path
+
+from digdaggraph.dot_layout import collapse, layout_with_fallbacks, task_list_html
+from digdaggraph.graph_blocks import Block
+from digdaggraph.graph_generate import render_workflow
+from digdaggraph.layout_profiles import LayoutProfile
+from digdaggraph.workflow_info import WorkflowInfo
+
+# Stand-in for `dot`: hangs on clustered graphs, draws anything else
+_FAKE_DOT = f"""#!{sys.executable}
+import sys, time
+src = sys.stdin.read()
+if 'subgraph "cluster-' in src:
+    time.sleep(30)
+sys.stdout.write('<svg xmlns="http://www.w3.org/2000/svg"><!-- %d nodes --></svg>' % src.count('label='))
+"""
+
+
+def _tree(depth=4) -> Block:
+    root = Block("root", "Click to HomePage", "brown")
+    node = root
+    for i in range(depth):
+        node = node.append(f"+t{i}", URL="q.html" if i == 0 else "")
+        node.append(f"+leaf{i}")
+    return root
+
+
+def test_slow_layout_degrades_to_flat(tmp_path, monkeypatch):
+    dot = tmp_path / "dot"
+    dot.write_text(_FAKE_DOT)
+    dot.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+    outcome = layout_with_fallbacks(_tree(), timeout=0.5)
+    assert outcome.mode == "flat" and outcome.degraded
+    assert [r.split(":")[0] for r in outcome.reasons] == ["full", "straight"]
+    assert "exceeded 0.5s" in outcome.reasons[0]
+
+
+def test_flattening_profile_lays_out_without_clusters(tmp_path, monkeypatch):
+    dot = tmp_path / "dot"
+    dot.write_text(_FAKE_DOT)
+    dot.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+    profile = LayoutProfile("huge", graph_attr={"splines": "line"}, flatten=True)
+    outcome = layout_with_fallbacks(_tree(), timeout=5, profile=profile)
+    assert outcome.mode == "full" and not outcome.degraded
+
+
+def test_missing_dot_falls_back_to_task_list(tmp_path, monkeypatch):
+    monkeypatch.setenv("PATH", str(tmp_path))
+    outcome = layout_with_fallbacks(_tree(), timeout=1)
+    assert outcome.mode == "list" and outcome.reasons == ["full: dot not installed"]
+    assert outcome.markup.count("<li>") == 9 and "href='q.html'" in outcome.markup
+
+    # A page rendered as the task list leaves no SVG from an earlier build behind
+    out = tmp_path / "graphs" / "p" / "w"
+    out.parent.mkdir(parents=True)
+    Path(f"{out}.svg").write_text("<svg/>")
+    info = WorkflowInfo(project="p", workflow="w", path="p/w.dig", href="./graphs/p/w.html")
+    assert render_workflow(_tree(), info, str(out), layout="graphviz", layout_timeout=1)
+    assert "<li>" in Path(f"{out}.html").read_text(encoding="utf-8")
+    assert not Path(f"{out}.svg").exists()
+
+
+def test_collapse_folds_deep_tasks():
+    folded = collapse(_tree(), depth=2)
+    t1 = folded.subblocks[0].subblocks[1]
+    assert t1.label == "+t1\n(+5 tasks)" and not t1.subblocks
+    assert task_list_html(folded).count("<li>") == 4
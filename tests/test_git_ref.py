@@ -0,0 +1,78 @@
+import json
+import shutil
+import subprocess
+
+import pytest
+
+from digdaggraph import vfs
+from digdaggraph.cli import main
+from digdaggraph.dot_layout import LayoutCache
+from digdaggraph.graph_generate import build_workflow
+from digdaggraph.layout_profiles import DEFAULT_PROFILES
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+
+
+def _git(repo, *args):
+    subprocess.run(["git", "-C", str(repo), "-c", "user.name=t", "-c", "user.email=t@t", *args], check=True)
+
+
+def _repo(tmp_path):
+    (tmp_path / "p1" / "queries").mkdir(parents=True)
+    (tmp_path / "p1" / "a.dig").write_text("+q:\n  td>: queries/q.sql\n")
+    (tmp_path / "p1" / "queries" / "q.sql").write_text("select * from sales.orders\n")
+    (tmp_path / "p1" / "b.dig").write_text("+x:\n  echo>: one\n")
+    _git(tmp_path, "init", "-q")
+    _git(tmp_path, "add", "p1")
+    _git(tmp_path, "commit", "-qm", "one")
+    _git(tmp_path, "branch", "release")
+    (tmp_path / "p1" / "b.dig").write_text("+x:\n  echo>: two\n")
+    _git(tmp_path, "commit", "-qam", "two")
+    # uncommitted: never read with --git-ref
+    (tmp_path / "p1" / "b.dig").write_text("+x:\n  echo>: dirty\n")
+
+
+def _echo(tmp_path):
+    sidecar = json.loads((tmp_path / "graphs" / "p1" / "b.details.json").read_text(encoding="utf-8"))
+    task = next(n for n in sidecar["nodes"].values() if n["title"] == "+b+x")
+    return task["details"]["params"]["echo>"]
+
+
+def test_git_ref_reads_committed_blobs(tmp_path, monkeypatch):
+    _repo(tmp_path)
+    monkeypatch.chdir(tmp_path)
+
+    assert main(["build", "--layout", "builtin", "--git-ref", "release"]) == 0
+    assert _echo(tmp_path) == "one"
+    assert "sales.orders" in (tmp_path / "graphs" / "p1" / "queries" / "q.html").read_text(encoding="utf-8")
+
+    # a.dig and its SQL are the same blobs on both refs: reused, not parsed again
+    assert main(["build", "--layout", "builtin", "--git-ref", "HEAD"]) == 0
+    report = json.loads((tmp_path / "graphs" / "build_report.json").read_text())
+    assert (report["sections"]["workflows"]["reused"], report["sections"]["workflows"]["rendered"]) == (1, 1)
+    assert _echo(tmp_path) == "two"
+
+    assert main(["build", "--layout", "builtin", "--git-ref", "no-such-ref"]) == 2
+
+
+def test_layout_cache_is_keyed_by_graph_content(tmp_path):
+    _repo(tmp_path)
+    wf = str(tmp_path / "p1" / "b.dig")
+    profile = DEFAULT_PROFILES[0]
+    cache = LayoutCache(tmp_path / "layouts")
+    try:
+        vfs.mount_git("release", tmp_path)
+        committed, _info = build_workflow(wf)
+    finally:
+        vfs.unmount_all()
+    cache.put(cache.key(committed, profile), "<svg/>")
+
+    (tmp_path / "p1" / "b.dig").write_text("+x:\n  echo>: one\n+y:\n  echo>: more\n")
+    assert cache.get(cache.key(build_workflow(wf)[0], profile)) is None  # another graph
+    vfs.mount_git("release", tmp_path)
+    try:
+        assert cache.get(cache.key(build_workflow(wf)[0], profile)) == "<svg/>"
+    finally:
+        vfs.unmount_all()
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert LayoutCache(tmp_path / "layouts", read=False).get(cache.key(committed, profile)) is None
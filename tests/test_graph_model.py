@@ -0,0 +1,44 @@
+import json
+import shutil
+import subprocess
+from importlib import resources
+
+import pytest
+
+from digdaggraph.graph_blocks import Block
+from digdaggraph.graph_model import block_to_model, css_color, model_json
+
+
+def _tree() -> Block:
+    root = Block("root", "Click to HomePage", "brown")
+    group = root.append("+group", color="purple2")
+    group.parallel = True
+    group.append("+a\nq.sql", color="webgreen", penwidth=1.5, URL="q.html")
+    group.append("+b")
+    root.append("+after </script>")
+    return root
+
+
+def test_model_is_compact_and_uses_css_colors():
+    model = block_to_model(_tree())
+    group = model["k"][0]
+    assert group["c"] == "#912cee" and group["p"] == 1
+    assert group["k"][0] == {"l": "+a\nq.sql", "c": "#008000", "w": 1.5, "u": "q.html"}
+    assert group["k"][1] == {"l": "+b"}
+    assert css_color("not-a-color") == "#000000"
+    assert "</script>" not in model_json(_tree())
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node not installed")
+def test_browser_layout_draws_every_node_and_edge():
+    js = resources.files("digdaggraph").joinpath("assets").joinpath("graph_layout.js").read_text()
+    script = js.replace("})(this);", "})(globalThis);") + (
+        "\nprocess.stdout.write(DigdagGraphLayout.render(JSON.parse(require('fs').readFileSync(0, 'utf8'))));"
+    )
+    model = json.loads(model_json(_tree()).replace("<\\/", "</"))
+    out = subprocess.run(["node", "-e", script], input=json.dumps(model), capture_output=True, text=True, check=True)
+    svg = out.stdout
+    assert svg.count('<g class="node">') == 5
+    # root->group, group->a, group->b (parallel), a->after, b->after
+    assert svg.count("marker-end=") == 5
+    assert svg.count('class="cluster"') == 2
@@ -0,0 +1,113 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from digdaggraph.cli import main
+from digdaggraph.graph_blocks import Block
+from digdaggraph.history import CRITICAL_COLOR, AttemptHistory, TaskStats, apply_history, critical_path
+from digdaggraph.workflow_info import WorkflowInfo
+
+
+def _task(name, seconds, state="success"):
+    return {
+        "fullName": name,
+        "state": state,
+        "startedAt": "2024-05-01T00:00:00Z",
+        "updatedAt": f"2024-05-01T00:{seconds // 60:02d}:{seconds % 60:02d}Z",
+    }
+
+
+def _attempt(attempt_id, tasks, project="p1", workflow="a"):
+    return {
+        "id": str(attempt_id),
+        "project": {"name": project},
+        "workflow": {"name": workflow},
+        "done": True,
+        "success": True,
+        "createdAt": "2024-05-01T00:00:00Z",
+        "finishedAt": "2024-05-01T00:10:00Z",
+        "tasks": tasks,
+    }
+
+
+def test_critical_path_follows_sequence_and_slowest_parallel_branch():
+    root = Block("root", "root", "brown")
+    root.task_path = "+wf"
+    blocks = {}
+    for name, parent in (("+a", None), ("+par", None), ("+p1", "+par"), ("+p2", "+par"), ("+z", None)):
+        b = (blocks[parent] if parent else root).append(name)
+        b.task_path = (blocks[parent].task_path if parent else "+wf") + name
+        blocks[name] = b
+    blocks["+par"].parallel = True
+    stats = {
+        "+wf+a": TaskStats(3, 10, 12),
+        "+wf+par+p1": TaskStats(3, 30, 40),
+        "+wf+par+p2": TaskStats(3, 50, 90),
+        "+wf+z": TaskStats(3, 5, 5),
+    }
+    cost, path = critical_path(root, stats)
+    assert cost == 65
+    assert [b.task_path for b in path] == ["+wf+a", "+wf+par+p2", "+wf+z"]
+
+    history = AttemptHistory()
+    tasks = [_task("+wf+a", 10), _task("+wf+par+p1", 30), _task("+wf+par+p2", 50), _task("+wf+z", 5)]
+    history.add_attempt(_attempt(1, tasks, workflow="wf"), tasks)
+    info = WorkflowInfo(project="p1", workflow="wf.dig", path="p1/wf.dig", href="./graphs/p1/wf.html")
+    apply_history(root, info, history)
+    assert blocks["+p2"].color == CRITICAL_COLOR and blocks["+p1"].color != CRITICAL_COLOR
+    assert "p50 50s" in blocks["+p2"].label and blocks["+p2"].fillcolor
+    assert info.history["critical_s"] == 65 and info.history["p95"] == 600
+
+
+def test_server_history_is_fetched_once_per_attempt(tmp_path):
+    attempts = [_attempt(i, [_task("+a+x", 20 + i)]) for i in (3, 2, 1)]
+    task_requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.startswith("/api/attempts?"):
+                page = [] if "last_id" in self.path else attempts
+                body = {"attempts": [{k: v for k, v in a.items() if k != "tasks"} for a in page]}
+            else:
+                attempt_id = self.path.split("/")[3]
+                task_requests.append(attempt_id)
+                body = {"tasks": next(a["tasks"] for a in attempts if a["id"] == attempt_id)}
+            data = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{server.server_port}"
+        first = AttemptHistory.from_server(url, tmp_path / "cache.json", limit=10)
+        again = AttemptHistory.from_server(url, tmp_path / "cache.json", limit=10)
+    finally:
+        server.shutdown()
+    assert sorted(task_requests) == ["1", "2", "3"]
+    assert first.stats("p1/a.dig")["+a+x"].p50 == again.stats("p1/a.dig")["+a+x"].p50 == 22
+
+
+def test_build_overlays_history_and_lists_slowest(tmp_path, monkeypatch):
+    (tmp_path / "p1").mkdir()
+    (tmp_path / "p1" / "a.dig").write_text("+x:\n  echo>: hi\n+y:\n  echo>: there\n")
+    export = tmp_path / "history.json"
+    export.write_text(json.dumps({"attempts": [_attempt(1, [_task("+a+x", 30), _task("+a+y", 90)])]}))
+    monkeypatch.chdir(tmp_path)
+
+    assert main(["build", "--layout", "builtin", "--history", str(export)]) == 0
+    page = (tmp_path / "graphs" / "p1" / "a.html").read_text(encoding="utf-8")
+    assert "critical path <b>2m00s</b>" in page and "p50 1m30s" in page
+    assert "graphs/p1/a.html" in (tmp_path / "slowest_workflows.html").read_text(encoding="utf-8")
+
+    assert main(["build", "--layout", "builtin", "--history", str(export)]) == 0
+    report = json.loads((tmp_path / "graphs" / "build_report.json").read_text())
+    assert report["sections"]["workflows"]["rendered"] == 0
+
+    assert main(["build", "--layout", "builtin"]) == 0
+    assert "critical path" not in (tmp_path / "graphs" / "p1" / "a.html").read_text(encoding="utf-8")
@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+from digdaggraph.graph_blocks import Block
+from digdaggraph.layout_profiles import DEFAULT_PROFILES, GraphSize, load_profiles, measure, pick_profile
+
+
+def test_measure_matches_emitted_graph():
+    import graphviz
+
+    root = Block("root", "root", "brown")
+    seq = root.append("+seq")
+    for i in range(3):
+        seq.append(f"+s{i}").append(f"+s{i}_leaf")
+    par = root.append("+par")
+    par.parallel = True
+    for i in range(4):
+        par.append(f"+p{i}")
+    root.append("+last")
+
+    dot = graphviz.Digraph()
+    root.draw(dot)
+    size = measure(root)
+    assert size.nodes == dot.source.count("label=")
+    assert size.edges == dot.source.count(" -> ")
+    assert size.clusters == 6  # root, +seq, +s0..+s2, +par
+
+
+def test_profiles_pick_by_size_and_load_from_json(tmp_path):
+    assert pick_profile(GraphSize(10, 12, 3), DEFAULT_PROFILES).name == "small"
+    assert pick_profile(GraphSize(1000, 1100, 400), DEFAULT_PROFILES).name == "large"
+    assert pick_profile(GraphSize(50000, 60000, 9000), DEFAULT_PROFILES).flatten
+
+    path = tmp_path / "profiles.json"
+    path.write_text(json.dumps([{"name": "tiny", "max_nodes": 5}, {"name": "rest", "graph_attr": {"nslimit": 1}}]))
+    profiles = load_profiles(str(path))
+    assert pick_profile(GraphSize(6, 5, 1), profiles).graph_attr == {"nslimit": "1"}
+
+    path.write_text(json.dumps([{"name": "x", "max_node": 5}]))
+    with pytest.raises(ValueError, match="unknown keys max_node"):
+        load_profiles(str(path))
@@ -0,0 +1,39 @@
+import json
+
+from digdaggraph.cli import main
+from digdaggraph.node_details import LABEL_LINE_WIDTH, fit_label
+
+
+def test_fit_label_keeps_first_line_and_counts_dropped_lines():
+    label = "+load\n" + "\n".join(f"key_{i}: {'v' * 20}" for i in range(10))
+    short, cut = fit_label(label, 80)
+    assert cut and short.startswith("+load\nkey_0: ")
+    assert short.endswith("(+8 lines)")
+    assert fit_label(label, 0) == (label, False)
+    assert fit_label("+t\nx: 1", 80) == ("+t\nx: 1", False)
+    wide, cut = fit_label("+t\n" + "x" * 200, 1000)
+    assert cut and len(wide.split("\n")[1]) == LABEL_LINE_WIDTH
+
+
+def test_build_moves_long_values_to_the_sidecar(tmp_path, monkeypatch):
+    exports = "".join(f"  var_{i}: value_{i}\n" for i in range(40))
+    (tmp_path / "p1").mkdir()
+    (tmp_path / "p1" / "a.dig").write_text(
+        "_export:\n" + exports + "+x:\n  echo>: hi\n  _retry: 3\n+y:\n  echo>: there\n"
+    )
+    monkeypatch.chdir(tmp_path)
+
+    assert main(["build", "--layout", "builtin"]) == 0
+    page = (tmp_path / "graphs" / "p1" / "a.html").read_text(encoding="utf-8")
+    assert "var_39" not in page and '"a.details.json"' in page
+    sidecar = json.loads((tmp_path / "graphs" / "p1" / "a.details.json").read_text(encoding="utf-8"))
+    export_node = next(n for n in sidecar["nodes"].values() if "_export" in n["details"])
+    assert export_node["details"]["_export"]["var_39"] == "value_39"
+    x_id, x_node = next((i, n) for i, n in sidecar["nodes"].items() if n["title"] == "+a+x")
+    assert x_node["details"]["params"] == {"echo>": "hi", "_retry": 3}
+    assert f'<g id="{x_id}" class="node">' in page
+
+    assert main(["build", "--layout", "builtin", "--label-budget", "0"]) == 0
+    report = json.loads((tmp_path / "graphs" / "build_report.json").read_text())
+    assert report["sections"]["workflows"]["rendered"] == 1
+    assert "var_39" in (tmp_path / "graphs" / "p1" / "a.html").read_text(encoding="utf-8")
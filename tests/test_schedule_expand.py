@@ -0,0 +1,54 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from digdaggraph.schedule_expand import expand_schedules, parse_cron, spec_for_schedule
+from digdaggraph.workflow_info import WorkflowInfo
+
+START = datetime(2026, 3, 1, tzinfo=timezone.utc)  # a Sunday
+
+
+def _wf(name, schedule, tz=None):
+    wf = WorkflowInfo(project="p", workflow=name, path=name, href="")
+    wf.schedule, wf.timezone = schedule, tz
+    return wf
+
+
+def test_parse_cron_fields():
+    spec = parse_cron("*/15 9-17 * jan,jul mon-fri")
+    assert spec.minutes == (0, 15, 30, 45)
+    assert spec.hours == frozenset(range(9, 18))
+    assert spec.months == frozenset({1, 7})
+    assert spec.dows == frozenset({1, 2, 3, 4, 5})
+    with pytest.raises(ValueError):
+        parse_cron("61 * * * *")
+
+
+def test_digdag_schedule_shapes():
+    assert spec_for_schedule({"daily>": "07:30:00"}) == parse_cron("30 7 * * *")
+    assert spec_for_schedule({"hourly>": "05:00"}) == parse_cron("5 * * * *")
+    assert spec_for_schedule({"weekly>": "Sun,09:00:00"}) == parse_cron("0 9 * * sun")
+    assert spec_for_schedule("nope") is None
+
+
+def test_expand_counts_and_timezones():
+    heat = expand_schedules(
+        [
+            _wf("daily.dig", {"daily>": "07:30:00"}),
+            _wf("tokyo.dig", {"cron>": "0 9 * * 1-5"}, "Asia/Tokyo"),
+            _wf("hourly.dig", {"hourly>": "15:00"}),
+        ],
+        days=7,
+        start=START,
+    )
+    assert heat.fires == {"p/daily.dig": 7, "p/tokyo.dig": 5, "p/hourly.dig": 168}
+    # 09:00 JST on Monday 2026-03-02 is 00:00 UTC that day
+    assert sorted(heat.per_workflow["p/tokyo.dig"])[0] == 24
+    assert heat.counts[7] == 2  # daily 07:30 + hourly xx:15
+
+
+def test_dst_shifts_utc_hour():
+    heat = expand_schedules([_wf("la.dig", {"daily>": "02:30:00"}, "America/Los_Angeles")], days=14, start=START)
+    hours = sorted(heat.per_workflow["p/la.dig"])
+    assert hours[0] % 24 == 10  # PST (UTC-8)
+    assert hours[-1] % 24 == 9  # PDT (UTC-7) after 2026-03-08
@@ -0,0 +1,24 @@
+from digdaggraph.schedule_labels import ScheduleLabels
+
+
+def test_labels_are_memoized_and_persisted(tmp_path):
+    labels = ScheduleLabels()
+    labels.load(tmp_path / "labels.json")
+    row = labels.row_label({"cron>": "0 12 * * *"})
+    assert row.startswith("cron>: 0 12 * * *\n")
+    labels.row_label({"cron>": "0 12 * * *"})
+    labels.node_label({"cron>": "0 12 * * *"})
+    assert labels.stats()["cron_descriptor_calls"] == 1
+    assert labels.hits == 2
+    labels.save()
+
+    again = ScheduleLabels()
+    again.load(tmp_path / "labels.json")
+    assert again.row_label({"cron>": "0 12 * * *"}) == row
+    assert again.stats()["cron_descriptor_calls"] == 0
+
+
+def test_bad_cron_never_fails_the_label():
+    labels = ScheduleLabels()
+    assert labels.node_label({"cron>": "not a cron"}).startswith("schedule\n")
+    assert labels.row_label({"daily>": "07:00:00"}) == "schedule\ndaily>: 07:00:00"
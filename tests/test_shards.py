@@ -0,0 +1,43 @@
+import pytest
+
+from digdaggraph.cli import main
+from digdaggraph.shards import assign_shards, parse_shard
+
+
+def test_partition_is_stable_and_balanced():
+    paths = [f"p/wf{i}.dig" for i in range(40)]
+    plan = assign_shards(paths, 4)
+    assert set(plan.values()) <= {1, 2, 3, 4}
+    # adding a workflow never moves the others
+    assert {p: s for p, s in assign_shards(paths + ["p/new.dig"], 4).items() if p != "p/new.dig"} == plan
+
+    costs = {p: float(i + 1) for i, p in enumerate(paths)}
+    balanced = assign_shards(paths, 4, costs)
+    loads = [sum(costs[p] for p, s in balanced.items() if s == k) for k in (1, 2, 3, 4)]
+    assert max(loads) - min(loads) <= max(costs.values())
+    assert balanced == assign_shards(list(reversed(paths)), 4, costs)
+
+    assert parse_shard("2/3") == (2, 3)
+    for bad in ("0/3", "4/3", "x", "1/0"):
+        with pytest.raises(ValueError):
+            parse_shard(bad)
+
+
+def test_sharded_build_merges_into_full_site(tmp_path, monkeypatch):
+    (tmp_path / "p1").mkdir()
+    (tmp_path / "p2").mkdir()
+    (tmp_path / "p1" / "a.dig").write_text("schedule:\n  daily>: 07:00:00\n+c:\n  call>: b\n")
+    (tmp_path / "p1" / "b.dig").write_text("+x:\n  echo>: hi\n")
+    (tmp_path / "p2" / "c.dig").write_text("+r:\n  require>: a\n  project_name: p1\n")
+    monkeypatch.chdir(tmp_path)
+
+    for i in (1, 2):
+        assert main(["build", "--shard", f"{i}/2", "--layout", "builtin"]) == 0
+    assert main(["merge"]) == 0
+
+    page = (tmp_path / "graphs" / "p1" / "b.html").read_text(encoding="utf-8")
+    assert "<b>Upstream</b>" in page and "../p1/a.html" in page
+    assert "graphs/p1/a.html" in (tmp_path / "scheduled_workflows.html").read_text(encoding="utf-8")
+    # the merged catalog lets a plain build reuse every page
+    assert main(["build", "--layout", "builtin"]) == 0
+    assert '"reused": 3' in (tmp_path / "graphs" / "build_report.json").read_text(encoding="utf-8")
@@ -0,0 +1,26 @@
+import json
+
+from digdaggraph.site import SITE_MANIFEST, stage_site
+
+
+def test_stage_site_copies_changes_and_removes_orphans(tmp_path):
+    build, site = tmp_path / "build", tmp_path / "site"
+    (build / "graphs" / "p").mkdir(parents=True)
+    (build / "index_page.html").write_text("idx")
+    (build / "graphs" / "p" / "a.html").write_text("a")
+    (build / "graphs" / "p" / "b.html").write_text("b")
+    (build / "graphs" / "p" / "a.svg").write_text("not deployed")
+
+    delta = stage_site(build, site, ["index_page.html", "graphs/p/a.html", "graphs/p/b.html"])
+    assert sorted(delta.added) == ["graphs/p/a.html", "graphs/p/b.html", "index.html", "index_page.html"]
+    assert not (site / "graphs" / "p" / "a.svg").exists()
+    manifest = json.loads((site / SITE_MANIFEST).read_text())["files"]
+    assert manifest["graphs/p/a.html"]["size"] == 1
+
+    (build / "graphs" / "p" / "a.html").write_text("a2")
+    delta = stage_site(build, site, ["index_page.html", "graphs/p/a.html"])
+    assert delta.changed == ["graphs/p/a.html"]
+    assert delta.removed == ["graphs/p/b.html"]
+    assert delta.unchanged == 2
+    assert (site / "graphs" / "p" / "a.html").read_text() == "a2"
+    assert not (site / "graphs" / "p" / "b.html").exists()
@@ -0,0 +1,46 @@
+from pathlib import Path
+
+from digdaggraph.graph_blocks import Block
+from digdaggraph.graph_generate import render_workflow
+from digdaggraph.sp_layout import qualifies, render_svg
+from digdaggraph.workflow_info import WorkflowInfo
+
+
+def _tree() -> Block:
+    root = Block("root", "Click to HomePage", "brown")
+    group = root.append("+group", color="purple2")
+    group.parallel = True
+    group.append("+a\nq.sql", color="webgreen", penwidth=1.5, URL="q.html")
+    group.append("+b", shape="diamond")
+    root.append("+after <x>")
+    return root
+
+
+def test_builtin_layout_matches_browser_layout_structure():
+    svg = render_svg(_tree())
+    assert svg.count('<g class="node">') == 5
+    # root->group, group->a, group->b (parallel), a->after, b->after
+    assert svg.count("marker-end=") == 5
+    assert svg.count('class="cluster"') == 2
+    assert 'stroke="#008000"' in svg and "&lt;x&gt;" in svg
+
+
+def test_qualifies_rejects_unknown_shapes_and_colors():
+    assert qualifies(_tree())
+    odd_shape = _tree()
+    odd_shape.append("+t", shape="tripleoctagon")
+    assert not qualifies(odd_shape)
+    odd_color = _tree()
+    odd_color.append("+t", color="papayawhip")
+    assert not qualifies(odd_color)
+
+
+def test_render_without_graphviz(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("PATH", str(tmp_path))
+    info = WorkflowInfo(project="p", workflow="w", path="p/w.dig", href="./graphs/p/w.html")
+    out = tmp_path / "graphs" / "p" / "w"
+    out.parent.mkdir(parents=True)
+    assert render_workflow(_tree(), info, str(out), layout="auto")
+    page = (tmp_path / "graphs" / "p" / "w.html").read_text(encoding="utf-8")
+    assert page.count(' class="node">') == 5 and '<g id="dg-5" class="node">' in page
+    assert not out.exists()
@@ -6,3 +6,9 @@ def test_maybe_sql_path_basic():
     assert maybe_sql_path({"x": {"y": "queries/x/y.sql"}}) == "queries/x/y.sql"
     assert maybe_sql_path(["a", {"path":"queries/z.sql"}]) == "queries/z.sql"
     assert maybe_sql_path("not_sql.txt") is None
+
+
+def test_maybe_sql_path_prefers_hint_keys_then_direct_values():
+    assert maybe_sql_path({"a": "x.sql", "script": "s.sql", "query": "q.sql"}) == "q.sql"
+    assert maybe_sql_path({"a": "x.sql", "b": "y.sql"}) == "x.sql"
+    assert maybe_sql_path({"nested": {"file": "n.sql"}, "a": "x.sql"}) == "x.sql"
@@ -0,0 +1,81 @@
+from digdaggraph.sql_lineage import LineageCache, extract_tables, extract_tables_chunked
+from digdaggraph.td_meta import guess_table
+
+
+def test_reads_and_writes():
+    t = extract_tables("INSERT INTO out_t SELECT * FROM a JOIN db.b ON a.id = b.id")
+    assert t.reads == ["a", "db.b"]
+    assert t.writes == ["out_t"]
+
+
+def test_from_list_continues_after_derived_tables():
+    assert extract_tables("select * from (select * from inner_t) s, other o").reads == ["inner_t", "other"]
+    assert extract_tables("select * from a x, (select 1 from b) y, c z").reads == ["a", "b", "c"]
+
+
+def test_ctes_comments_and_strings_are_not_tables():
+    sql = """
+    -- FROM commented_out
+    WITH x AS (SELECT * FROM src1), y AS (SELECT * FROM x)
+    SELECT 'from literal', extract(year FROM ts) /* JOIN nope */ FROM y, src2 s
+    """
+    t = extract_tables(sql)
+    assert t.reads == ["src1", "src2"]
+    assert t.writes == []
+
+
+def test_cte_names_end_with_their_statement():
+    t = extract_tables("with a as (select 1) select * from a; insert into b select * from a")
+    assert t.reads == ["a"]
+    assert t.writes == ["b"]
+
+
+def test_create_table_as_and_templates():
+    t = extract_tables("CREATE TABLE IF NOT EXISTS ${td.db}.out AS SELECT * FROM (SELECT * FROM raw) r")
+    assert t.writes == ["${td.db}.out"]
+    assert t.reads == ["raw"]
+
+
+def test_guess_table_prefers_write_target():
+    assert guess_table("INSERT INTO tgt SELECT * FROM src") == "tgt"
+    assert guess_table("select 1") is None
+
+
+def test_lineage_cache_roundtrip(tmp_path):
+    path = tmp_path / "lineage.json"
+    cache = LineageCache(path)
+    cache.tables_for("SELECT * FROM a")
+    cache.tables_for("SELECT * FROM a")
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.save()
+
+    again = LineageCache(path)
+    assert again.tables_for("SELECT * FROM a").reads == ["a"]
+    assert (again.hits, again.misses) == (1, 0)
+
+
+def test_chunked_extraction_matches_whole_script():
+    sql = (
+        "WITH c AS (SELECT * FROM src)\nINSERT INTO out SELECT * FROM c;\n"
+        "-- not a boundary; FROM fake\nSELECT ';' FROM a JOIN b ON a.id = b.id;\n"
+        "/* ; FROM fake2 */ INSERT INTO out2\nSELECT * FROM c, d\n"
+    )
+    whole = extract_tables(sql)
+    for size in (1, 7, 40, len(sql)):
+        chunks = [sql[i : i + size] for i in range(0, len(sql), size)]
+        chunked = extract_tables_chunked(chunks)
+        assert (chunked.reads, chunked.writes) == (whole.reads, whole.writes)
+    assert whole.reads == ["src", "a", "b", "c", "d"]
+
+
+def test_lineage_cache_keys_large_files_on_their_bytes():
+    cache = LineageCache()
+    data = b"SELECT * FROM a;\nSELECT * FROM b\n"
+    assert cache.tables_for_bytes(data, [data.decode()]).reads == ["a", "b"]
+
+    def unread():
+        raise AssertionError("chunks decoded on a cache hit")
+        yield ""
+
+    assert cache.tables_for_bytes(data, unread()).reads == ["a", "b"]
+    assert (cache.hits, cache.misses) == (1, 1)
@@ -0,0 +1,43 @@
+import json
+
+from digdaggraph import graph_generate, html_pages
+from digdaggraph.cli import main
+from digdaggraph.html_pages import sql_chunks, sql_part_files
+
+
+def test_sql_chunks_cut_after_newlines_and_keep_characters_whole():
+    data = ("select 'é'\r\nfrom t\r\n" + "ü" * 20).encode()
+    chunks = list(sql_chunks(data, 15))
+    assert "".join(chunks) == "select 'é'\nfrom t\n" + "ü" * 20
+    assert all(c.endswith("\n") for c in chunks[:2])
+    assert list(sql_chunks(b"", 8)) == []
+
+
+def test_large_sql_is_streamed_and_paged(tmp_path, monkeypatch):
+    monkeypatch.setattr(graph_generate, "SQL_STREAM_BYTES", 100)
+    monkeypatch.setattr(html_pages, "SQL_PAGED_BYTES", 1000)
+    monkeypatch.setattr(html_pages, "SQL_CHUNK_BYTES", 400)
+    rows = "".join(f"  union all select {i} as n -- <row {i}>\n" for i in range(60))
+    (tmp_path / "p1" / "queries").mkdir(parents=True)
+    (tmp_path / "p1" / "queries" / "q.sql").write_text("insert into sales.big\nselect 0 as n\n" + rows)
+    (tmp_path / "p1" / "queries" / "s.sql").write_text("select 1 from sales.small -- <x>\n" * 5)
+    (tmp_path / "p1" / "a.dig").write_text("+q:\n  td>: queries/q.sql\n+s:\n  td>: queries/s.sql\n")
+    monkeypatch.chdir(tmp_path)
+
+    assert main(["build", "--layout", "builtin", "--site-dir", "site"]) == 0
+    out = tmp_path / "graphs" / "p1" / "queries"
+    page = (out / "q.html").read_text(encoding="utf-8")
+    parts = sql_part_files(out / "q.html")
+    assert len(parts) > 1 and f'data-parts="{len(parts)}"' in page and "&lt;row 0&gt;" in page
+    assert "<row 59>" in parts[-1].read_text(encoding="utf-8") and "row 59" not in page
+    # streamed but not paged: the whole file inline, escaped
+    small = (out / "s.html").read_text(encoding="utf-8")
+    assert small.count("&lt;x&gt;") == 5 and "data-parts" not in small
+    assert (tmp_path / "site" / "graphs" / "p1" / "queries" / parts[-1].name).is_file()
+    lineage = json.loads((tmp_path / "table_usage.json").read_text())
+    assert "sales.big" in json.dumps(lineage)
+
+    # the file shrinks below the paging threshold: old parts are removed
+    (tmp_path / "p1" / "queries" / "q.sql").write_text("select 1 from sales.big\n")
+    assert main(["build", "--layout", "builtin", "--force"]) == 0
+    assert sql_part_files(out / "q.html") == []
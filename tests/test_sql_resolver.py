@@ -0,0 +1,35 @@
+from digdaggraph.graph_generate import build_workflow
+from digdaggraph.sql_resolver import SqlResolver
+
+
+def test_resolver_answers_from_one_index(tmp_path):
+    proj = tmp_path / "proj"
+    (proj / "queries" / "daily").mkdir(parents=True)
+    (proj / "queries" / "a.sql").write_text("select 1")
+    (proj / "queries" / "daily" / "load_us.sql").write_text("select 1")
+    sql = SqlResolver()
+    sql.index_dirs([proj])
+    (proj / "queries" / "late.sql").write_text("select 1")  # not seen: no per-reference probing
+
+    assert sql.resolve(str(proj), "./queries/a.sql").path == "queries/a.sql"
+    assert not sql.resolve(str(proj), "queries/late.sql").found
+    assert sql.resolve(str(proj), "queries/daily/load_${region}.sql", {"region": "us"}).found
+    templated = sql.resolve(str(proj), "queries/daily/load_${region}.sql")
+    assert templated.found and templated.path == "queries/daily/load_us.sql"
+    missing = sql.resolve(str(proj), "queries/${x}/none.sql")
+    assert not missing.found and "${x}" in missing.reason
+
+
+def test_unresolved_references_are_reported(tmp_path, monkeypatch):
+    proj = tmp_path / "proj"
+    (proj / "queries").mkdir(parents=True)
+    (proj / "queries" / "q_eu.sql").write_text("insert into db.t select * from db.s")
+    (proj / "wf.dig").write_text(
+        "_export:\n  region: eu\n"
+        "+ok:\n  td>: queries/q_${region}.sql\n"
+        "+gone:\n  td>: queries/missing.sql\n"
+    )
+    monkeypatch.chdir(tmp_path)
+    _root, info = build_workflow(str(proj / "wf.dig"))
+    assert [(r.task, r.path, r.writes) for r in info.sql_refs] == [("+ok", "queries/q_eu.sql", ["db.t"])]
+    assert info.unresolved_sql == [("+gone", "queries/missing.sql", "not found")]
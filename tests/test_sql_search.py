@@ -0,0 +1,53 @@
+import json
+
+from digdaggraph.catalog import Catalog
+from digdaggraph.sql_search import tokenize, update_search_index
+from digdaggraph.workflow_info import SqlRef, WorkflowInfo
+
+
+def test_tokenize_drops_keywords_and_comments():
+    sql = "-- uses legacy_table\nSELECT o.customer_id, SUM(amount) FROM sales.orders o /* old: x_y */ WHERE 1=1"
+    assert tokenize(sql) == ["amount", "customer_id", "orders", "sales", "sum"]
+
+
+def _workflow(tmp_path, name, sql_files):
+    dig = tmp_path / name
+    dig.write_text("")
+    return WorkflowInfo(
+        project="p",
+        workflow=name,
+        path=str(dig),
+        href=f"./graphs/p/{name.replace('.dig', '.html')}",
+        sql_refs=[SqlRef("+t", f, f"./graphs/p/{f.replace('.sql', '.html')}") for f in sql_files],
+    )
+
+
+def test_index_updates_only_what_changed(tmp_path):
+    (tmp_path / "a.sql").write_text("select customer_id from sales.orders")
+    (tmp_path / "b.sql").write_text("select customer_id from crm.accounts")
+    wfs = [_workflow(tmp_path, "w1.dig", ["a.sql", "b.sql"]), _workflow(tmp_path, "w2.dig", ["b.sql"])]
+    out = tmp_path / "search"
+    cat = Catalog(tmp_path / "catalog.sqlite")
+
+    first = update_search_index(wfs, cat, out)
+    assert (first.docs, first.tokenized) == (2, 2)
+    cu = json.loads((out / "idx" / "cu.json").read_text())
+    assert len(cu["customer_id"]) == 2
+    docs = json.loads((out / "docs" / "0.json").read_text())
+    b_doc = next(d for d in docs.values() if d[1] == "b.sql")
+    assert b_doc[3] == [["p/w1.dig", "./graphs/p/w1.html"], ["p/w2.dig", "./graphs/p/w2.html"]]
+
+    again = update_search_index(wfs, cat, out)
+    assert (again.tokenized, again.files_written) == (0, 0)
+
+    (tmp_path / "a.sql").write_text("select customer_id, total from sales.invoices")
+    changed = update_search_index(wfs, cat, out)
+    assert changed.tokenized == 1
+    assert not (out / "idx" / "or.json").exists()
+    assert "invoices" in json.loads((out / "idx" / "in.json").read_text())
+    # the untouched crm shard is not rewritten
+    assert changed.files_written == 3  # in.json, to.json, meta.json
+
+    gone = update_search_index(wfs[1:], cat, out)
+    assert (gone.docs, gone.removed) == (1, 1)
+    assert not (out / "idx" / "sa.json").exists()
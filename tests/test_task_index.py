@@ -0,0 +1,51 @@
+import json
+import re
+
+from digdaggraph.cli import main
+from digdaggraph.graph_generate import build_workflow
+from digdaggraph.task_index import node_boxes
+
+GRAPHVIZ_SVG = """<svg width="134pt" height="116pt" viewBox="0.00 0.00 134.00 116.00">
+<g id="graph0" class="graph" transform="scale(1 1) rotate(0) translate(4 112)">
+<g id="dg-1" class="node">
+<title>n</title>
+<g id="a_dg-1"><a xlink:href="x.html">
+<polygon fill="none" stroke="brown" stroke-width="2" points="126,-108 0,-108 0,-72 126,-72"/>
+<text x="63" y="-86.3">Click</text>
+</a></g>
+</g>
+<g id="edge1" class="edge"><path d="M63,-71.7C63,-63.98 63,-54.71 63,-46.11"/></g>
+<g id="dg-2" class="node">
+<ellipse fill="none" stroke="black" cx="63" cy="-18" rx="27" ry="18"/>
+</g>
+</g>
+</svg>"""
+
+
+def test_node_boxes_from_graphviz_svg():
+    assert node_boxes(GRAPHVIZ_SVG) == {"dg-1": (4.0, 4.0, 126.0, 36.0), "dg-2": (40.0, 76.0, 54.0, 36.0)}
+
+
+def test_pages_embed_task_index(tmp_path, monkeypatch):
+    (tmp_path / "p1").mkdir()
+    (tmp_path / "p1" / "a.dig").write_text(
+        "+prep:\n  sh>: ./prep.sh\n+load:\n  _parallel: true\n  +x:\n    echo>: x\n  +y:\n    echo>: y\n"
+    )
+    monkeypatch.chdir(tmp_path)
+    first, _info = build_workflow(str(tmp_path / "p1" / "a.dig"))
+    again, _info = build_workflow(str(tmp_path / "p1" / "a.dig"))
+    assert first.subblocks[1].subblocks[0].name == again.subblocks[1].subblocks[0].name == "n.1.0"
+
+    for render in ("svg", "client"):
+        assert main(["build", "--layout", "builtin", "--render", render]) == 0
+        page = (tmp_path / "graphs" / "p1" / "a.html").read_text(encoding="utf-8")
+        index = json.loads(re.search(r'id="task-index">(.*?)</script>', page).group(1))
+        rows = {row[0]: row for row in index["tasks"]}
+        assert list(rows) == ["+a", "+a+prep", "+a+load", "+a+load+x", "+a+load+y"]
+        path, operator, node_id, *box = rows["+a+load+y"]
+        assert operator == "echo>" and 'id="task-find"' in page
+        if render == "svg":
+            assert f'<g id="{node_id}" class="node">' in page
+            assert len(box) == 4 and box[2] > 0
+        else:
+            assert box == []
@@ -0,0 +1,32 @@
+from digdaggraph.graph_generate import build_workflow
+from digdaggraph.td_meta import ExportScope, td_task_meta
+
+
+def test_export_scope_is_shared_until_overridden():
+    root = ExportScope().child({"td": {"database": "db0"}, "engine": "presto"})
+    assert root.child(None) is root and root.child({}) is root
+    assert root.child({"unrelated": 1}).meta == root.meta
+    assert root.child({"unrelated": 1}).vars["td.database"] == "db0"
+    group = root.child({"database": "db1"})
+    assert group.meta == {"database": "db1", "engine": "presto"}
+    meta = td_task_meta("q.sql", group, task={"td>": "q.sql", "engine": "hive", "_retry": 3})
+    assert meta == {"database": "db1", "engine": "hive", "retry": 3}
+
+
+def test_nested_and_included_exports_reach_td_tasks(tmp_path, monkeypatch):
+    proj = tmp_path / "proj"
+    proj.mkdir()
+    (proj / "env.yml").write_text("td:\n  database: from_include\n")
+    (proj / "wf.dig").write_text(
+        "_export:\n  !include: env.yml\n"
+        "+outer:\n"
+        "  _export:\n    engine: hive\n"
+        "  +inner:\n    td>: q.sql\n"
+        "+other:\n  td>: q.sql\n  database: own\n"
+    )
+    (proj / "q.sql").write_text("select 1")
+    monkeypatch.chdir(tmp_path)
+    _root, info = build_workflow(str(proj / "wf.dig"))
+    tasks = {t.task: t for t in info.tasks}
+    assert (tasks["+inner"].database, tasks["+inner"].engine) == ("from_include", "hive")
+    assert (tasks["+other"].database, tasks["+other"].engine) == ("own", None)
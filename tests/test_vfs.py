@@ -0,0 +1,70 @@
+import io
+import json
+import tarfile
+import zipfile
+
+import pytest
+
+from digdaggraph import vfs
+from digdaggraph.cli import main
+
+FILES = {
+    "wf.dig": "_export:\n  !include : common.yml\n+q:\n  td>: queries/q.sql\n",
+    "common.yml": "td:\n  database: sales\n",
+    "queries/q.sql": "select * from sales.orders\n",
+}
+
+
+def _tar(path, files, mode="w:gz", top=""):
+    with tarfile.open(path, mode) as tar:
+        for name, text in files.items():
+            data = text.encode()
+            info = tarfile.TarInfo(top + name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+
+
+def test_archives_mount_as_project_directories(tmp_path):
+    _tar(tmp_path / "a.tar.gz", FILES, top="alpha/")
+    _tar(tmp_path / "beta.tar", {**FILES, "../evil.dig": "x"}, mode="w")
+    with zipfile.ZipFile(tmp_path / "gamma.zip", "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, text in FILES.items():
+            zf.writestr(name, text)
+    base = tmp_path / "work"
+    base.mkdir()
+    try:
+        mounts = vfs.mount_archives([str(tmp_path)], base)
+        assert sorted(m.project for m in mounts) == ["alpha", "beta", "gamma"]
+        root = base.resolve()
+        assert sorted(p.relative_to(root).as_posix() for p in vfs.rglob(base, "*.dig")) == [
+            "alpha/wf.dig", "beta/wf.dig", "gamma/wf.dig",
+        ]
+        for project in ("alpha", "beta", "gamma"):
+            assert vfs.read_text(root / project / "queries" / "q.sql") == FILES["queries/q.sql"]
+            assert vfs.exists(root / project / "queries") and not vfs.is_file(root / project / "queries")
+            assert vfs.signature(root / project / "wf.dig").startswith(("tar:", "zip:"))
+        assert [d for d, _dirs, files in vfs.walk(root / "beta") if "q.sql" in files] == [str(root / "beta" / "queries")]
+        assert not vfs.exists(tmp_path / "evil.dig") and vfs.signature(tmp_path / "x") is None
+    finally:
+        vfs.unmount_all()
+    # unmounting releases the tar mapping, the zip file and the decompressed members
+    for m in mounts:
+        with pytest.raises((ValueError, KeyError)):
+            m.read_bytes("wf.dig")
+
+
+def test_build_reads_archives_without_extracting(tmp_path, monkeypatch):
+    (tmp_path / "in").mkdir()
+    _tar(tmp_path / "in" / "p1.tar.gz", FILES)
+    (tmp_path / "out").mkdir()
+    monkeypatch.chdir(tmp_path / "out")
+
+    assert main(["build", "--layout", "builtin", "--archive", str(tmp_path / "in")]) == 0
+    assert not (tmp_path / "out" / "p1").exists()
+    assert (tmp_path / "out" / "graphs" / "p1" / "queries" / "q.html").is_file()
+    details = json.loads((tmp_path / "out" / "graphs" / "p1" / "wf.details.json").read_text())
+    assert any(n["details"].get("td", {}).get("database") == "sales" for n in details["nodes"].values())
+
+    assert main(["build", "--layout", "builtin", "--archive", str(tmp_path / "in")]) == 0
+    report = json.loads((tmp_path / "out" / "graphs" / "build_report.json").read_text())
+    assert report["sections"]["workflows"]["reused"] == 1
@@ -2,3 +2,42 @@ from digdaggraph.yaml_includes import resolve_includes
 
 def test_resolve_list_passthrough():
     assert resolve_includes([1,2,3]) == [1,2,3]
+
+
+def _load(path):
+    import yaml
+
+    from digdaggraph.yaml_includes import DigLoader
+
+    with open(path, encoding="utf-8") as f:
+        return yaml.load(f, Loader=DigLoader)
+
+
+def test_include_free_subtrees_are_not_copied(tmp_path):
+    (tmp_path / "inc.yml").write_text("+inc:\n  echo>: hi\n")
+    (tmp_path / "wf.dig").write_text(
+        "+a:\n  +deep:\n    echo>: a\n+b:\n  !include : inc.yml\n  +own:\n    echo>: b\n"
+    )
+    raw = _load(tmp_path / "wf.dig")
+    inputs = []
+    data = resolve_includes(raw, inputs)
+    assert data["+a"] is raw["+a"]
+    assert data["+b"]["+own"] is raw["+b"]["+own"]
+    assert data["+b"]["+inc"] == {"echo>": "hi"}
+    assert type(data) is dict and type(data["+b"]) is dict
+    assert inputs == [str((tmp_path / "inc.yml").resolve())]
+
+    (tmp_path / "plain.dig").write_text("+a:\n  echo>: a\n")
+    plain = _load(tmp_path / "plain.dig")
+    assert resolve_includes(plain) is plain
+
+
+def test_include_cycle_fails_fast(tmp_path):
+    import pytest
+
+    from digdaggraph.yaml_includes import IncludeCycleError
+
+    (tmp_path / "a.yml").write_text("+x:\n  !include : b.yml\n")
+    (tmp_path / "b.yml").write_text("+y:\n  !include : a.yml\n")
+    with pytest.raises(IncludeCycleError, match="a.yml"):
+        resolve_includes(_load(tmp_path / "a.yml"))